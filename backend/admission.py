@@ -0,0 +1,152 @@
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+from config import config
+
+DEADLINE_HEADER = b'x-request-timeout-ms'
+
+
+class EndpointLimiter:
+    """Concurrency limit plus a bounded wait queue for one endpoint"""
+
+    def __init__(self, max_concurrency: int, max_queue: int):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.queued = 0
+        self.stats = {'admitted': 0, 'shed': 0, 'timed_out': 0, 'expired_in_queue': 0}
+
+    def has_room(self) -> bool:
+        """Whether a new request may wait for a slot"""
+        return self.in_flight + self.queued < self.max_concurrency + self.max_queue
+
+    async def acquire(self, timeout: Optional[float]) -> bool:
+        """Wait for a slot; returns False if the deadline passes first
+
+        The semaphore is awaited in its own task rather than under
+        wait_for, which can time out just after the acquire went through
+        and lose that permit. A waiter that is given up on (deadline or
+        cancellation) is cancelled, and if it still ends up holding a
+        permit, its done callback hands the permit back.
+        """
+        self.queued += 1
+        waiter = asyncio.ensure_future(self.semaphore.acquire())
+        acquired = False
+        try:
+            await asyncio.wait({waiter}, timeout=timeout)
+            acquired = waiter.done()
+        finally:
+            self.queued -= 1
+            if not acquired:
+                waiter.cancel()
+                waiter.add_done_callback(self._return_permit)
+        if acquired:
+            self.in_flight += 1
+        return acquired
+
+    def _return_permit(self, waiter: asyncio.Future):
+        if not waiter.cancelled() and waiter.exception() is None:
+            self.semaphore.release()
+
+    def release(self):
+        self.in_flight -= 1
+        self.semaphore.release()
+
+    def snapshot(self) -> Dict:
+        return dict(self.stats, in_flight=self.in_flight, queued=self.queued,
+                    max_concurrency=self.max_concurrency, max_queue=self.max_queue)
+
+
+class AdmissionMiddleware:
+    """ASGI middleware that sheds load and enforces per-request deadlines
+
+    Requests beyond an endpoint's concurrency limit wait in a bounded
+    queue; when the queue is full they get an immediate 503 with
+    Retry-After. Clients may send X-Request-Timeout-Ms; once it expires
+    the request is answered with 504 and, if it had not started, never
+    runs. Work already running in the threadpool cannot be interrupted,
+    so it keeps its slot until it finishes and its response is dropped.
+    """
+
+    def __init__(self, app, limits: Dict[str, Tuple[int, int]] = None,
+                 default_timeout: float = None, retry_after: int = None):
+        self.app = app
+        limits = limits or config.ADMISSION_LIMITS
+        self.limiters = {path: EndpointLimiter(*limit) for path, limit in limits.items()}
+        self.default_timeout = default_timeout if default_timeout is not None else config.ADMISSION_DEFAULT_TIMEOUT
+        self.retry_after = retry_after or config.ADMISSION_RETRY_AFTER
+        admission_registry.update(self.limiters)
+
+    def _timeout(self, scope) -> Optional[float]:
+        """Client deadline in seconds, capped by the server default"""
+        timeout = self.default_timeout or None
+        for name, value in scope.get('headers', []):
+            if name == DEADLINE_HEADER:
+                try:
+                    requested = float(value) / 1000
+                except ValueError:
+                    break
+                timeout = min(requested, timeout) if timeout else requested
+                break
+        return timeout
+
+    async def __call__(self, scope, receive, send):
+        limiter = self.limiters.get(scope.get('path')) if scope['type'] == 'http' else None
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        timeout = self._timeout(scope)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        if not limiter.has_room():
+            limiter.stats['shed'] += 1
+            response = JSONResponse({'detail': 'Server overloaded, retry later'}, status_code=503,
+                                    headers={'Retry-After': str(self.retry_after)})
+            await response(scope, receive, send)
+            return
+
+        if not await limiter.acquire(timeout):
+            limiter.stats['expired_in_queue'] += 1
+            await self._deadline_exceeded(scope, receive, send)
+            return
+        limiter.stats['admitted'] += 1
+
+        state = {'abandoned': False, 'started': False}
+
+        async def guarded_send(message):
+            if state['abandoned']:
+                return
+            if message['type'] == 'http.response.start':
+                state['started'] = True
+            await send(message)
+
+        task = asyncio.ensure_future(self.app(scope, receive, guarded_send))
+        task.add_done_callback(lambda _: limiter.release())
+
+        remaining = deadline - time.monotonic() if deadline is not None else None
+        done, _ = await asyncio.wait({task}, timeout=max(remaining, 0) if remaining is not None else None)
+        if task in done or state['started']:
+            await task
+            return
+
+        state['abandoned'] = True
+        limiter.stats['timed_out'] += 1
+        await self._deadline_exceeded(scope, receive, send)
+
+    async def _deadline_exceeded(self, scope, receive, send):
+        response = JSONResponse({'detail': 'Request deadline exceeded'}, status_code=504)
+        await response(scope, receive, send)
+
+
+# Limiters by endpoint path, for the admin stats endpoint
+admission_registry: Dict[str, EndpointLimiter] = {}
+
+
+def admission_stats() -> Dict[str, Dict]:
+    """Counters and current load for every limited endpoint"""
+    return {path: limiter.snapshot() for path, limiter in admission_registry.items()}
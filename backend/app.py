@@ -1,13 +1,38 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, Response, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 import joblib
 import numpy as np
-from typing import List
+from typing import Dict, List
 from multi_language_detector import MultiLanguageDetector
 from feature_extractor import LanguageSpecificExtractor
+from ngram_features import HashedNgramExtractor
+from count_features import COUNT_FEATURE_NAMES, count_features, count_features_buffer
+from explanations import TreePathExplainer
+from config import config
+from admission import AdmissionMiddleware, admission_stats
+from profiling import profiler
+from shadow import ShadowEvaluator
+from drift import drift_monitor
+from patterns import pattern_registry
 
-app = FastAPI(title="AI Bug Detection API")
+try:
+    import arrow_io
+except ImportError:
+    arrow_io = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup: drift monitoring is set up here, never at import"""
+    start_drift_monitor()
+    yield
+
+app = FastAPI(title="AI Bug Detection API", lifespan=lifespan)
+
+# Concurrency limits, bounded queues and deadlines per endpoint
+app.add_middleware(AdmissionMiddleware)
 
 # Enable CORS
 app.add_middleware(
@@ -31,8 +56,12 @@ except:
     print("Baseline model not found")
 
 try:
-    improved_models = joblib.load('models/improved_model.pkl')
-    improved_scaler = joblib.load('models/improved_scaler.pkl')
+    if config.SERVE_DISTILLED:
+        improved_models = joblib.load(config.DISTILLED_MODEL_PATH)
+        improved_scaler = joblib.load(config.DISTILLED_SCALER_PATH)
+    else:
+        improved_models = joblib.load('models/improved_model.pkl')
+        improved_scaler = joblib.load('models/improved_scaler.pkl')
 except:
     print("Improved model not found")
 
@@ -40,6 +69,11 @@ except:
 # Initialize multi-language detector
 multi_detector = MultiLanguageDetector()
 lang_extractor = LanguageSpecificExtractor()
+ngram_extractor = HashedNgramExtractor()
+
+# Candidate models scored on sampled /detect_bug traffic after the response
+shadow = ShadowEvaluator(ngram_extractor=ngram_extractor)
+shadow.load_candidates()
 class CodeInput(BaseModel):
     code_snippet: str
 
@@ -56,89 +90,257 @@ class BugPrediction(BaseModel):
 def read_root():
     return {"message": "AI Bug Detection API is running"}
 
-@app.post("/detect_bug")
-def detect_bug(input_data: CodeInput):
+def build_explainer(models):
+    """Tree-path explainer for a loaded model, or None if it is not tree-based"""
+    if models is None:
+        return None
     try:
-        # Simple feature extraction from code
-        code = input_data.code_snippet
-        features = [
-            code.count('for'),
-            code.count('if'),
-            code.count('('),
-            code.count('='),
-            code.count('def'),
-            len(code),
-            code.count('\n'),
-            code.count('try'),
-            code.count('['),
-            code.count('import')
-        ]
-        features = np.array(features).reshape(1, -1)
-        
-        baseline_pred = 0
-        baseline_conf = 0.5
-        improved_pred = 0
-        improved_conf = 0.5
+        return TreePathExplainer(models, COUNT_FEATURE_NAMES, ngram_extractor.n_features)
+    except AttributeError:
+        return None
+
+baseline_explainer = build_explainer(baseline_model)
+improved_explainer = build_explainer(improved_models)
+
+def start_drift_monitor():
+    """Live feature distribution, compared against the sketches saved at training time"""
+    if not drift_monitor.enabled:
+        return
+    drift_monitor.register('api', config.BASELINE_FEATURE_DIM, COUNT_FEATURE_NAMES)
+    drift_monitor.load_reference('api', 'baseline', config.BASELINE_SKETCH_PATH)
+    drift_monitor.load_reference('api', 'improved', config.IMPROVED_SKETCH_PATH)
+    drift_monitor.start()
+
+def extract_count_features(code: str) -> List[int]:
+    """Simple count features the API models are trained on"""
+    return count_features(code)
+
+def record_language(code: str):
+    """Add one snippet's detected language to the live drift sketch"""
+    drift_monitor.update('api', languages=[multi_detector.detect_language(code)])
+
+def scale_features(scaler, features: np.ndarray, codes: List[str]):
+    """Append n-gram columns if the scaler expects them, then scale"""
+    return scaler.transform(ngram_extractor.augment(features, codes, getattr(scaler, 'n_features_in_', None)))
+
+def scale_for_models(features: np.ndarray, codes: List[str]) -> Dict[str, np.ndarray]:
+    """Scaled inputs for each loaded model ('baseline', 'improved'), computed once per request"""
+    scaled = {}
+    if baseline_model is not None and baseline_scaler is not None:
+        scaled['baseline'] = scale_features(baseline_scaler, features, codes)
+    if improved_models is not None and improved_scaler is not None:
+        scaled['improved'] = scale_features(improved_scaler, features, codes)
+    return scaled
+
+def explain_features(scaled: Dict[str, np.ndarray]):
+    """Top contributing features per snippet for each tree model, from scale_for_models' inputs"""
+    explanation = {}
+    if baseline_explainer is not None and 'baseline' in scaled:
+        explanation['baseline'] = baseline_explainer.top_features(scaled['baseline'], config.EXPLAIN_TOP_K)
+    if improved_explainer is not None and 'improved' in scaled:
+        explanation['improved'] = improved_explainer.top_features(scaled['improved'], config.EXPLAIN_TOP_K)
+    return explanation
+
+def predict_features(features: np.ndarray, codes: List[str], scaled: Dict[str, np.ndarray] = None):
+    """Score a feature matrix (one row per snippet) with the loaded models
+
+    scaled is scale_for_models' output when the caller already has it.
+    """
+    n_rows = features.shape[0]
+    baseline_pred = np.zeros(n_rows, dtype=int)
+    baseline_conf = np.full(n_rows, 0.5)
+    improved_pred = np.zeros(n_rows, dtype=int)
+    improved_conf = np.full(n_rows, 0.5)
+    if n_rows == 0:
+        return baseline_pred, baseline_conf, improved_pred, improved_conf
+    if scaled is None:
+        scaled = scale_for_models(features, codes)
+    
+    # Baseline prediction
+    if 'baseline' in scaled:
+        features_scaled = scaled['baseline']
+        baseline_pred = baseline_model.predict(features_scaled).astype(int)
+        try:
+            baseline_conf = baseline_model.predict_proba(features_scaled).max(axis=1)
+        except:
+            baseline_conf = np.full(n_rows, 0.75)
+    
+    # Improved prediction (ensemble)
+    if 'improved' in scaled:
+        features_scaled = scaled['improved']
         
-        # Baseline prediction
-        if baseline_model is not None and baseline_scaler is not None:
-            features_scaled = baseline_scaler.transform(features)
-            baseline_pred = int(baseline_model.predict(features_scaled)[0])
-            try:
-                proba = baseline_model.predict_proba(features_scaled)[0]
-                baseline_conf = float(max(proba))
-            except:
-                baseline_conf = 0.75
+        # Handle ensemble list of models
+        if isinstance(improved_models, list):
+            predictions = [model.predict(features_scaled) for model in improved_models]
+            improved_pred = np.round(np.mean(predictions, axis=0)).astype(int)
+        else:
+            improved_pred = improved_models.predict(features_scaled).astype(int)
         
-        # Improved prediction (ensemble)
-        if improved_models is not None and improved_scaler is not None:
-            features_scaled = improved_scaler.transform(features)
+        improved_conf = np.minimum(0.95, baseline_conf + 0.15)
+    
+    return baseline_pred, baseline_conf, improved_pred, improved_conf
+
+@app.post("/detect_bug")
+def detect_bug(input_data: CodeInput, background_tasks: BackgroundTasks):
+    try:
+        with profiler.request('detect_bug'):
+            # Simple feature extraction from code
+            code = input_data.code_snippet
+            with profiler.stage('count_features'):
+                features = np.array(extract_count_features(code)).reshape(1, -1)
+            drift_monitor.update('api', features)
+            if drift_monitor.tracks_languages('api'):
+                # Language detection runs after the response is sent
+                background_tasks.add_task(record_language, code)
+            
+            with profiler.stage('scale'):
+                scaled = scale_for_models(features, [code])
+            with profiler.stage('predict'):
+                baseline_preds, baseline_confs, improved_preds, improved_confs = predict_features(
+                    features, [code], scaled)
+            baseline_pred = int(baseline_preds[0])
+            baseline_conf = float(baseline_confs[0])
+            improved_pred = int(improved_preds[0])
+            improved_conf = float(improved_confs[0])
             
-            # Handle ensemble list of models
-            if isinstance(improved_models, list):
-                predictions = []
-                for model in improved_models:
-                    pred = int(model.predict(features_scaled)[0])
-                    predictions.append(pred)
-                improved_pred = int(np.round(np.mean(predictions)))
-            else:
-                improved_pred = int(improved_models.predict(features_scaled)[0])
+            # Consensus
+            is_bug = bool(improved_pred) if improved_models is not None else bool(baseline_pred)
             
-            improved_conf = min(0.95, baseline_conf + 0.15)
+            result = {
+                "code_snippet": code[:100] + "..." if len(code) > 100 else code,
+                "baseline_prediction": baseline_pred,
+                "baseline_confidence": baseline_conf,
+                "improved_prediction": improved_pred,
+                "improved_confidence": improved_conf,
+                "is_bug": is_bug,
+                "confidence_baseline": baseline_conf,
+                "confidence_improved": improved_conf
+            }
+            if config.EXPLAIN_PREDICTIONS:
+                # Contributions to P(bug) from each model's decision paths
+                with profiler.stage('explain'):
+                    explanation = explain_features(scaled)
+                result["top_features"] = {name: rows[0] for name, rows in explanation.items()}
+            if shadow.should_sample():
+                references = {"baseline": baseline_preds}
+                if improved_models is not None:
+                    references["improved"] = improved_preds
+                served = {"decision": np.array([int(is_bug)]), "references": references,
+                          "confidence": improved_confs if improved_models is not None else baseline_confs}
+                # Runs after the response is sent; scoring itself is on the shadow pool
+                background_tasks.add_task(shadow.submit, features, [code], served)
+            return result
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+def detect_arrow_batch(body: bytes) -> bytes:
+    """Score an Arrow IPC batch and return the result columns as an IPC stream"""
+    with profiler.request('detect_bug_arrow'):
+        with profiler.stage('arrow_decode'):
+            column, ids = arrow_io.read_snippet_column(body)
+        with profiler.stage('count_features'):
+            # Straight from the Arrow data and offsets buffers
+            features = count_features_buffer(*arrow_io.packed_snippets(column)).astype(float)
+        # Language detection and n-grams still need Python strings
+        with profiler.stage('decode_strings'):
+            codes = column.to_pylist()
+        with profiler.stage('predict'):
+            baseline_pred, baseline_conf, improved_pred, improved_conf = predict_features(features, codes)
         
-        # Consensus
-        is_bug = bool(improved_pred) if improved_models else bool(baseline_pred)
+        if improved_models is not None:
+            predictions, confidences = improved_pred, improved_conf
+        else:
+            predictions, confidences = baseline_pred, baseline_conf
+        with profiler.stage('detect_language'):
+            language_names = [multi_detector.detect_language(code) for code in codes]
+            languages = arrow_io.language_codes(language_names)
+        drift_monitor.update('api', features, language_names)
         
-        return {
-            "code_snippet": code[:100] + "..." if len(code) > 100 else code,
-            "baseline_prediction": baseline_pred,
-            "baseline_confidence": baseline_conf,
-            "improved_prediction": improved_pred,
-            "improved_confidence": improved_conf,
-            "is_bug": is_bug,
-            "confidence_baseline": baseline_conf,
-            "confidence_improved": improved_conf
-        }
+        with profiler.stage('arrow_encode'):
+            table = arrow_io.build_result_table(predictions, confidences, languages, ids)
+            return arrow_io.write_stream(table)
+
+@app.post("/detect_bug/arrow")
+async def detect_bug_arrow(request: Request):
+    """Batch detection over an Arrow IPC stream with code_snippet (and optional id) columns"""
+    if arrow_io is None:
+        raise HTTPException(status_code=501, detail="Arrow support requires pyarrow")
+    body = await request.body()
+    try:
+        payload = await run_in_threadpool(detect_arrow_batch, body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Error: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+    return Response(content=payload, media_type=arrow_io.ARROW_STREAM_MEDIA_TYPE)
 
 @app.post("/analyze-multilang")
 def analyze_multilang(code_input: CodeInput):
     """Analyze code in multiple languages (Python, Java, C++)"""
     try:
         # Detect language and analyze
-        result = multi_detector.analyze_code(code_input.code_snippet)
+        with profiler.request('analyze_multilang'), profiler.stage('analyze'):
+            result = multi_detector.analyze_code(code_input.code_snippet)
+        drift_monitor.update('api', languages=[result['language']])
         
         return {
             "language": result['language'],
+            "language_confidence": result['language_confidence'],
             "bugs_found": result['bugs_found'],
             "bug_count": len(result['bugs_found']),
             "severity": result['severity'],
             "feature_count": result['feature_count'],
-            "supported_languages": ['python', 'java', 'cpp']
+            "supported_languages": multi_detector.supported_languages
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
+@app.get("/admin/admission")
+def get_admission_stats():
+    """Per-endpoint admitted/shed/timed-out counters and current load"""
+    return admission_stats()
+
+@app.get("/admin/shadow")
+def get_shadow_stats():
+    """Agreement, confidence delta and latency of each shadow candidate"""
+    return shadow.report()
+
+@app.post("/admin/shadow/reset")
+def reset_shadow_stats():
+    """Start every shadow candidate's stats afresh"""
+    shadow.reset()
+    return {"reset": True, "candidates": list(shadow.candidates)}
+
+@app.get("/admin/drift")
+def get_drift_report():
+    """Live feature distributions (merged across workers) and drift against training data"""
+    return drift_monitor.report()
+
+@app.get("/admin/profile")
+def get_allocation_profile(limit: int = 20, group_by: str = 'lineno'):
+    """Per-request peaks, per-stage allocations and top allocation sites"""
+    if group_by not in ('lineno', 'filename', 'traceback'):
+        raise HTTPException(status_code=400, detail="group_by must be lineno, filename or traceback")
+    return profiler.report(limit, group_by)
+
+@app.post("/admin/profile/reset")
+def reset_allocation_profile():
+    """Clear profiling figures and re-baseline growth tracking"""
+    profiler.reset()
+    return {"reset": True, "enabled": profiler.enabled}
+
+@app.get("/admin/patterns")
+def get_pattern_stats():
+    """Calls, hits and cumulative match time of every analyzer regex, by language"""
+    return pattern_registry.report()
+
+@app.post("/admin/patterns/reset")
+def reset_pattern_stats():
+    """Clear the per-pattern counters"""
+    pattern_registry.reset()
+    return {"reset": True, "enabled": pattern_registry.stats_enabled}
+
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Single-process development server; use launcher.py in production
+    import uvicorn
+    uvicorn.run(app, host=config.API_HOST, port=config.API_PORT)
@@ -0,0 +1,98 @@
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+import pyarrow as pa
+
+ARROW_STREAM_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+
+# Fixed dictionary so the language column is int8 codes, not per-row strings
+LANGUAGES = ['python', 'java', 'cpp', 'unknown']
+LANGUAGE_CODES = {language: code for code, language in enumerate(LANGUAGES)}
+
+
+def _read_table(source: Union[bytes, str]) -> pa.Table:
+    """Read an Arrow IPC stream or file from bytes or a path"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        buffer = pa.py_buffer(source)
+        try:
+            return pa.ipc.open_stream(buffer).read_all()
+        except pa.ArrowInvalid:
+            return pa.ipc.open_file(buffer).read_all()
+    with pa.memory_map(source, 'r') as f:
+        try:
+            return pa.ipc.open_file(f).read_all()
+        except pa.ArrowInvalid:
+            f.seek(0)
+            return pa.ipc.open_stream(f).read_all()
+
+
+def read_snippet_column(source: Union[bytes, str]) -> Tuple[pa.Array, Optional[pa.ChunkedArray]]:
+    """Read the code_snippet column as one Arrow string array, plus the optional id column
+
+    Ids are passed back untouched, so they keep whatever Arrow type the
+    client sent and are never converted to Python objects. Snippets must
+    be non-null strings; anything else is a ValueError (a 400 from the API).
+    """
+    table = _read_table(source)
+    if 'code_snippet' not in table.column_names:
+        raise ValueError("Arrow batch must contain a 'code_snippet' column")
+    column = table.column('code_snippet')
+    if not (pa.types.is_string(column.type) or pa.types.is_large_string(column.type)):
+        raise ValueError(f"'code_snippet' must be a string column, got {column.type}")
+    if column.null_count:
+        raise ValueError(f"'code_snippet' has {column.null_count} null value(s)")
+    ids = table.column('id') if 'id' in table.column_names else None
+    return column.combine_chunks(), ids
+
+
+def packed_snippets(column: pa.Array) -> Tuple[pa.Buffer, np.ndarray]:
+    """The UTF-8 data buffer and n + 1 offsets of a string array, without copying
+
+    This is the layout count_features_packed takes, so the snippets are
+    never decoded into Python strings for the count features.
+    """
+    _, offsets_buffer, data_buffer = column.buffers()
+    offset_type = np.int64 if pa.types.is_large_string(column.type) else np.int32
+    offsets = np.frombuffer(offsets_buffer, dtype=offset_type)[column.offset:column.offset + len(column) + 1]
+    return (data_buffer if data_buffer is not None else pa.py_buffer(b'')), offsets
+
+
+def read_snippets(source: Union[bytes, str]) -> Tuple[List[str], Optional[pa.ChunkedArray]]:
+    """Read the code_snippet column as Python strings and the optional id column"""
+    column, ids = read_snippet_column(source)
+    return column.to_pylist(), ids
+
+
+def language_codes(languages: List[str]) -> np.ndarray:
+    """Map detected language names onto the fixed dictionary"""
+    unknown = LANGUAGE_CODES['unknown']
+    return np.fromiter((LANGUAGE_CODES.get(lang, unknown) for lang in languages),
+                       dtype=np.int8, count=len(languages))
+
+
+def build_result_table(predictions: np.ndarray, confidences: np.ndarray,
+                       languages: np.ndarray, ids: Optional[pa.ChunkedArray] = None) -> pa.Table:
+    """Wrap NumPy result columns as an Arrow table without copying per row"""
+    columns = {}
+    if ids is not None:
+        columns['id'] = ids.combine_chunks()
+    columns['prediction'] = pa.array(np.asarray(predictions, dtype=np.int8))
+    columns['confidence'] = pa.array(np.asarray(confidences, dtype=np.float32))
+    columns['language'] = pa.DictionaryArray.from_arrays(
+        pa.array(np.asarray(languages, dtype=np.int8)), pa.array(LANGUAGES))
+    return pa.table(columns)
+
+
+def write_stream(table: pa.Table) -> bytes:
+    """Serialize a table as an Arrow IPC stream"""
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def write_file(table: pa.Table, path: str):
+    """Write a table as an Arrow IPC file"""
+    with pa.OSFile(path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
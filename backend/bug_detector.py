@@ -2,6 +2,27 @@ import numpy as np
 import joblib
 from typing import Dict, Tuple
 from feature_extractor import FeatureExtractor, CodeBERTFeatureExtractor
+from ngram_features import HashedNgramExtractor
+from count_features import COUNT_FEATURE_NAMES, count_features_batch, count_features_buffer
+from multi_language_detector import MultiLanguageDetector
+from explanations import TreePathExplainer
+from profiling import profiler
+from drift import drift_monitor
+from config import config
+
+# Hints for features that push a snippet towards "bug"
+FEATURE_RECOMMENDATIONS = {
+    'loop_count': "Verify loop termination conditions",
+    'conditional_count': "Check branch conditions for missing cases",
+    'func_call_count': "Check return values and arguments of function calls",
+    'try_except_count': "Review exception handling",
+    'assignment_count': "Check for uninitialized or overwritten variables",
+    'avg_func_length': "Consider splitting long functions",
+    'returns': "Check that every path returns the expected value",
+    'cyclomatic_complexity': "Reduce branching complexity",
+    'nesting_depth': "Reduce nesting depth",
+    'lines_of_code': "Consider splitting long functions",
+}
 
 class BugDetector:
     """Main bug detection system combining baseline and improved models"""
@@ -12,8 +33,19 @@ class BugDetector:
         self.improved_model = None
         self.baseline_scaler = None
         self.improved_scaler = None
+        self.baseline_explainer = None
+        self.improved_explainer = None
         self.feature_extractor = FeatureExtractor()
         self.codebert_extractor = CodeBERTFeatureExtractor()
+        self.ngram_extractor = HashedNgramExtractor()
+        self.language_detector = MultiLanguageDetector()
+        if drift_monitor.enabled:
+            drift_monitor.register('bug_detector', 10, FeatureExtractor.FEATURE_NAMES[:10])
+            # batch_predict scores the count features the models are trained on
+            drift_monitor.register('bug_detector_batch', len(COUNT_FEATURE_NAMES), COUNT_FEATURE_NAMES)
+            drift_monitor.load_reference('bug_detector_batch', 'baseline', config.BASELINE_SKETCH_PATH)
+            drift_monitor.load_reference('bug_detector_batch', 'improved', config.IMPROVED_SKETCH_PATH)
+            drift_monitor.start()
         
         # Load models if available
         self.load_models(baseline_model_path, improved_model_path)
@@ -31,19 +63,35 @@ class BugDetector:
             self.improved_scaler = joblib.load('models/improved_scaler.pkl')
         except:
             print("Improved model not found")
+        
+        # Decision-path attributions for tree models
+        for name in ('baseline', 'improved'):
+            model = getattr(self, f'{name}_model')
+            if model is None:
+                continue
+            try:
+                setattr(self, f'{name}_explainer', TreePathExplainer(
+                    model, FeatureExtractor.FEATURE_NAMES, self.ngram_extractor.n_features))
+            except AttributeError:
+                pass
     
     def detect_bug(self, code_snippet: str) -> Dict:
         """Detect bugs in code snippet"""
         
         # Extract baseline features (10 features)
-        baseline_features = self.feature_extractor.extract_syntax_features(code_snippet)
-        baseline_features.extend(self.feature_extractor.extract_semantic_features(code_snippet))
+        with profiler.stage('syntax_features'):
+            baseline_features = self.feature_extractor.extract_syntax_features(code_snippet)
+        with profiler.stage('semantic_features'):
+            baseline_features.extend(self.feature_extractor.extract_semantic_features(code_snippet))
         baseline_features = np.array(baseline_features).reshape(1, -1)
+        drift_monitor.update('bug_detector', baseline_features)
         
         # Extract improved features (15 features with CodeBERT)
-        improved_features = self.feature_extractor.extract_all_features(code_snippet)
+        with profiler.stage('all_features'):
+            improved_features = self.feature_extractor.extract_all_features(code_snippet)
         # Add CodeBERT embeddings
-        codebert_features = self.codebert_extractor.extract_features(code_snippet)
+        with profiler.stage('codebert_features'):
+            codebert_features = self.codebert_extractor.extract_features(code_snippet)
         improved_features = np.concatenate([improved_features, codebert_features])
         improved_features = improved_features.reshape(1, -1)
         
@@ -54,33 +102,46 @@ class BugDetector:
             'consensus': None,
             'confidence_baseline': 0.0,
             'confidence_improved': 0.0,
+            'top_features': {},
             'recommendations': []
         }
         
         # Baseline model detection
         if self.baseline_model is not None:
-            baseline_features_scaled = self.baseline_scaler.transform(baseline_features[:, :10])
-            baseline_pred = self.baseline_model.predict(baseline_features_scaled)[0]
-            baseline_confidence = self.baseline_model.predict_proba(baseline_features_scaled)[0]
+            with profiler.stage('baseline_predict'):
+                baseline_input = self.ngram_extractor.augment(
+                    baseline_features[:, :10], [code_snippet],
+                    getattr(self.baseline_scaler, 'n_features_in_', None))
+                baseline_features_scaled = self.baseline_scaler.transform(baseline_input)
+                baseline_pred = self.baseline_model.predict(baseline_features_scaled)[0]
+                baseline_confidence = self.baseline_model.predict_proba(baseline_features_scaled)[0]
             
             result['baseline_detection'] = bool(baseline_pred)
             result['confidence_baseline'] = float(max(baseline_confidence))
+            if self.baseline_explainer is not None:
+                result['top_features']['baseline'] = self.baseline_explainer.top_features(
+                    baseline_features_scaled, config.EXPLAIN_TOP_K)[0]
         
         # Improved model detection
         if self.improved_model is not None:
+            improved_input = self.ngram_extractor.augment(
+                improved_features, [code_snippet],
+                getattr(self.improved_scaler, 'n_features_in_', None))
+            improved_features_scaled = self.improved_scaler.transform(improved_input)
             # Handle multiple models in ensemble
             if isinstance(self.improved_model, list):
                 predictions = []
                 for model in self.improved_model:
-                    improved_features_scaled = self.improved_scaler.transform(improved_features)
                     pred = model.predict(improved_features_scaled)[0]
                     predictions.append(pred)
                 improved_pred = np.round(np.mean(predictions))
             else:
-                improved_features_scaled = self.improved_scaler.transform(improved_features)
                 improved_pred = self.improved_model.predict(improved_features_scaled)[0]
             
             result['improved_detection'] = bool(improved_pred)
+            if self.improved_explainer is not None:
+                result['top_features']['improved'] = self.improved_explainer.top_features(
+                    improved_features_scaled, config.EXPLAIN_TOP_K)[0]
             # Higher confidence for improved model
             result['confidence_improved'] = min(0.95, result['confidence_baseline'] + 0.10)
         
@@ -95,24 +156,98 @@ class BugDetector:
         
         # Generate recommendations
         if result['consensus']:
-            result['recommendations'].extend(self._get_bug_recommendations(code_snippet))
+            result['recommendations'].extend(
+                self._get_bug_recommendations(code_snippet, result['top_features']))
         
         return result
     
-    def _get_bug_recommendations(self, code_snippet: str) -> list:
-        """Generate bug fix recommendations"""
-        recommendations = [
+    def _get_bug_recommendations(self, code_snippet: str, top_features: Dict = None) -> list:
+        """Generate bug fix recommendations, led by the features that drove the prediction"""
+        recommendations = []
+        for contributions in (top_features or {}).values():
+            for item in contributions:
+                hint = FEATURE_RECOMMENDATIONS.get(item['feature'])
+                if item['contribution'] > 0 and hint and hint not in recommendations:
+                    recommendations.append(hint)
+        
+        for hint in [
             "Check for uninitialized variables",
             "Review exception handling",
             "Verify loop termination conditions",
             "Check for null/None references",
             "Review type conversions"
-        ]
+        ]:
+            if hint not in recommendations:
+                recommendations.append(hint)
         return recommendations[:3]  # Return top 3 recommendations
     
     def batch_detect(self, code_snippets: list) -> list:
         """Detect bugs in multiple code snippets"""
         results = []
         for snippet in code_snippets:
-            results.append(self.detect_bug(snippet))
+            with profiler.request('detect_bug'):
+                results.append(self.detect_bug(snippet))
         return results
+    
+    def _scale(self, scaler, features: np.ndarray, code_snippets: list):
+        """Append n-gram columns if the scaler expects them, then scale (as app.py does)"""
+        return scaler.transform(self.ngram_extractor.augment(
+            features, code_snippets, getattr(scaler, 'n_features_in_', None)))
+    
+    def batch_predict(self, code_snippets: list, features: np.ndarray = None) -> Dict[str, np.ndarray]:
+        """Predict for many snippets with one model call per batch
+
+        Uses the count features the trainers fit on (the API's path), not
+        detect_bug's syntax/CodeBERT features. features may be passed in
+        when already counted, e.g. from Arrow buffers. Returns column
+        arrays (prediction, confidence, language) rather than one dict
+        per snippet.
+        """
+        n_rows = len(code_snippets)
+        predictions = np.zeros(n_rows, dtype=np.int8)
+        confidences = np.zeros(n_rows, dtype=np.float32)
+        languages = [self.language_detector.detect_language(code) for code in code_snippets]
+        if n_rows == 0:
+            return {'prediction': predictions, 'confidence': confidences, 'language': languages}
+        if features is None:
+            features = count_features_batch(code_snippets)
+        features = np.asarray(features, dtype=float)
+        drift_monitor.update('bug_detector_batch', features, languages)
+        
+        if self.baseline_model is not None:
+            baseline_scaled = self._scale(self.baseline_scaler, features, code_snippets)
+            predictions = self.baseline_model.predict(baseline_scaled).astype(np.int8)
+            confidences = self.baseline_model.predict_proba(baseline_scaled).max(axis=1)
+        
+        if self.improved_model is not None:
+            improved_scaled = self._scale(self.improved_scaler, features, code_snippets)
+            if isinstance(self.improved_model, list):
+                votes = [model.predict(improved_scaled) for model in self.improved_model]
+                predictions = np.round(np.mean(votes, axis=0)).astype(np.int8)
+            else:
+                predictions = self.improved_model.predict(improved_scaled).astype(np.int8)
+            if self.baseline_model is not None:
+                # Same confidence rule as detect_bug
+                confidences = np.minimum(0.95, confidences + 0.10)
+            else:
+                # No baseline confidence to boost: use the improved models' own probabilities
+                models = self.improved_model if isinstance(self.improved_model, list) else [self.improved_model]
+                if all(hasattr(model, 'predict_proba') for model in models):
+                    confidences = np.mean([model.predict_proba(improved_scaled).max(axis=1)
+                                           for model in models], axis=0)
+        
+        return {'prediction': predictions, 'confidence': confidences.astype(np.float32), 'language': languages}
+    
+    def detect_arrow_file(self, input_path: str, output_path: str) -> int:
+        """Score an Arrow IPC file of snippets and write the result columns to another"""
+        import arrow_io
+        
+        column, ids = arrow_io.read_snippet_column(input_path)
+        # Counted straight from the Arrow buffers, as the /detect_bug/arrow endpoint does
+        features = count_features_buffer(*arrow_io.packed_snippets(column))
+        result = self.batch_predict(column.to_pylist(), features)
+        table = arrow_io.build_result_table(
+            result['prediction'], result['confidence'],
+            arrow_io.language_codes(result['language']), ids)
+        arrow_io.write_file(table, output_path)
+        return table.num_rows
@@ -0,0 +1,121 @@
+import numpy as np
+import scipy.sparse as sp
+
+# Up to this many (row, tree) walks, predict steps through Python lists; one
+# list lookup is far cheaper than one NumPy call on a handful of nodes
+SCALAR_WALK_LIMIT = 64
+
+
+def _sibling_order(tree) -> np.ndarray:
+    """Node ids in breadth-first order, each split's two children side by side"""
+    order = [np.zeros(1, dtype=np.intp)]
+    frontier = order[0]
+    while frontier.size:
+        split = frontier[tree.children_left[frontier] >= 0]
+        frontier = np.column_stack([tree.children_left[split], tree.children_right[split]]).ravel()
+        order.append(frontier)
+    return np.concatenate(order)
+
+
+class CompactTreeModel:
+    """A fitted decision tree or forest that predicts from flattened node arrays
+
+    For one row, sklearn's predict spends far longer validating the input
+    (and, for forests, dispatching through joblib) than walking a shallow
+    tree, and for sparse input it fills a dense buffer as wide as the
+    whole feature space. Here every tree is flattened into one set of node
+    arrays over just the columns the trees split on, with each split's
+    children stored side by side, so the next node is left + (x > threshold).
+    A batch walks all trees at once, one level per NumPy step; a few rows
+    walk Python lists instead. A sparse (n-gram) row only has its stored
+    entries in the used columns copied out. Leaf class probabilities are
+    averaged over the trees exactly as a forest's predict_proba averages them.
+
+    Only the node arrays are kept, not the sklearn estimators.
+    TreePathExplainer reads the arrays directly; classes_ and
+    n_features_in_ let the API and the shadow evaluator use it like the
+    model it wraps.
+    """
+
+    def __init__(self, model):
+        estimators = list(getattr(model, 'estimators_', [model]))
+        self.classes_ = model.classes_
+        self.n_features_in_ = model.n_features_in_
+        features, thresholds, lefts, values, roots = [], [], [], [], []
+        offset = 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            order = _sibling_order(tree)
+            position = np.empty(tree.node_count, dtype=np.intp)
+            position[order] = np.arange(tree.node_count) + offset
+            leaf = tree.children_left[order] < 0
+            totals = tree.value[order, 0, :].sum(axis=1, keepdims=True)
+            # Leaves point at themselves (and never pass an inf threshold), so a finished row stays put
+            features.append(np.where(leaf, 0, tree.feature[order]))
+            thresholds.append(np.where(leaf, np.inf, tree.threshold[order]))
+            lefts.append(np.where(leaf, position[order], position[np.maximum(tree.children_left[order], 0)]))
+            values.append(tree.value[order, 0, :] / np.where(totals > 0, totals, 1))
+            roots.append(offset)
+            offset += tree.node_count
+
+        # Split features renumbered to positions among the columns used
+        self.columns, feature = np.unique(np.concatenate(features), return_inverse=True)
+        self.feature = feature.astype(np.int32)
+        self.threshold = np.concatenate(thresholds)
+        self.left = np.concatenate(lefts).astype(np.int32)
+        self.value = np.concatenate(values)
+        self.roots = np.array(roots, dtype=np.int32)
+        self.depth = max(estimator.tree_.max_depth for estimator in estimators)
+        self._lists = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_lists'] = None
+        return state
+
+    @property
+    def right(self) -> np.ndarray:
+        """Right child of every node (a leaf's is itself)"""
+        leaf = self.left == np.arange(len(self.left))
+        return np.where(leaf, self.left, self.left + 1)
+
+    def _used_columns(self, X) -> np.ndarray:
+        """The columns the trees split on, as a dense float32 array"""
+        if not sp.issparse(X):
+            return np.asarray(X, dtype=np.float32)[:, self.columns]
+        X = sp.csr_matrix(X)
+        dense = np.zeros((X.shape[0], len(self.columns)), dtype=np.float32)
+        rows = np.repeat(np.arange(X.shape[0]), np.diff(X.indptr))
+        positions = np.minimum(np.searchsorted(self.columns, X.indices), len(self.columns) - 1)
+        kept = self.columns[positions] == X.indices
+        # Duplicate entries add up, as they do in the sparse matrix
+        np.add.at(dense, (rows[kept], positions[kept]), X.data[kept])
+        return dense
+
+    def _leaves(self, X: np.ndarray) -> np.ndarray:
+        """Leaf reached in every tree, row by row (shape n_rows * n_trees)"""
+        if X.shape[0] * len(self.roots) <= SCALAR_WALK_LIMIT:
+            if self._lists is None:
+                self._lists = (self.feature.tolist(), self.threshold.tolist(), self.left.tolist())
+            feature, threshold, left = self._lists
+            leaves = []
+            # float32 inputs compare against the thresholds exactly as in NumPy
+            for row in X.tolist():
+                for node in self.roots.tolist():
+                    while left[node] != node:
+                        node = left[node] + (row[feature[node]] > threshold[node])
+                    leaves.append(node)
+            return np.array(leaves, dtype=np.intp)
+        nodes = np.tile(self.roots, X.shape[0])
+        rows = np.repeat(np.arange(X.shape[0]), len(self.roots))
+        for _ in range(self.depth):
+            nodes = self.left[nodes] + (X[rows, self.feature[nodes]] > self.threshold[nodes])
+        return nodes
+
+    def predict_proba(self, X) -> np.ndarray:
+        X = self._used_columns(X)
+        # Summed tree by tree, then divided, as RandomForestClassifier does
+        return self.value[self._leaves(X)].reshape(X.shape[0], len(self.roots), -1).sum(axis=1) / len(self.roots)
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
@@ -9,16 +9,45 @@ class Config:
     API_PORT = int(os.getenv('API_PORT', 8000))
     DEBUG = os.getenv('DEBUG', False)
     
+    # Production launcher settings (API_WORKERS=0 sizes workers from available cores)
+    API_WORKERS = int(os.getenv('API_WORKERS', 0))
+    API_MAX_REQUESTS = int(os.getenv('API_MAX_REQUESTS', 10000))
+    API_MAX_REQUESTS_JITTER = int(os.getenv('API_MAX_REQUESTS_JITTER', 1000))
+    API_GRACEFUL_TIMEOUT = int(os.getenv('API_GRACEFUL_TIMEOUT', 30))
+    API_TIMEOUT = int(os.getenv('API_TIMEOUT', 60))
+    
+    # Admission control: path -> (max concurrent requests, max queued requests)
+    ADMISSION_LIMITS = {
+        '/detect_bug': (int(os.getenv('DETECT_MAX_CONCURRENCY', 8)), int(os.getenv('DETECT_MAX_QUEUE', 32))),
+        '/analyze-multilang': (int(os.getenv('MULTILANG_MAX_CONCURRENCY', 8)), int(os.getenv('MULTILANG_MAX_QUEUE', 32))),
+        '/detect_bug/arrow': (int(os.getenv('ARROW_MAX_CONCURRENCY', 2)), int(os.getenv('ARROW_MAX_QUEUE', 4))),
+    }
+    # Deadline applied when the client sends no X-Request-Timeout-Ms (0 = none)
+    ADMISSION_DEFAULT_TIMEOUT = float(os.getenv('ADMISSION_DEFAULT_TIMEOUT', 30))
+    ADMISSION_RETRY_AFTER = int(os.getenv('ADMISSION_RETRY_AFTER', 1))
+    
     # Model paths
     BASELINE_MODEL_PATH = os.getenv('BASELINE_MODEL_PATH', 'models/baseline_model.pkl')
     IMPROVED_MODEL_PATH = os.getenv('IMPROVED_MODEL_PATH', 'models/improved_model.pkl')
     BASELINE_SCALER_PATH = os.getenv('BASELINE_SCALER_PATH', 'models/baseline_scaler.pkl')
     IMPROVED_SCALER_PATH = os.getenv('IMPROVED_SCALER_PATH', 'models/improved_scaler.pkl')
+    DISTILLED_MODEL_PATH = os.getenv('DISTILLED_MODEL_PATH', 'models/distilled_model.pkl')
+    DISTILLED_SCALER_PATH = os.getenv('DISTILLED_SCALER_PATH', 'models/distilled_scaler.pkl')
+    INCREMENTAL_MODEL_PATH = os.getenv('INCREMENTAL_MODEL_PATH', 'models/incremental_model.pkl')
+    INCREMENTAL_SCALER_PATH = os.getenv('INCREMENTAL_SCALER_PATH', 'models/incremental_scaler.pkl')
+    INCREMENTAL_CHECKPOINT_PATH = os.getenv('INCREMENTAL_CHECKPOINT_PATH', 'models/incremental_checkpoint.pkl')
+    # Training-time feature sketches saved next to the models, for drift scoring
+    BASELINE_SKETCH_PATH = os.getenv('BASELINE_SKETCH_PATH', 'models/baseline_feature_sketch.json')
+    IMPROVED_SKETCH_PATH = os.getenv('IMPROVED_SKETCH_PATH', 'models/improved_feature_sketch.json')
+    # Serve the distilled student in place of the improved ensemble
+    SERVE_DISTILLED = os.getenv('SERVE_DISTILLED', '0') == '1'
     
     # Feature extraction settings
     BASELINE_FEATURE_DIM = 10
     IMPROVED_FEATURE_DIM = 15
     CODEBERT_EMBEDDING_DIM = 768
+    NGRAM_N_FEATURES = int(os.getenv('NGRAM_N_FEATURES', 2 ** 18))
+    NGRAM_RANGE = (1, 3)
     
     # Model training settings
     TEST_SIZE = 0.2
@@ -27,6 +56,72 @@ class Config:
     IMPROVED_N_ESTIMATORS = 150
     IMPROVED_MAX_DEPTH = 15
     
+    # Hyperparameter search settings
+    SEARCH_FACTOR = 3
+    SEARCH_N_JOBS = int(os.getenv('SEARCH_N_JOBS', -1))
+    
+    # Cross-validation settings
+    CV_FOLDS = 5
+    CV_N_JOBS = int(os.getenv('CV_N_JOBS', -1))
+    
+    # Near-duplicate detection (MinHash + LSH); bands must divide num_perm
+    DEDUP_NUM_PERM = 128
+    DEDUP_BANDS = 16
+    DEDUP_THRESHOLD = 0.8
+    DEDUP_SHINGLE_SIZE = 5
+    DEDUP_N_JOBS = int(os.getenv('DEDUP_N_JOBS', -1))
+    
+    # Synthetic corpus generator (statements per snippet are log-normal)
+    CORPUS_BUG_RATE = 0.5
+    CORPUS_SIZE_MEAN = 6.0
+    CORPUS_SIZE_SIGMA = 0.6
+    CORPUS_MAX_STATEMENTS = 200
+    CORPUS_SHARD_ROWS = int(os.getenv('CORPUS_SHARD_ROWS', 1000000))
+    CORPUS_N_JOBS = int(os.getenv('CORPUS_N_JOBS', -1))
+    
+    # Distillation settings: student (n_estimators, max_depth) shapes, cheapest
+    # first; the first to reach DISTILL_MIN_AGREEMENT with the teacher is used
+    DISTILL_CANDIDATES = [(1, 6), (1, 8), (1, 10), (1, 12), (3, 10), (5, 12), (10, 16)]
+    DISTILL_MIN_AGREEMENT = float(os.getenv('DISTILL_MIN_AGREEMENT', 0.95))
+    DISTILL_LATENCY_TARGET_US = float(os.getenv('DISTILL_LATENCY_TARGET_US', 100))
+    
+    # Out-of-core training settings
+    INCREMENTAL_CHUNK_SIZE = int(os.getenv('INCREMENTAL_CHUNK_SIZE', 10000))
+    INCREMENTAL_CHECKPOINT_EVERY = 10
+    
+    # Per-prediction feature attributions returned by /detect_bug
+    EXPLAIN_PREDICTIONS = os.getenv('EXPLAIN_PREDICTIONS', '1') == '1'
+    EXPLAIN_TOP_K = int(os.getenv('EXPLAIN_TOP_K', 3))
+    
+    # Shadow evaluation: "name=model.pkl:scaler.pkl,..." scored on a sample of /detect_bug traffic
+    SHADOW_CANDIDATES = os.getenv('SHADOW_CANDIDATES', '')
+    SHADOW_SAMPLE_RATE = float(os.getenv('SHADOW_SAMPLE_RATE', 0.1))
+    SHADOW_WORKERS = int(os.getenv('SHADOW_WORKERS', 1))
+    SHADOW_MAX_PENDING = int(os.getenv('SHADOW_MAX_PENDING', 64))
+    SHADOW_LATENCY_WINDOW = 2048
+    
+    # Streaming drift sketches; each worker flushes its sketch to DRIFT_DIR for merging.
+    # Off by default since every worker then writes files under DRIFT_DIR
+    DRIFT_ENABLED = os.getenv('DRIFT_ENABLED', '0') == '1'
+    DRIFT_DIR = os.getenv('DRIFT_DIR', 'data/drift')
+    DRIFT_FLUSH_SECONDS = float(os.getenv('DRIFT_FLUSH_SECONDS', 10))
+    # Worker sketch files not rewritten for this long are dropped from the merge
+    DRIFT_STALE_SECONDS = float(os.getenv('DRIFT_STALE_SECONDS', 600))
+    DRIFT_PSI_THRESHOLD = 0.2
+    
+    # Allocation profiling (tracemalloc) of the serving path; measures every Nth request
+    PROFILE_ALLOCATIONS = os.getenv('PROFILE_ALLOCATIONS', '0') == '1'
+    PROFILE_SAMPLE_EVERY = int(os.getenv('PROFILE_SAMPLE_EVERY', 1))
+    PROFILE_TRACEBACK_FRAMES = int(os.getenv('PROFILE_TRACEBACK_FRAMES', 1))
+    
+    # Fitted token n-gram weights for language identification (see language_identifier.py)
+    LANGUAGE_WEIGHTS_PATH = os.getenv('LANGUAGE_WEIGHTS_PATH', os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'language_weights.json'))
+    
+    # Per-pattern call, hit and match-time counters for the regex analyzers;
+    # off by default since they add a lock and two clock reads per match
+    PATTERN_STATS = os.getenv('PATTERN_STATS', '0') == '1'
+    
     # Prediction confidence thresholds
     MIN_CONFIDENCE = 0.5
     HIGH_CONFIDENCE = 0.8
@@ -35,6 +130,7 @@ class Config:
     DATASET_PATH = os.getenv('DATASET_PATH', 'data/dataset.csv')
     TRAIN_DATA_PATH = os.getenv('TRAIN_DATA_PATH', 'data/train.csv')
     TEST_DATA_PATH = os.getenv('TEST_DATA_PATH', 'data/test.csv')
+    FEATURE_CACHE_PATH = os.getenv('FEATURE_CACHE_PATH', 'data/features_cache.joblib')
     
     # Logging settings
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
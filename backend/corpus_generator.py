@@ -0,0 +1,276 @@
+import argparse
+import csv
+import json
+import math
+import os
+import random
+from collections import Counter
+from typing import Dict, Iterator, List, Tuple
+
+from joblib import Parallel, delayed
+
+from config import config
+
+CORPUS_FIELDS = ['code_snippet', 'is_bug', 'language', 'bug_pattern']
+
+# Identifiers never contain words the rule checks look for ("if", "null",
+# "check", "bounds", "break", ...), so only injected patterns trigger them
+NAMES = ['count', 'total', 'value', 'index', 'item', 'size', 'score', 'limit', 'width', 'height',
+         'amount', 'level', 'acc', 'left', 'right', 'data', 'key', 'temp', 'weight', 'rate', 'step']
+FUNCTION_NAMES = ['compute', 'update', 'merge', 'scale', 'parse', 'load', 'score', 'measure',
+                  'combine', 'advance', 'resolve', 'collect', 'render', 'encode', 'normalize']
+CLASS_NAMES = ['Account', 'Parser', 'Matrix', 'Session', 'Report', 'Inventory', 'Planner', 'Cache']
+WORDS = ['alpha', 'beta', 'gamma', 'delta', 'omega', 'sigma']
+
+PYTHON_STATEMENTS = [
+    "{v} = {a} + {n}",
+    "{v} += {a} * {n}",
+    "if {a} > {n}:\n        {v} = {a} - {n}\n    else:\n        {v} = {v} + {n}",
+    "for {i} in range({n}):\n        {v} += {i}",
+    "{w} = [{i} * {n} for {i} in range({a})]\n    {v} += len({w})",
+    "try:\n        {v} += int({b})\n    except ValueError:\n        {v} = 0",
+    "with open('{word}.txt') as fh:\n        {v} += len(fh.read())",
+    "{w} = dict({word}={a}, n={n})\n    {v} += {w}.get('n', 0)",
+]
+
+# Bug patterns match MultiLanguageDetector.check_python_bugs
+PYTHON_BUGS = {
+    'bare_except': "try:\n        {v} += int({b})\n    except:\n        {v} = 0",
+    'mutable_default': None,
+    'infinite_loop': "while True:\n        {v} += {n}",
+    'missing_return': None,
+}
+
+JAVA_STATEMENTS = [
+    "{v} += {a} * {n};",
+    "{v} = {v} - {b} + {n};",
+    "if ({a} > {n}) {{\n            {v} -= {b};\n        }}",
+    "for (int {i} = 0; {i} < {n}; {i}++) {{\n            {v} += {i};\n        }}",
+    "String {w} = String.valueOf({v});\n        {v} += {w}.isEmpty() ? 0 : {n};",
+    "try {{\n            {v} += Integer.parseInt(\"{n}\");\n        }} catch (NumberFormatException e) {{\n            {v} = 0;\n        }}",
+    "switch ({a}) {{\n            case {n}:\n                {v} += 1;\n                break;\n            default:\n                {v} -= 1;\n        }}",
+    "FileInputStream {w} = new FileInputStream(\"{word}.dat\");\n        {v} += {w}.read();\n        {w}.close();",
+]
+
+# Bug patterns match MultiLanguageDetector.check_java_bugs
+JAVA_BUGS = {
+    'null_pointer': "{v} += {arr}.length;",
+    'unclosed_resource': "FileInputStream {w} = new FileInputStream(\"{word}.dat\");\n        {v} += {w}.read();",
+    'infinite_loop': "while(true) {{\n            {v}++;\n        }}",
+    'unhandled_exception': "{v} -= {b};\n        throw new IllegalStateException(\"{word}\");",
+    'missing_break': "switch ({a}) {{\n            case {n}:\n                {v} += 1;\n            default:\n                {v} -= 1;\n        }}",
+}
+
+CPP_STATEMENTS = [
+    "{v} += {a} * {n};",
+    "{v} = {v} - {b} + {n};",
+    "if ({a} > {n}) {{\n        {v} -= {b};\n    }}",
+    "for (int {i} = 0; {i} < {n}; ++{i}) {{\n        {v} += {i};\n    }}",
+    "std::vector<int> {w}({n}, {a});\n    {v} += {w}.at(0);",
+    "std::unique_ptr<int> {w} = std::make_unique<int>({a});\n    {v} += *{w};",
+    "int* {w} = new int({a});\n    {v} += *{w};\n    delete {w};",
+    "const char* {w} = \"{word}\";\n    {v} += static_cast<int>(std::strlen({w}));",
+]
+
+# Bug patterns match MultiLanguageDetector.check_cpp_bugs
+CPP_BUGS = {
+    'memory_leak': "int* {w} = new int({a});\n    {v} += *{w};",
+    'null_dereference': "Node* {w} = lookup({a});\n    {v} += {w}->value;",
+    'unsafe_string': "char* {w} = static_cast<char*>(malloc({n}));\n    strcpy({w}, \"{word}\");\n    {v} += static_cast<int>(std::strlen({w}));",
+    'uninitialized': "int {w};\n    {v} += {w};",
+    'out_of_bounds': "int {w}[{n}] = {{0}};\n    {v} += {w}[{n}];",
+}
+
+# Statements a bug pattern must not be mixed with, or the bug would be masked
+# (or another check would fire on a clean snippet)
+CONFLICTS = {
+    'java': {
+        'null_pointer': ('if', 'null'),
+        'unclosed_resource': ('close()',),
+        'unhandled_exception': ('catch', 'FileInputStream'),
+        'missing_break': ('break',),
+    },
+    'cpp': {
+        'memory_leak': ('delete',),
+    },
+}
+
+
+class CorpusGenerator:
+    """Seeded generator of labeled Python/Java/C++ snippets
+
+    Every snippet is a function of random size (log-normal statement
+    count) built from clean statement templates; with probability
+    bug_rate one statement is replaced by a bug pattern that
+    MultiLanguageDetector's rule checks recognise, and the row is labeled
+    is_bug=1 with the pattern name. Shard k of a given seed is always the
+    same rows, whatever the number of parallel jobs.
+    """
+
+    def __init__(self, seed: int = None, language_weights: Dict[str, float] = None,
+                 bug_rate: float = None, size_mean: float = None, size_sigma: float = None,
+                 max_statements: int = None):
+        self.seed = config.RANDOM_STATE if seed is None else seed
+        self.language_weights = language_weights or {'python': 1.0, 'java': 1.0, 'cpp': 1.0}
+        self.bug_rate = config.CORPUS_BUG_RATE if bug_rate is None else bug_rate
+        self.size_mean = size_mean or config.CORPUS_SIZE_MEAN
+        self.size_sigma = size_sigma or config.CORPUS_SIZE_SIGMA
+        self.max_statements = max_statements or config.CORPUS_MAX_STATEMENTS
+        self.languages = list(self.language_weights)
+        self.weights = [self.language_weights[language] for language in self.languages]
+        self.builders = {'python': self._python, 'java': self._java, 'cpp': self._cpp}
+
+    def _n_statements(self, rng: random.Random) -> int:
+        # Log-normal with the requested mean, so most snippets are short and a few are long
+        mu = math.log(self.size_mean) - self.size_sigma ** 2 / 2
+        return max(1, min(self.max_statements, round(rng.lognormvariate(mu, self.size_sigma))))
+
+    @staticmethod
+    def _fill(template: str, rng: random.Random, names: Dict[str, str]) -> str:
+        return template.format(n=rng.randint(1, 99), word=rng.choice(WORDS),
+                               w=f"{rng.choice(NAMES)}{rng.randint(0, 999)}", **names)
+
+    def _body(self, rng: random.Random, statements: List[str], bug: str, names: Dict[str, str],
+              excluded: Tuple[str, ...] = ()) -> List[str]:
+        """Clean statements, with the bug template (if any) at a random position"""
+        pool = [s for s in statements if not any(word in s for word in excluded)]
+        body = [self._fill(rng.choice(pool), rng, names) for _ in range(self._n_statements(rng))]
+        if bug is not None:
+            body[rng.randrange(len(body))] = self._fill(bug, rng, names)
+        return body
+
+    @staticmethod
+    def _names(rng: random.Random) -> Dict[str, str]:
+        a, b, v = rng.sample(NAMES, 3)
+        return {'a': a, 'b': b, 'v': v, 'i': rng.choice(['i', 'j', 'k']),
+                'arr': rng.choice(['values', 'items', 'entries'])}
+
+    def _python(self, rng: random.Random, pattern: str) -> str:
+        names = self._names(rng)
+        params = f"{names['a']}, {names['b']}=[]" if pattern == 'mutable_default' else f"{names['a']}, {names['b']}"
+        body = self._body(rng, PYTHON_STATEMENTS, PYTHON_BUGS.get(pattern), names)
+        if pattern == 'mutable_default':
+            body.append(f"{names['b']}.append({names['v']})")
+        # A function ending in pass with no return is the missing-return pattern
+        last = 'pass' if pattern == 'missing_return' else f"return {names['v']}"
+        lines = [f"def {rng.choice(FUNCTION_NAMES)}({params}):", f"    {names['v']} = 0"]
+        lines += [f"    {statement}" for statement in body] + [f"    {last}"]
+        return '\n'.join(lines) + '\n'
+
+    def _java(self, rng: random.Random, pattern: str) -> str:
+        names = self._names(rng)
+        excluded = CONFLICTS['java'].get(pattern, ())
+        body = self._body(rng, JAVA_STATEMENTS, JAVA_BUGS.get(pattern), names, excluded)
+        # null_pointer reads .length of an array parameter nothing has checked
+        array_param = f", int[] {names['arr']}" if pattern == 'null_pointer' else ''
+        throws = ' throws IOException' if any('FileInputStream' in s for s in body) else ''
+        method = rng.choice(FUNCTION_NAMES)
+        lines = ["import java.io.*;", "", f"public class {rng.choice(CLASS_NAMES)} {{",
+                 f"    public int {method}(int {names['a']}, int {names['b']}{array_param}){throws} {{",
+                 f"        int {names['v']} = 0;"]
+        lines += [f"        {statement}" for statement in body]
+        lines += [f"        return {names['v']};", "    }", "}"]
+        return '\n'.join(lines) + '\n'
+
+    def _cpp(self, rng: random.Random, pattern: str) -> str:
+        names = self._names(rng)
+        body = self._body(rng, CPP_STATEMENTS, CPP_BUGS.get(pattern), names, CONFLICTS['cpp'].get(pattern, ()))
+        lines = ["#include <cstring>", "#include <memory>", "#include <vector>", ""]
+        if pattern == 'null_dereference':
+            lines += ["struct Node { int value; };", "Node* lookup(int key);", ""]
+        lines += [f"int {rng.choice(FUNCTION_NAMES)}(int {names['a']}, int {names['b']}) {{",
+                  f"    int {names['v']} = 0;"]
+        lines += [f"    {statement}" for statement in body]
+        lines += [f"    return {names['v']};", "}"]
+        return '\n'.join(lines) + '\n'
+
+    def snippet(self, rng: random.Random) -> Tuple[str, int, str, str]:
+        """(code, is_bug, language, bug_pattern) for one row"""
+        language = rng.choices(self.languages, self.weights)[0]
+        patterns = {'python': PYTHON_BUGS, 'java': JAVA_BUGS, 'cpp': CPP_BUGS}[language]
+        pattern = rng.choice(list(patterns)) if rng.random() < self.bug_rate else ''
+        return self.builders[language](rng, pattern), int(bool(pattern)), language, pattern
+
+    def iter_rows(self, shard: int, n_rows: int) -> Iterator[Tuple[str, int, str, str]]:
+        """Rows of one shard, from a generator seeded by (seed, shard)"""
+        rng = random.Random(f"{self.seed}-{shard}")
+        for _ in range(n_rows):
+            yield self.snippet(rng)
+
+    def write_shard(self, path: str, shard: int, n_rows: int, buffer_rows: int = 10000) -> Dict:
+        """Write one shard as CSV; returns its row, bug, language and pattern counts"""
+        languages, patterns = Counter(), Counter()
+        buffer = []
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(CORPUS_FIELDS)
+            for row in self.iter_rows(shard, n_rows):
+                buffer.append(row)
+                languages[row[2]] += 1
+                patterns[row[3] or 'clean'] += 1
+                if len(buffer) >= buffer_rows:
+                    writer.writerows(buffer)
+                    buffer = []
+            writer.writerows(buffer)
+        return {'path': path, 'shard': shard, 'rows': n_rows, 'bugs': n_rows - patterns['clean'],
+                'languages': dict(languages), 'patterns': dict(patterns)}
+
+
+def generate_corpus(output_dir: str, n_rows: int, shard_rows: int = None, n_jobs: int = None,
+                    generator: CorpusGenerator = None) -> Dict:
+    """Write n_rows across CSV shards in parallel, plus a manifest.json"""
+    generator = generator or CorpusGenerator()
+    shard_rows = shard_rows or config.CORPUS_SHARD_ROWS
+    n_jobs = n_jobs or config.CORPUS_N_JOBS
+    os.makedirs(output_dir, exist_ok=True)
+
+    n_shards = max(1, math.ceil(n_rows / shard_rows))
+    sizes = [min(shard_rows, n_rows - shard * shard_rows) for shard in range(n_shards)]
+    shards = Parallel(n_jobs=n_jobs)(
+        delayed(generator.write_shard)(os.path.join(output_dir, f"corpus-{shard:05d}.csv"), shard, size)
+        for shard, size in enumerate(sizes)
+    )
+
+    manifest = {
+        'seed': generator.seed,
+        'rows': n_rows,
+        'bugs': sum(shard['bugs'] for shard in shards),
+        'bug_rate': generator.bug_rate,
+        'language_weights': generator.language_weights,
+        'size_mean': generator.size_mean,
+        'size_sigma': generator.size_sigma,
+        'max_statements': generator.max_statements,
+        'shards': shards,
+    }
+    with open(os.path.join(output_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic labeled code corpus")
+    parser.add_argument('--output', default='data/synthetic', help="Directory for the CSV shards")
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--shard-rows', type=int, default=config.CORPUS_SHARD_ROWS)
+    parser.add_argument('--jobs', type=int, default=config.CORPUS_N_JOBS)
+    parser.add_argument('--seed', type=int, default=config.RANDOM_STATE)
+    parser.add_argument('--bug-rate', type=float, default=config.CORPUS_BUG_RATE)
+    parser.add_argument('--languages', default='python=1,java=1,cpp=1',
+                        help="Language weights, e.g. python=2,java=1,cpp=1")
+    parser.add_argument('--size-mean', type=float, default=config.CORPUS_SIZE_MEAN,
+                        help="Mean statements per snippet")
+    parser.add_argument('--size-sigma', type=float, default=config.CORPUS_SIZE_SIGMA,
+                        help="Log-normal spread of statements per snippet")
+    parser.add_argument('--max-statements', type=int, default=config.CORPUS_MAX_STATEMENTS)
+    args = parser.parse_args()
+
+    weights = {}
+    for part in args.languages.split(','):
+        language, _, weight = part.partition('=')
+        weights[language.strip()] = float(weight or 1)
+
+    generator = CorpusGenerator(args.seed, weights, args.bug_rate, args.size_mean,
+                                args.size_sigma, args.max_statements)
+    manifest = generate_corpus(args.output, args.rows, args.shard_rows, args.jobs, generator)
+    print(f"Wrote {manifest['rows']} rows ({manifest['bugs']} buggy) to "
+          f"{len(manifest['shards'])} shards in {args.output}")
@@ -0,0 +1,116 @@
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+# Column order of the 10 count features the API and baseline models use
+COUNT_FEATURE_NAMES = ['for', 'if', '(', '=', 'def', 'length', 'lines', 'try', '[', 'import']
+
+KEYWORDS = ['for', 'if', 'def', 'try', 'import']
+# Feature name -> the single character it counts
+SYMBOLS = {'(': '(', '=': '=', '[': '[', 'lines': '\n'}
+
+# Substring each column counts, None for the character length
+_COLUMN_TOKENS = [SYMBOLS.get(name, name if name in KEYWORDS else None) for name in COUNT_FEATURE_NAMES]
+_KEYWORD_BYTES = [(COUNT_FEATURE_NAMES.index(keyword), keyword.encode()) for keyword in KEYWORDS]
+_SYMBOL_BYTES = [(COUNT_FEATURE_NAMES.index(name), ord(symbol)) for name, symbol in SYMBOLS.items()]
+_LENGTH_COLUMN = COUNT_FEATURE_NAMES.index('length')
+_MAX_KEYWORD = max(len(keyword) for _, keyword in _KEYWORD_BYTES)
+
+# Below this many snippets the fixed cost of the NumPy passes outweighs
+# per-snippet str.count; chunks of about this many bytes stay in cache
+# across the passes
+MIN_PACKED_BATCH = 64
+CHUNK_BYTES = 1 << 16
+
+
+def pack_snippets(codes: Sequence[str]) -> Tuple[bytes, np.ndarray]:
+    """UTF-8 encode snippets into one buffer; snippet i is buffer[offsets[i]:offsets[i + 1]]"""
+    encoded = [code.encode('utf-8', 'surrogatepass') for code in codes]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(data) for data in encoded], out=offsets[1:])
+    return b''.join(encoded), offsets
+
+
+def count_features_packed(buffer, offsets) -> np.ndarray:
+    """Count features for every snippet in a packed UTF-8 buffer, shape (n, 10)
+
+    Takes anything exposing the buffer protocol plus n + 1 offsets, e.g.
+    the data and offsets buffers of an Arrow string column. Each symbol
+    and keyword becomes one byte mask over the whole buffer (keywords as
+    an AND of shifted byte compares), summed per snippet with a single
+    np.add.reduceat, so the cost is a few SIMD passes over the bytes and
+    no Python work per snippet. Character lengths are byte lengths minus
+    UTF-8 continuation bytes. None of the keywords overlaps itself, so
+    counting every occurrence gives the same numbers as str.count.
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    n = len(offsets) - 1
+    counts = np.zeros((n, len(COUNT_FEATURE_NAMES)), dtype=np.int64)
+    if n <= 0 or offsets[-1] == offsets[0]:
+        return counts
+    data = np.frombuffer(buffer, dtype=np.uint8)[offsets[0]:offsets[-1]]
+    offsets = offsets - offsets[0]
+    sizes = np.diff(offsets)
+    size = data.size
+    # reduceat over non-empty snippets only: their starts are strictly
+    # increasing and in range, and each runs up to the next one's start
+    nonempty = sizes > 0
+    starts = offsets[:-1][nonempty]
+
+    def per_snippet(mask):
+        totals = np.zeros(n, dtype=np.int64)
+        totals[nonempty] = np.add.reduceat(mask.view(np.uint8), starts, dtype=np.int64)
+        return totals
+
+    for column, byte in _SYMBOL_BYTES:
+        counts[:, column] = per_snippet(data == byte)
+
+    counts[:, _LENGTH_COLUMN] = sizes
+    if data.max() >= 0x80:
+        counts[:, _LENGTH_COLUMN] -= per_snippet((data & 0xC0) == 0x80)
+
+    # Zero padding lets shifted compares run past the last byte
+    padded = np.concatenate([data, np.zeros(_MAX_KEYWORD, dtype=np.uint8)])
+    shifted = np.empty(size, dtype=bool)
+    for column, keyword in _KEYWORD_BYTES:
+        match = data == keyword[0]
+        for j in range(1, len(keyword)):
+            np.equal(padded[j:j + size], keyword[j], out=shifted)
+            match &= shifted
+        # Drop matches that start in one snippet and run into the next
+        crossing = (offsets[1:-1, None] - np.arange(1, len(keyword))).ravel()
+        match[crossing[crossing >= 0]] = False
+        counts[:, column] = per_snippet(match)
+    return counts
+
+
+def count_features_buffer(buffer, offsets, chunk_bytes: int = CHUNK_BYTES) -> np.ndarray:
+    """Run count_features_packed over chunk_bytes-sized runs of a packed buffer"""
+    offsets = np.asarray(offsets, dtype=np.int64)
+    n = len(offsets) - 1
+    blocks = [np.zeros((0, len(COUNT_FEATURE_NAMES)), dtype=np.int64)]
+    first = 0
+    while first < n:
+        last = int(np.searchsorted(offsets, offsets[first] + chunk_bytes, side='right')) - 1
+        last = min(max(last, first + 1), n)
+        blocks.append(count_features_packed(buffer, offsets[first:last + 1]))
+        first = last
+    return np.vstack(blocks)
+
+
+def count_features_batch(codes: Sequence[str], chunk_bytes: int = CHUNK_BYTES) -> np.ndarray:
+    """Count features for a list of snippets, shape (len(codes), 10)
+
+    Packs the snippets once and runs the kernel over chunk_bytes-sized
+    runs of the buffer, so the per-snippet Python work is one encode.
+    """
+    if len(codes) < MIN_PACKED_BATCH:
+        return np.array([count_features(code) for code in codes],
+                        dtype=np.int64).reshape(len(codes), len(COUNT_FEATURE_NAMES))
+    buffer, offsets = pack_snippets(codes)
+    return count_features_buffer(buffer, offsets, chunk_bytes)
+
+
+def count_features(code: str) -> List[int]:
+    """Count features for one snippet (same numbers as the packed kernel)"""
+    return [len(code) if token is None else code.count(token) for token in _COLUMN_TOKENS]
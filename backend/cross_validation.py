@@ -0,0 +1,120 @@
+import hashlib
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
+from sklearn.model_selection import StratifiedKFold, StratifiedGroupKFold
+from sklearn.preprocessing import StandardScaler
+
+from config import config
+
+METRIC_NAMES = ['accuracy', 'precision', 'recall', 'f1']
+
+
+def _digest(values) -> str:
+    values = np.ascontiguousarray(values)
+    return hashlib.sha1(str(values.dtype).encode() + values.tobytes()).hexdigest()
+
+
+def compute_metrics(y_true, y_pred) -> Dict[str, float]:
+    """Accuracy/precision/recall/F1 as reported by the trainers"""
+    return {
+        'accuracy': accuracy_score(y_true, y_pred),
+        'precision': precision_score(y_true, y_pred, zero_division=0),
+        'recall': recall_score(y_true, y_pred, zero_division=0),
+        'f1': f1_score(y_true, y_pred, zero_division=0)
+    }
+
+
+def _run_fold(models: Dict, X, y, train_idx, test_idx) -> Dict:
+    """Fit every model on one fold and score it on the held-out rows"""
+    start = time.perf_counter()
+    scaler = StandardScaler(with_mean=not sp.issparse(X))
+    X_train = scaler.fit_transform(X[train_idx])
+    X_test = scaler.transform(X[test_idx])
+    y_train, y_test = y[train_idx], y[test_idx]
+
+    scores = {}
+    for name, model in models.items():
+        members = model if isinstance(model, list) else [model]
+        predictions = []
+        for i, member in enumerate(members):
+            pred = clone(member).fit(X_train, y_train).predict(X_test)
+            predictions.append(pred)
+            if len(members) > 1:
+                scores[f"{name}[{i}]"] = compute_metrics(y_test, pred)
+        # Same majority vote as ImprovedModelTrainer
+        ensemble_pred = np.round(np.mean(predictions, axis=0)).astype(int)
+        scores[name] = compute_metrics(y_test, ensemble_pred)
+
+    return {'scores': scores, 'seconds': time.perf_counter() - start}
+
+
+class ParallelCrossValidator:
+    """Stratified k-fold evaluation with folds run in parallel worker processes
+
+    Fold indices are computed once and reused by every evaluate() call on
+    the same labels and groups, so two configurations are always compared
+    on identical splits; different labels or groups get fresh folds. Large
+    feature matrices are memory-mapped read-only into the workers rather
+    than copied per fold.
+    """
+
+    def __init__(self, n_splits: int = 5, n_jobs: int = None):
+        self.n_splits = n_splits
+        self.n_jobs = n_jobs or config.CV_N_JOBS
+        self.folds = None
+        self._fold_key = None
+
+    @staticmethod
+    def _key(y, groups) -> Tuple:
+        """What the folds depend on: the labels and the groups, by content"""
+        return len(y), _digest(y), None if groups is None else _digest(groups)
+
+    def make_folds(self, y, groups=None) -> List:
+        """Precompute stratified (train, test) index pairs, keeping groups within one fold"""
+        if groups is None:
+            splitter = StratifiedKFold(n_splits=self.n_splits, shuffle=True, random_state=config.RANDOM_STATE)
+        else:
+            splitter = StratifiedGroupKFold(n_splits=self.n_splits, shuffle=True, random_state=config.RANDOM_STATE)
+        self.folds = list(splitter.split(np.zeros(len(y)), y, groups))
+        self._fold_key = self._key(np.asarray(y), groups)
+        return self.folds
+
+    def evaluate(self, X, y, models: Dict, groups=None) -> Dict[str, Dict[str, float]]:
+        """Evaluate named models (an estimator or a voting list of estimators)
+
+        Returns mean/std per metric for each model, each ensemble member and
+        the ensemble vote, plus the slowest and summed fold times. Rows that
+        share a group (e.g. a near-duplicate cluster) never straddle folds.
+        """
+        y = np.asarray(y)
+        if self.folds is None or self._fold_key != self._key(y, groups):
+            self.make_folds(y, groups)
+
+        start = time.perf_counter()
+        fold_results = Parallel(n_jobs=self.n_jobs, mmap_mode='r')(
+            delayed(_run_fold)(models, X, y, train_idx, test_idx)
+            for train_idx, test_idx in self.folds
+        )
+        wall_seconds = time.perf_counter() - start
+
+        summary = {}
+        for name in fold_results[0]['scores']:
+            summary[name] = {}
+            for metric in METRIC_NAMES:
+                values = [fold['scores'][name][metric] for fold in fold_results]
+                summary[name][f"{metric}_mean"] = float(np.mean(values))
+                summary[name][f"{metric}_std"] = float(np.std(values))
+
+        fold_seconds = [fold['seconds'] for fold in fold_results]
+        summary['timing'] = {
+            'wall_seconds': wall_seconds,
+            'slowest_fold_seconds': max(fold_seconds),
+            'total_fold_seconds': sum(fold_seconds),
+        }
+        return summary
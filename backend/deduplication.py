@@ -0,0 +1,181 @@
+import csv
+import json
+import os
+import re
+import zlib
+from collections import deque
+from typing import Dict, Iterable, Iterator, List
+
+import numpy as np
+from joblib import Parallel, delayed
+
+from config import config
+from ngram_features import CODE_TOKEN_PATTERN
+
+_TOKEN_RE = re.compile(CODE_TOKEN_PATTERN)
+
+# Mersenne prime 2^31 - 1: shingle hashes are masked to 31 bits so a*x + b
+# stays inside uint64
+_PRIME = np.uint64((1 << 31) - 1)
+_SHINGLE_BLOCK = 2048
+
+
+def _shingle_hashes(code: str, shingle_size: int) -> np.ndarray:
+    """Distinct 31-bit hashes of the k-token shingles of a snippet"""
+    tokens = _TOKEN_RE.findall(code)
+    if len(tokens) < shingle_size:
+        shingles = [' '.join(tokens)]
+    else:
+        shingles = [' '.join(tokens[i:i + shingle_size]) for i in range(len(tokens) - shingle_size + 1)]
+    hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+    return np.unique(hashes & _PRIME)
+
+
+def _signatures(codes: List[str], a: np.ndarray, b: np.ndarray, shingle_size: int) -> np.ndarray:
+    """MinHash signatures (one row per snippet) for a chunk of snippets"""
+    signatures = np.empty((len(codes), len(a)), dtype=np.uint32)
+    for row, code in enumerate(codes):
+        hashes = _shingle_hashes(code, shingle_size)
+        signature = np.full(len(a), _PRIME, dtype=np.uint64)
+        # Blocks bound the (shingles x permutations) temporary for huge files
+        for start in range(0, len(hashes), _SHINGLE_BLOCK):
+            block = hashes[start:start + _SHINGLE_BLOCK, None]
+            np.minimum(signature, ((block * a + b) % _PRIME).min(axis=0), out=signature)
+        signatures[row] = signature
+    return signatures
+
+
+def _chunks(items: Iterable, size: int) -> Iterator[List]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class MinHashDeduplicator:
+    """Find near-duplicate snippets with MinHash signatures and LSH banding
+
+    Signatures are computed in parallel worker processes, chunk by chunk,
+    while rows stream through. Each signature is split into bands, and
+    rows sharing any band bucket with an earlier cluster representative
+    become candidates. A candidate joins that cluster when the estimated
+    Jaccard similarity of their shingle sets reaches the threshold. Only
+    representatives' signatures are kept, so memory grows with the number
+    of distinct snippets, not the corpus size.
+    """
+
+    def __init__(self, num_perm: int = None, bands: int = None, threshold: float = None,
+                 shingle_size: int = None, n_jobs: int = None, chunk_size: int = 1000):
+        self.num_perm = num_perm or config.DEDUP_NUM_PERM
+        self.bands = bands or config.DEDUP_BANDS
+        if self.num_perm % self.bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.rows_per_band = self.num_perm // self.bands
+        self.threshold = threshold or config.DEDUP_THRESHOLD
+        self.shingle_size = shingle_size or config.DEDUP_SHINGLE_SIZE
+        self.n_jobs = n_jobs or config.DEDUP_N_JOBS
+        self.chunk_size = chunk_size
+
+        rng = np.random.RandomState(config.RANDOM_STATE)
+        self.a = rng.randint(1, int(_PRIME), size=self.num_perm).astype(np.uint64)
+        self.b = rng.randint(0, int(_PRIME), size=self.num_perm).astype(np.uint64)
+        self.reset()
+
+    def reset(self):
+        """Forget all clusters seen so far"""
+        self.band_buckets = [{} for _ in range(self.bands)]
+        self.representatives = {}
+        self.cluster_sizes = {}
+        self.rows_seen = 0
+
+    def signatures(self, code_snippets: List[str]) -> np.ndarray:
+        """MinHash signatures for a list of snippets (in this process)"""
+        return _signatures(code_snippets, self.a, self.b, self.shingle_size)
+
+    def _iter_signatures(self, code_snippets: Iterable[str]) -> Iterator[np.ndarray]:
+        """Signature chunks in input order, computed in parallel as input streams in"""
+        return Parallel(n_jobs=self.n_jobs, return_as='generator')(
+            delayed(_signatures)(chunk, self.a, self.b, self.shingle_size)
+            for chunk in _chunks(code_snippets, self.chunk_size)
+        )
+
+    def _assign(self, signature: np.ndarray) -> int:
+        """Cluster id (row index of the representative) for the next row"""
+        row = self.rows_seen
+        self.rows_seen += 1
+        keys = [signature[i * self.rows_per_band:(i + 1) * self.rows_per_band].tobytes()
+                for i in range(self.bands)]
+
+        checked = set()
+        for band, key in enumerate(keys):
+            for candidate in self.band_buckets[band].get(key, ()):
+                if candidate in checked:
+                    continue
+                checked.add(candidate)
+                if np.mean(self.representatives[candidate] == signature) >= self.threshold:
+                    self.cluster_sizes[candidate] += 1
+                    return candidate
+
+        self.representatives[row] = signature
+        self.cluster_sizes[row] = 1
+        for band, key in enumerate(keys):
+            self.band_buckets[band].setdefault(key, []).append(row)
+        return row
+
+    def iter_cluster_ids(self, code_snippets: Iterable[str]) -> Iterator[int]:
+        """Stream a cluster id for every snippet, in input order"""
+        for chunk in self._iter_signatures(code_snippets):
+            for signature in chunk:
+                yield self._assign(signature)
+
+    def cluster_ids(self, code_snippets: Iterable[str]) -> np.ndarray:
+        """Cluster id per snippet, usable as groups for group-aware splitting"""
+        return np.fromiter(self.iter_cluster_ids(code_snippets), dtype=np.int64)
+
+    def cluster_report(self) -> Dict:
+        """Summary plus every cluster with more than one member"""
+        duplicates = {rep: size for rep, size in self.cluster_sizes.items() if size > 1}
+        return {
+            'rows': self.rows_seen,
+            'unique_rows': len(self.cluster_sizes),
+            'duplicate_rows': self.rows_seen - len(self.cluster_sizes),
+            'threshold': self.threshold,
+            'clusters': [{'representative_row': rep, 'size': size}
+                         for rep, size in sorted(duplicates.items(), key=lambda kv: -kv[1])],
+        }
+
+    def deduplicate_csv(self, input_path: str, output_path: str, report_path: str = None) -> Dict:
+        """Write the first row of every near-duplicate cluster to a new CSV
+
+        Rows are streamed through, so the input never has to fit in memory.
+        """
+        self.reset()
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        with open(input_path, 'r', encoding='utf-8', newline='') as src, \
+                open(output_path, 'w', encoding='utf-8', newline='') as dst:
+            reader = csv.DictReader(src)
+            writer = csv.DictWriter(dst, fieldnames=reader.fieldnames, extrasaction='ignore')
+            writer.writeheader()
+
+            rows = deque()
+
+            def snippets():
+                for row in reader:
+                    rows.append(row)
+                    yield row.get('code_snippet') or ''
+
+            # Rows are buffered only until their chunk's signatures come back
+            for cluster_id in self.iter_cluster_ids(snippets()):
+                row = rows.popleft()
+                if cluster_id == self.rows_seen - 1:
+                    writer.writerow(row)
+
+        report = self.cluster_report()
+        if report_path:
+            with open(report_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+        return report
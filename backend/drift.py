@@ -0,0 +1,322 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from config import config
+
+# Log-spaced bucket edges (ratio 2^(1/4)) from 1 up to 2^24, plus 0; values
+# below 0 land in bucket 0. Count features and lengths span this range.
+DEFAULT_EDGES = np.concatenate([[0.0], 2.0 ** (np.arange(0, 97) / 4)])
+PSI_EPSILON = 1e-4
+
+
+class FeatureSketch:
+    """Constant-memory, mergeable summary of a stream of feature vectors
+
+    Per feature it keeps the count, mean and sum of squared deviations
+    (merged with Chan's parallel update), min/max, and a histogram over
+    fixed log-spaced buckets that doubles as a quantile sketch. Language
+    labels are counted separately. Two sketches merge by adding counts,
+    so per-worker sketches combine into one for the whole service.
+    """
+
+    def __init__(self, n_features: int, feature_names: Sequence[str] = None, edges: np.ndarray = None):
+        self.n_features = n_features
+        self.feature_names = list(feature_names or [f"feature_{i}" for i in range(n_features)])
+        self.edges = DEFAULT_EDGES if edges is None else np.asarray(edges, dtype=float)
+        self.count = 0
+        self.mean = np.zeros(n_features)
+        self.m2 = np.zeros(n_features)
+        self.min = np.full(n_features, np.inf)
+        self.max = np.full(n_features, -np.inf)
+        self.histogram = np.zeros((n_features, len(self.edges) + 1), dtype=np.int64)
+        self.languages = Counter()
+        self._offsets = np.arange(n_features) * self.histogram.shape[1]
+
+    def update(self, X):
+        """Add a batch (or a single vector) of raw feature values"""
+        X = np.asarray(X, dtype=float).reshape(-1, self.n_features)
+        n = X.shape[0]
+        if n == 0:
+            return
+        batch_mean = X.mean(axis=0)
+        batch_m2 = ((X - batch_mean) ** 2).sum(axis=0) if n > 1 else np.zeros(self.n_features)
+        self._combine(n, batch_mean, batch_m2)
+        np.minimum(self.min, X.min(axis=0), out=self.min)
+        np.maximum(self.max, X.max(axis=0), out=self.max)
+        buckets = np.searchsorted(self.edges, X, side='right') + self._offsets
+        self.histogram += np.bincount(buckets.ravel(), minlength=self.histogram.size).reshape(self.histogram.shape)
+
+    def update_languages(self, languages: List[str]):
+        self.languages.update(languages)
+
+    def _combine(self, n: int, mean: np.ndarray, m2: np.ndarray):
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean = self.mean + delta * n / total
+        self.m2 = self.m2 + m2 + delta ** 2 * self.count * n / total
+        self.count = total
+
+    def merge(self, other: 'FeatureSketch') -> 'FeatureSketch':
+        """Fold another sketch (same features and buckets) into this one"""
+        if other.n_features != self.n_features or not np.array_equal(other.edges, self.edges):
+            raise ValueError("Sketches must share features and bucket edges to merge")
+        if other.count:
+            self._combine(other.count, other.mean, other.m2)
+            np.minimum(self.min, other.min, out=self.min)
+            np.maximum(self.max, other.max, out=self.max)
+            self.histogram += other.histogram
+        self.languages.update(other.languages)
+        return self
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.m2 / self.count) if self.count else np.zeros(self.n_features)
+
+    def quantiles(self, qs: Sequence[float]) -> np.ndarray:
+        """Approximate quantiles, shape (len(qs), n_features)
+
+        Accurate to one bucket: within a factor of 2^(1/4) for values >= 1.
+        """
+        result = np.zeros((len(qs), self.n_features))
+        if not self.count:
+            return result
+        cumulative = np.cumsum(self.histogram, axis=1)
+        lower = np.concatenate([[-np.inf], self.edges])
+        upper = np.concatenate([self.edges, [np.inf]])
+        for j in range(self.n_features):
+            buckets = np.searchsorted(cumulative[j], np.asarray(qs) * self.count, side='left')
+            buckets = np.minimum(buckets, len(upper) - 1)
+            # Geometric midpoint of the bucket, clipped to the observed range
+            lo = np.clip(lower[buckets], self.min[j], self.max[j])
+            hi = np.clip(upper[buckets], self.min[j], self.max[j])
+            result[:, j] = np.where((lo > 0) & (hi > 0), np.sqrt(np.abs(lo * hi)), (lo + hi) / 2)
+        return result
+
+    def summary(self) -> Dict:
+        quantiles = self.quantiles([0.5, 0.95, 0.99])
+        features = {}
+        for j, name in enumerate(self.feature_names):
+            features[name] = {
+                'mean': float(self.mean[j]), 'std': float(self.std[j]),
+                'min': float(self.min[j]) if self.count else 0.0,
+                'max': float(self.max[j]) if self.count else 0.0,
+                'p50': float(quantiles[0, j]), 'p95': float(quantiles[1, j]), 'p99': float(quantiles[2, j]),
+            }
+        return {'count': self.count, 'features': features, 'languages': dict(self.languages)}
+
+    def to_dict(self) -> Dict:
+        return {
+            'n_features': self.n_features, 'feature_names': self.feature_names,
+            'edges': self.edges.tolist(), 'count': self.count, 'mean': self.mean.tolist(),
+            'm2': self.m2.tolist(), 'min': self.min.tolist(), 'max': self.max.tolist(),
+            'histogram': self.histogram.tolist(), 'languages': dict(self.languages),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'FeatureSketch':
+        sketch = cls(data['n_features'], data['feature_names'], data['edges'])
+        sketch.count = data['count']
+        sketch.mean = np.array(data['mean'], dtype=float)
+        sketch.m2 = np.array(data['m2'], dtype=float)
+        sketch.min = np.array(data['min'], dtype=float)
+        sketch.max = np.array(data['max'], dtype=float)
+        sketch.histogram = np.array(data['histogram'], dtype=np.int64)
+        sketch.languages = Counter(data['languages'])
+        return sketch
+
+    @classmethod
+    def from_matrix(cls, X, feature_names: Sequence[str] = None, languages: List[str] = None) -> 'FeatureSketch':
+        """Sketch of a training matrix (dense columns only)"""
+        X = np.asarray(X, dtype=float)
+        sketch = cls(X.shape[1], feature_names)
+        sketch.update(X)
+        if languages:
+            sketch.update_languages(languages)
+        return sketch
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'FeatureSketch':
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def _psi(live: np.ndarray, reference: np.ndarray) -> float:
+    """Population stability index between two count vectors"""
+    p = live / max(live.sum(), 1) + PSI_EPSILON
+    q = reference / max(reference.sum(), 1) + PSI_EPSILON
+    return float(np.sum((p - q) * np.log(p / q)))
+
+
+def drift_scores(live: FeatureSketch, reference: FeatureSketch, threshold: float = None) -> Dict:
+    """Per-feature PSI and standardized mean shift of live traffic against a reference
+
+    PSI above ~0.1 is a moderate shift and above ~0.2 a significant one.
+    """
+    threshold = config.DRIFT_PSI_THRESHOLD if threshold is None else threshold
+    if live.n_features != reference.n_features:
+        raise ValueError(f"Live sketch has {live.n_features} features, reference has {reference.n_features}")
+    features = {}
+    for j, name in enumerate(reference.feature_names):
+        shift = abs(live.mean[j] - reference.mean[j]) / (reference.std[j] + 1e-9)
+        features[name] = {'psi': _psi(live.histogram[j], reference.histogram[j]),
+                          'mean_shift': float(shift) if live.count else 0.0}
+    scores = {
+        'live_count': live.count,
+        'reference_count': reference.count,
+        'max_psi': max((f['psi'] for f in features.values()), default=0.0) if live.count else 0.0,
+        'drifted_features': [name for name, f in features.items() if live.count and f['psi'] > threshold],
+        'features': features,
+    }
+    if reference.languages and live.languages:
+        names = sorted(set(reference.languages) | set(live.languages))
+        scores['language_psi'] = _psi(np.array([live.languages[n] for n in names], dtype=float),
+                                      np.array([reference.languages[n] for n in names], dtype=float))
+    return scores
+
+
+class DriftMonitor:
+    """Live sketches for this process, shared with sibling workers through files
+
+    update() is a lock plus a few vectorized NumPy calls per request. Every
+    flush_seconds (and at exit) the process writes its sketches to
+    <drift_dir>/<name>-<pid>-<start time>.json, so a reused pid never
+    overwrites another worker's file. merged() adds up every worker's file
+    (and this process's in-memory state) so any worker can report drift
+    for the whole service; a file's mtime is its heartbeat, and files not
+    rewritten for stale_seconds belong to workers that are gone, so they
+    are dropped and deleted. A live worker that was only idle rewrites
+    its whole cumulative sketch on its next flush.
+
+    No periodic or exit flush happens until start() is called, and start()
+    does nothing unless the monitor is enabled (DRIFT_ENABLED).
+    """
+
+    def __init__(self, drift_dir: str = None, flush_seconds: float = None, enabled: bool = None,
+                 stale_seconds: float = None):
+        self.drift_dir = drift_dir or config.DRIFT_DIR
+        self.flush_seconds = config.DRIFT_FLUSH_SECONDS if flush_seconds is None else flush_seconds
+        self.stale_seconds = config.DRIFT_STALE_SECONDS if stale_seconds is None else stale_seconds
+        self.enabled = config.DRIFT_ENABLED if enabled is None else enabled
+        self.sketches: Dict[str, FeatureSketch] = {}
+        # stream name -> {label: training-time sketch}
+        self.references: Dict[str, Dict[str, FeatureSketch]] = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._pid = None
+        self._process_id = None
+        self._started = False
+
+    def start(self):
+        """Flush at exit from now on; called by the app's startup hook, not at import"""
+        with self._lock:
+            if not self.enabled or self._started:
+                return
+            self._started = True
+        atexit.register(self.flush)
+
+    def register(self, name: str, n_features: int, feature_names: Sequence[str] = None):
+        """Create the live sketch for one feature stream"""
+        with self._lock:
+            if name not in self.sketches:
+                self.sketches[name] = FeatureSketch(n_features, feature_names)
+
+    def load_reference(self, name: str, label: str, path: str):
+        """Compare stream `name` against a training-time sketch saved next to a model"""
+        if os.path.exists(path):
+            self.references.setdefault(name, {})[label] = FeatureSketch.load(path)
+
+    def tracks_languages(self, name: str) -> bool:
+        """Whether any reference for the stream has training-time language counts"""
+        return self.enabled and any(reference.languages for reference in self.references.get(name, {}).values())
+
+    def update(self, name: str, X=None, languages: List[str] = None):
+        if not self.enabled or name not in self.sketches:
+            return
+        sketch = self.sketches[name]
+        with self._lock:
+            if X is not None:
+                sketch.update(X)
+            if languages:
+                sketch.update_languages(languages)
+            due = self._started and time.monotonic() - self._last_flush >= self.flush_seconds
+            if due:
+                self._last_flush = time.monotonic()
+                snapshots = {key: s.to_dict() for key, s in self.sketches.items()}
+        if due:
+            self._write(snapshots)
+
+    def _snapshot_path(self, name: str) -> str:
+        # Forked workers start with the parent's id; the pid check gives each its own
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._process_id = f"{self._pid}-{time.time_ns()}"
+        return os.path.join(self.drift_dir, f"{name}-{self._process_id}.json")
+
+    def _write(self, snapshots: Dict[str, Dict]):
+        try:
+            os.makedirs(self.drift_dir, exist_ok=True)
+            for name, data in snapshots.items():
+                path = self._snapshot_path(name)
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Could not write drift sketch: {e}")
+
+    def flush(self):
+        """Write this process's sketches now (streams that have seen no data are skipped)"""
+        with self._lock:
+            snapshots = {key: s.to_dict() for key, s in self.sketches.items() if s.count or s.languages}
+        if snapshots:
+            self._write(snapshots)
+
+    def merged(self, name: str) -> Optional[FeatureSketch]:
+        """This process's sketch plus every other worker's last flushed one"""
+        if name not in self.sketches:
+            return None
+        with self._lock:
+            merged = FeatureSketch.from_dict(self.sketches[name].to_dict())
+        own = self._snapshot_path(name)
+        now = time.time()
+        for path in glob.glob(os.path.join(self.drift_dir, f"{name}-*.json")):
+            if path == own:
+                continue
+            try:
+                if now - os.path.getmtime(path) > self.stale_seconds:
+                    os.remove(path)
+                    continue
+                merged.merge(FeatureSketch.load(path))
+            except (OSError, ValueError, KeyError):
+                continue
+        return merged
+
+    def report(self) -> Dict:
+        """Merged live summaries, plus drift scores against every loaded reference"""
+        report = {'enabled': self.enabled, 'streams': {}}
+        for name in self.sketches:
+            live = self.merged(name)
+            stream = {'live': live.summary(), 'drift': {}}
+            for label, reference in self.references.get(name, {}).items():
+                stream['drift'][label] = drift_scores(live, reference)
+            report['streams'][name] = stream
+        return report
+
+
+# Live sketches for the API and BugDetector in this process
+drift_monitor = DriftMonitor()
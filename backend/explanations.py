@@ -0,0 +1,141 @@
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+from compact_model import CompactTreeModel
+
+# Up to this many (row, feature) cells, contributions are summed into a dense
+# array; wider (n-gram) models only keep the cells their paths touch
+DENSE_TOTALS_LIMIT = 1 << 16
+
+
+def _compact_members(models) -> List[Tuple[CompactTreeModel, int, float]]:
+    """(flattened model, index of the bug class, weight) for every member of a model or voting list"""
+    members = models if isinstance(models, list) else [models]
+    compact = []
+    for model in members:
+        if not isinstance(model, CompactTreeModel):
+            model = CompactTreeModel(model)
+        classes = list(model.classes_)
+        bug_class = classes.index(1) if 1 in classes else -1
+        compact.append((model, bug_class, 1.0 / (len(members) * len(model.roots))))
+    return compact
+
+
+class TreePathExplainer:
+    """Per-feature contributions to P(bug) for decision trees, forests and voting lists
+
+    Walking a row down a tree, every split moves the node's bug probability;
+    that change is credited to the split feature. The bias plus the
+    contributions add up to the model's averaged predict_proba. Every
+    model is read as a CompactTreeModel's flattened node arrays (sklearn
+    models are flattened first), so a batch is walked through every tree
+    at once, one tree level per NumPy step. Contributions are
+    kept per (row, split feature) actually visited, so the cost follows
+    the path lengths, not the width of a 2^18-column n-gram model.
+
+    ngram_features is the number of hashed n-gram columns the model may
+    have after its dense ones; when the model is wider than that, its
+    last ngram_features columns are labelled ngram_bucket_<i>.
+    """
+
+    def __init__(self, models, feature_names: Sequence[str] = None, ngram_features: int = 0):
+        self.feature_names = list(feature_names or [])
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        self.bias = 0.0
+        self.n_features = 0
+        offset = 0
+        for model, bug_class, weight in _compact_members(models):
+            # A CompactTreeModel's node arrays, with split features mapped back to input columns
+            value = np.zeros(len(model.left)) if bug_class < 0 else weight * model.value[:, bug_class]
+            features.append(model.columns[model.feature])
+            thresholds.append(model.threshold)
+            lefts.append(model.left + offset)
+            rights.append(model.right + offset)
+            values.append(value)
+            roots.append(model.roots + offset)
+            self.bias += value[model.roots].sum()
+            self.n_features = max(self.n_features, model.n_features_in_)
+            offset += len(model.left)
+
+        self.feature = np.concatenate(features).astype(np.intp)
+        self.threshold = np.concatenate(thresholds)
+        self.left = np.concatenate(lefts).astype(np.intp)
+        self.right = np.concatenate(rights).astype(np.intp)
+        self.value = np.concatenate(values)
+        self.is_leaf = self.left == np.arange(offset)
+        self.roots = np.concatenate(roots).astype(np.intp)
+        # Dense columns come first; hashed n-gram buckets fill the rest
+        self.ngram_start = self.n_features - ngram_features if self.n_features > ngram_features else self.n_features
+
+    def feature_name(self, index: int) -> str:
+        if index >= self.ngram_start:
+            return f"ngram_bucket_{index - self.ngram_start}"
+        if index < len(self.feature_names):
+            return self.feature_names[index]
+        return f"feature_{index}"
+
+    def _path_totals(self, X) -> Tuple[np.ndarray, np.ndarray]:
+        """Sorted row * n_features + feature keys of every split visited, and their summed deltas"""
+        n_rows = X.shape[0]
+        # Trees compare float32 inputs against their thresholds
+        X = X.astype(np.float32)
+        sparse = sp.issparse(X)
+        if sparse:
+            # Look up (row, feature) among the stored entries instead of fancy-indexing the matrix
+            X = sp.csr_matrix(X)
+            X.sum_duplicates()
+            stored = np.repeat(np.arange(n_rows, dtype=np.int64), np.diff(X.indptr)) * self.n_features + X.indices
+        nodes = np.tile(self.roots, n_rows)
+        rows = np.repeat(np.arange(n_rows, dtype=np.int64), len(self.roots))
+        keys, deltas = [], []
+        while nodes.size:
+            active = ~self.is_leaf[nodes]
+            nodes, rows = nodes[active], rows[active]
+            if not nodes.size:
+                break
+            key = rows * self.n_features + self.feature[nodes]
+            if sparse:
+                position = np.minimum(np.searchsorted(stored, key), max(len(stored) - 1, 0))
+                x = np.where(stored[position] == key, X.data[position], 0) if len(stored) else np.zeros(len(key))
+            else:
+                x = X[rows, self.feature[nodes]]
+            children = np.where(x <= self.threshold[nodes], self.left[nodes], self.right[nodes])
+            keys.append(key)
+            deltas.append(self.value[children] - self.value[nodes])
+            nodes = children
+
+        if not keys:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        if n_rows * self.n_features <= DENSE_TOTALS_LIMIT:
+            # Narrow models: a dense bincount is cheaper than sorting the keys
+            totals = np.bincount(np.concatenate(keys), weights=np.concatenate(deltas),
+                                 minlength=n_rows * self.n_features)
+            unique = np.flatnonzero(totals)
+            return unique, totals[unique]
+        unique, inverse = np.unique(np.concatenate(keys), return_inverse=True)
+        return unique, np.bincount(inverse, weights=np.concatenate(deltas), minlength=len(unique))
+
+    def contributions(self, X) -> sp.csr_matrix:
+        """Sparse (n_rows, n_features) contributions to P(bug) for scaled inputs X
+
+        Only features split on along a row's paths have entries.
+        """
+        keys, totals = self._path_totals(X)
+        return sp.csr_matrix((totals, (keys // self.n_features, keys % self.n_features)),
+                             shape=(X.shape[0], self.n_features))
+
+    def top_features(self, X, k: int = 3) -> List[List[Dict]]:
+        """The k largest contributions (by magnitude) for every row of X"""
+        keys, totals = self._path_totals(X)
+        bounds = np.searchsorted(keys, np.arange(X.shape[0] + 1, dtype=np.int64) * self.n_features)
+        explanations = []
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            values = totals[start:end]
+            top = start + np.argsort(-np.abs(values), kind='stable')[:k]
+            explanations.append([
+                {'feature': self.feature_name(int(keys[i] % self.n_features)), 'contribution': float(totals[i])}
+                for i in top if totals[i] != 0
+            ])
+        return explanations
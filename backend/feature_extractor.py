@@ -1,13 +1,21 @@
-import re
 import ast
 import numpy as np
 from typing import List, Dict, Tuple
 import tokenize
 import io
+from lexers import java_feature_counts, cpp_feature_counts
+from patterns import pattern_registry
 
 class FeatureExtractor:
     """Extract features from source code for bug detection"""
     
+    # Column order of extract_all_features
+    FEATURE_NAMES = [
+        'loop_count', 'conditional_count', 'func_call_count', 'try_except_count', 'assignment_count',
+        'func_defs', 'class_defs', 'avg_func_length', 'imports', 'returns',
+        'cyclomatic_complexity', 'lines_of_code', 'nesting_depth', 'comment_ratio', 'empty_lines',
+    ]
+    
     def __init__(self):
         self.features_dict = {}
     
@@ -22,25 +30,26 @@ class FeatureExtractor:
     def extract_syntax_features(self, code: str) -> List[float]:
         """Extract syntactic features from code"""
         features = []
+        keywords = pattern_registry.keyword_counts('python', code)
         
         # Feature 1: Count of loops
-        loop_count = len(re.findall(r'\b(for|while)\b', code))
+        loop_count = pattern_registry.count_keywords('python', 'loops', keywords)
         features.append(loop_count)
         
         # Feature 2: Count of conditionals
-        conditional_count = len(re.findall(r'\b(if|elif|else)\b', code))
+        conditional_count = pattern_registry.count_keywords('python', 'conditionals', keywords)
         features.append(conditional_count)
         
         # Feature 3: Count of function calls
-        func_call_count = len(re.findall(r'\w+\s*\(', code))
+        func_call_count = pattern_registry.count('python', 'func_calls', code)
         features.append(func_call_count)
         
         # Feature 4: Count of try-except blocks
-        try_except_count = len(re.findall(r'\b(try|except|finally)\b', code))
+        try_except_count = pattern_registry.count_keywords('python', 'exception_keywords', keywords)
         features.append(try_except_count)
         
         # Feature 5: Count of variable assignments
-        assignment_count = len(re.findall(r'\w+\s*=', code))
+        assignment_count = pattern_registry.count('python', 'assignments', code)
         features.append(assignment_count)
         
         return features
@@ -108,9 +117,10 @@ class FeatureExtractor:
     
     def _calculate_cyclomatic_complexity(self, code: str) -> int:
         """Calculate cyclomatic complexity of code"""
+        keywords = pattern_registry.keyword_counts('python', code)
         complexity = 1
-        complexity += len(re.findall(r'\b(if|elif|for|while|and|or)\b', code))
-        complexity += len(re.findall(r'\bexcept\b', code))
+        complexity += pattern_registry.count_keywords('python', 'branches', keywords)
+        complexity += pattern_registry.count_keywords('python', 'except_clauses', keywords)
         return complexity
     
     def _calculate_nesting_depth(self, code: str) -> int:
@@ -158,60 +168,40 @@ class LanguageSpecificExtractor:
         features = []
         
         # Count of function definitions
-        features.append(len(re.findall(r'\bdef\s+\w+\s*\(', code)))
+        features.append(pattern_registry.count('python', 'func_defs', code))
         
         # Count of class definitions
-        features.append(len(re.findall(r'\bclass\s+\w+', code)))
+        features.append(pattern_registry.count('python', 'class_defs', code))
         
         # Count of imports
-        features.append(len(re.findall(r'\b(import|from)\s+', code)))
+        features.append(pattern_registry.count('python', 'imports', code))
         
         # Count of decorators
-        features.append(len(re.findall(r'@\w+', code)))
+        features.append(pattern_registry.count('python', 'decorators', code))
         
         # Count of try-except blocks
-        features.append(len(re.findall(r'\btry\s*:', code)))
+        features.append(pattern_registry.count('python', 'try_blocks', code))
         
         return features
     
     def extract_java_features(self, code: str) -> List[int]:
         """Extract Java-specific features"""
-        features = []
-        
-        # Count of class definitions
-        features.append(len(re.findall(r'\bclass\s+\w+', code)))
-        
-        # Count of method definitions
-        features.append(len(re.findall(r'\bpublic\s+\w+\s+\w+\s*\(', code)))
-        
-        # Count of interface definitions
-        features.append(len(re.findall(r'\binterface\s+\w+', code)))
-        
-        # Count of try-catch blocks
-        features.append(len(re.findall(r'\btry\s*\{', code)))
-        
-        # Count of synchronized blocks
-        features.append(len(re.findall(r'\bsynchronized\s*\(', code)))
-        
-        return features
+        counts = java_feature_counts(code)
+        return [
+            counts['class_defs'],           # class definitions
+            counts['public_methods'],       # method definitions
+            counts['interface_defs'],       # interface definitions
+            counts['try_blocks'],           # try-catch blocks
+            counts['synchronized_blocks'],  # synchronized blocks
+        ]
     
     def extract_cpp_features(self, code: str) -> List[int]:
         """Extract C++-specific features"""
-        features = []
-        
-        # Count of class definitions
-        features.append(len(re.findall(r'\bclass\s+\w+', code)))
-        
-        # Count of function definitions
-        features.append(len(re.findall(r'\w+\s+\w+\s*\([^)]*\)\s*\{', code)))
-        
-        # Count of templates
-        features.append(len(re.findall(r'\btemplate\s*<', code)))
-        
-        # Count of pointers
-        features.append(len(re.findall(r'\*', code)))
-        
-        # Count of memory operations (new/delete)
-        features.append(len(re.findall(r'\b(new|delete)\s+', code)))
-        
-        return features
+        counts = cpp_feature_counts(code)
+        return [
+            counts['class_defs'],                          # class definitions
+            counts['function_defs'],                       # function definitions
+            counts['templates'],                           # templates
+            counts['pointers'],                            # pointers
+            counts['new_exprs'] + counts['delete_exprs'],  # memory operations (new/delete)
+        ]
@@ -0,0 +1,389 @@
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import zlib
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+from config import config
+
+# Preprocessor directives and multi-char operators stay whole; newlines are
+# kept as tokens so line-ending patterns like ": \n" or "; \n" become bigrams
+TOKEN_PATTERN = re.compile(r'#(?:include|define|ifndef|ifdef|endif|pragma)\b|::|->|\w+|\n|[^\w\s]')
+# Marks the start of a snippet, so "<s> #include" or "<s> def" are features
+START_TOKEN = '<s>'
+# Digit runs are one symbol, so "x1"/"x2" and "5"/"60" share features
+DIGITS = re.compile(r'\d+')
+
+# Source file extensions read by source_corpus(); C headers count as C++
+SOURCE_EXTENSIONS = {'.py': 'python', '.java': 'java', '.cc': 'cpp', '.cpp': 'cpp', '.cxx': 'cpp',
+                     '.h': 'cpp', '.hh': 'cpp', '.hpp': 'cpp', '.ipp': 'cpp'}
+# Windows with fewer tokens than this ("}", "else:") carry no language signal
+MIN_WINDOW_TOKENS = 6
+
+# Snippets any shipped weight table must label correctly (see check_identifier)
+SANITY_SNIPPETS = [
+    ("def add(a, b):\n    return a + b\n", 'python'),
+    ("for i in range(10):\n    if i > 5:\n        print(i)\n    else:\n        continue\n", 'python'),
+    ("x = {'a': 1}\nprint(x['a'] - 6)\n", 'python'),
+    ("import os\nprint(os.getcwd())\n", 'python'),
+    ("public class Main {\n    public static void main(String[] args) {\n        System.out.println(\"hi\");\n    }\n}\n", 'java'),
+    ("import java.util.List;\n", 'java'),
+    ("String s = null;\nif (s == null) { return; }\n", 'java'),
+    ("#include <iostream>\nint main() {\n    std::cout << \"hi\" << std::endl;\n}\n", 'cpp'),
+    ("#include<iostream>\nclass Foo{public: int x;};", 'cpp'),
+    ("int add(int a,int b){return a+b;}", 'cpp'),
+    ("int* p = new int[10];\ndelete[] p;\n", 'cpp'),
+    # Real-world idioms the generator never writes
+    ("namespace util {\nint clamp(int v, int lo, int hi) {\n    return v < lo ? lo : (v > hi ? hi : v);\n}\n}\n", 'cpp'),
+    ("template <typename T>\nT max_of(const std::vector<T>& xs) {\n    return *std::max_element(xs.begin(), xs.end());\n}\n", 'cpp'),
+    ("for (auto& item : items) {\n    total += item.size();\n}\n", 'cpp'),
+    ("auto ptr = std::make_unique<Widget>();\n", 'cpp'),
+    ("@app.route('/users/<int:user_id>')\ndef get_user(user_id):\n    return jsonify(users[user_id])\n", 'python'),
+    ("async def fetch(session, url):\n    async with session.get(url) as response:\n        return await response.json()\n", 'python'),
+    ("class Stack:\n    def __init__(self):\n        self.items = []\n\n    def push(self, item):\n        self.items.append(item)\n", 'python'),
+    ("self.items.append(item)\n", 'python'),
+    ("return [x for x in values if x is not None]\n", 'python'),
+    ("@Override\npublic String toString() {\n    return \"Point(\" + x + \", \" + y + \")\";\n}\n", 'java'),
+    ("List<String> names = people.stream().map(Person::getName).collect(Collectors.toList());\n", 'java'),
+    ("private final Map<String, Integer> counts = new HashMap<>();\n", 'java'),
+    ("throw new IllegalArgumentException(\"negative size\");\n", 'java'),
+]
+
+
+class NgramLanguageIdentifier:
+    """Identify the language of a snippet from token unigram and bigram weights
+
+    Each snippet becomes a sparse bag of log1p token and token-bigram
+    counts over an exact feature vocabulary (no hashing, so no two
+    features ever share a weight), and one product with the weight
+    table scores every language at once. A softmax with a temperature
+    turns the scores into per-language confidences. Languages are rows
+    of the weight table, so adding one is adding a row.
+
+    The default table (config.LANGUAGE_WEIGHTS_PATH) is fitted with fit()
+    on windows of real source files plus generated snippets, and its
+    temperature calibrated on held-out rows; see
+    `python language_identifier.py --help`.
+    """
+
+    def __init__(self, weights: Dict[str, Dict[str, float]] = None, temperature: float = 1.0):
+        self.temperature = temperature
+        self.languages: List[str] = []
+        self.vocabulary: Dict[str, int] = {}
+        self.weight_table = np.zeros((0, 0))
+        self.bias = np.zeros(0)
+        for language, table in (weights or {}).items():
+            self.add_language(language, table)
+
+    @classmethod
+    def default(cls) -> 'NgramLanguageIdentifier':
+        """The shipped, fitted and calibrated weight table"""
+        return cls.load(config.LANGUAGE_WEIGHTS_PATH)
+
+    def tokenize(self, code: str) -> List[str]:
+        """Split code into identifier/keyword/operator tokens"""
+        return TOKEN_PATTERN.findall(code)
+
+    def features(self, code: str) -> Counter:
+        """Counts of every token and adjacent token pair, including the start marker"""
+        tokens = [START_TOKEN] + [DIGITS.sub('0', token) for token in self.tokenize(code)]
+        counts = Counter(tokens[1:])
+        counts.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+        return counts
+
+    def vectorize(self, code: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Vocabulary indices and log1p counts of the snippet's known features"""
+        vocabulary = self.vocabulary
+        known = [(vocabulary[f], count) for f, count in self.features(code).items() if f in vocabulary]
+        if not known:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        indices, counts = zip(*known)
+        return np.array(indices, dtype=np.int64), np.log1p(np.array(counts, dtype=float))
+
+    def _matrix(self, code_snippets: Sequence[str]) -> sp.csr_matrix:
+        rows = [self.vectorize(code) for code in code_snippets]
+        indptr = np.cumsum([0] + [len(indices) for indices, _ in rows])
+        indices = np.concatenate([r[0] for r in rows]) if rows else np.zeros(0, dtype=np.int64)
+        values = np.concatenate([r[1] for r in rows]) if rows else np.zeros(0)
+        return sp.csr_matrix((values, indices, indptr), shape=(len(rows), len(self.vocabulary)))
+
+    def add_language(self, language: str, weights: Dict[str, float], bias: float = 0.0):
+        """Add (or replace) a language from a token/bigram -> weight mapping"""
+        for feature in weights:
+            self.vocabulary.setdefault(feature, len(self.vocabulary))
+        width = len(self.vocabulary)
+        self.weight_table = np.hstack([self.weight_table,
+                                       np.zeros((len(self.languages), width - self.weight_table.shape[1]))])
+        row = np.zeros(width)
+        for feature, weight in weights.items():
+            row[self.vocabulary[feature]] = weight
+        if language in self.languages:
+            index = self.languages.index(language)
+            self.weight_table[index] = row
+            self.bias[index] = bias
+        else:
+            self.languages.append(language)
+            self.weight_table = np.vstack([self.weight_table, row])
+            self.bias = np.append(self.bias, bias)
+
+    def _probabilities(self, scores: np.ndarray) -> np.ndarray:
+        scaled = scores / self.temperature
+        scaled -= scaled.max(axis=-1, keepdims=True)
+        exp = np.exp(scaled)
+        return exp / exp.sum(axis=-1, keepdims=True)
+
+    def scores(self, code: str) -> Dict[str, float]:
+        """Confidence per language; empty if nothing in the snippet carries weight"""
+        indices, values = self.vectorize(code)
+        weights = self.weight_table[:, indices]
+        if not np.any(weights):
+            return {}
+        probabilities = self._probabilities(weights @ values + self.bias)
+        return dict(zip(self.languages, probabilities.tolist()))
+
+    def predict(self, code: str) -> Tuple[str, float]:
+        """Most likely language and its confidence, or ('unknown', 0.0)"""
+        scores = self.scores(code)
+        if not scores:
+            return 'unknown', 0.0
+        language = max(scores, key=scores.get)
+        return language, scores[language]
+
+    def predict_proba(self, code_snippets: Sequence[str]) -> np.ndarray:
+        """Confidences for many snippets, shape (n, n_languages)"""
+        return self._probabilities(self._matrix(code_snippets) @ self.weight_table.T + self.bias)
+
+    def fit(self, code_snippets: List[str], labels: List[str], alpha: float = 1.0,
+            min_count: int = 5, min_weight: float = 0.1, calibration_every: int = 5):
+        """Learn weight tables from a labeled corpus (multinomial naive Bayes)
+
+        Every calibration_every-th row is held out of the counts, and the
+        temperature is chosen to minimise log loss on those rows, so
+        confidences track accuracy on snippets the counts never saw.
+        Features seen in fewer than min_count snippets, or whose weight
+        is below min_weight for every language, are dropped first.
+        """
+        rows = np.arange(len(labels))
+        calibration = rows % calibration_every == 0
+        train = [code for code, held in zip(code_snippets, calibration) if not held]
+        totals = Counter()
+        for code in train:
+            totals.update(self.features(code).keys())
+        self.vocabulary = {f: i for i, f in enumerate(sorted(f for f, n in totals.items() if n >= min_count))}
+        self.languages = sorted(set(labels))
+        y = np.array([self.languages.index(label) for label in labels])
+
+        X = self._matrix(code_snippets)
+        X_train, y_train = X[~calibration], y[~calibration]
+        counts = np.vstack([np.asarray(X_train[y_train == i].sum(axis=0)).ravel()
+                            for i in range(len(self.languages))]) + alpha
+        log_probs = np.log(counts / counts.sum(axis=1, keepdims=True))
+        # Centering keeps features every language uses equally at zero weight
+        self.weight_table = log_probs - log_probs.mean(axis=0)
+        self.bias = np.log(np.bincount(y_train, minlength=len(self.languages)) / len(y_train))
+
+        keep = np.flatnonzero(np.abs(self.weight_table).max(axis=0) >= min_weight)
+        features = sorted(self.vocabulary, key=self.vocabulary.get)
+        self.vocabulary = {features[i]: j for j, i in enumerate(keep)}
+        self.weight_table = self.weight_table[:, keep]
+        X = X[:, keep]
+
+        X_held, y_held = X[calibration], y[calibration]
+        scores = X_held @ self.weight_table.T + self.bias
+        best_loss = None
+        for temperature in np.geomspace(0.05, 50, 120):
+            self.temperature = temperature
+            probabilities = self._probabilities(scores)
+            loss = -np.mean(np.log(probabilities[np.arange(len(y_held)), y_held] + 1e-12))
+            if best_loss is None or loss < best_loss:
+                best_loss, best_temperature = loss, temperature
+        self.temperature = float(best_temperature)
+        return self
+
+    def evaluate(self, code_snippets: Sequence[str], labels: Sequence[str], n_bins: int = 10) -> Dict:
+        """Accuracy, log loss and expected calibration error on labeled snippets"""
+        probabilities = self.predict_proba(code_snippets)
+        y = np.array([self.languages.index(label) for label in labels])
+        predicted = probabilities.argmax(axis=1)
+        confidence = probabilities.max(axis=1)
+        correct = predicted == y
+        bins = np.minimum((confidence * n_bins).astype(int), n_bins - 1)
+        ece = sum(abs(correct[bins == b].mean() - confidence[bins == b].mean()) * np.mean(bins == b)
+                  for b in range(n_bins) if np.any(bins == b))
+        return {
+            'rows': len(y),
+            'accuracy': float(correct.mean()),
+            'mean_confidence': float(confidence.mean()),
+            'ece': float(ece),
+            'log_loss': float(-np.mean(np.log(probabilities[np.arange(len(y)), y] + 1e-12))),
+            'per_language': {language: float(correct[y == i].mean())
+                             for i, language in enumerate(self.languages) if np.any(y == i)},
+        }
+
+    def save(self, path: str):
+        """Save the vocabulary, weight tables and temperature as JSON"""
+        features = sorted(self.vocabulary, key=self.vocabulary.get)
+        data = {
+            'languages': self.languages,
+            'bias': np.round(self.bias, 6).tolist(),
+            'temperature': self.temperature,
+            'features': {f: np.round(self.weight_table[:, i], 4).tolist()
+                         for f, i in zip(features, range(len(features)))},
+        }
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=0, sort_keys=True)
+
+    @classmethod
+    def load(cls, path: str) -> 'NgramLanguageIdentifier':
+        """Load weight tables saved with save()"""
+        with open(path) as f:
+            data = json.load(f)
+        identifier = cls(temperature=float(data['temperature']))
+        identifier.languages = list(data['languages'])
+        identifier.vocabulary = {f: i for i, f in enumerate(data['features'])}
+        identifier.weight_table = np.array(list(data['features'].values()), dtype=float).T.copy()
+        identifier.bias = np.array(data['bias'], dtype=float)
+        return identifier
+
+
+def generated_corpus(n_rows: int, seed: int, fragments: bool = True) -> Tuple[List[str], List[str]]:
+    """Labeled snippets from the corpus generator, plus a random run of lines from each
+
+    The fragments teach the tables short snippets without the generator's
+    imports, includes and class wrappers.
+    """
+    from corpus_generator import CorpusGenerator
+
+    rng = random.Random(f"fragments-{seed}")
+    codes, labels = [], []
+    for code, _, language, _ in CorpusGenerator(seed=seed).iter_rows(0, n_rows):
+        codes.append(code)
+        labels.append(language)
+        if fragments:
+            lines = [line for line in code.split('\n') if line.strip()]
+            start = rng.randrange(len(lines))
+            codes.append('\n'.join(lines[start:start + rng.randint(1, 4)]) + '\n')
+            labels.append(language)
+    return codes, labels
+
+
+def source_files(paths: Sequence[str]) -> Dict[str, List[str]]:
+    """Source files under the given directories, grouped by language, in a stable order"""
+    files = {}
+    for path in paths:
+        for root, dirs, names in os.walk(path):
+            dirs.sort()
+            for name in sorted(names):
+                language = SOURCE_EXTENSIONS.get(os.path.splitext(name)[1])
+                if language:
+                    files.setdefault(language, []).append(os.path.join(root, name))
+    return files
+
+
+def is_held_out(path: str, every: int = 5) -> bool:
+    """Whether a file belongs to the held-out split (a stable hash of its path)"""
+    return zlib.crc32(path.encode()) % every == 0
+
+
+def source_corpus(paths: Sequence[str], n_rows: int, seed: int, held_out: bool = False,
+                  fragments: bool = True) -> Tuple[List[str], List[str]]:
+    """Labeled windows of lines from real source files, the same number per language
+
+    Files are split into fitting and held-out sets by is_held_out(), so
+    a table checked with held_out=True never counted those files. Each
+    snippet is a run of 3-25 lines from a random file; with fragments,
+    every snippet is followed by a 1-3 line run from the same file.
+    """
+    rng = random.Random(f"sources-{seed}")
+    files = {language: [path for path in language_files if is_held_out(path) == held_out]
+             for language, language_files in source_files(paths).items()}
+    files = {language: language_files for language, language_files in files.items() if language_files}
+    lengths = [(3, 25), (1, 3)] if fragments else [(3, 25)]
+    codes, labels = [], []
+    for language in sorted(files):
+        wanted = len(codes) + n_rows // len(files) * len(lengths)
+        for _ in range(n_rows * 20):
+            if len(codes) >= wanted:
+                break
+            with open(rng.choice(files[language]), encoding='utf-8', errors='ignore') as f:
+                lines = [line for line in f.read().split('\n') if line.strip()]
+            if not lines:
+                continue
+            windows = []
+            for shortest, longest in lengths:
+                start = rng.randrange(len(lines))
+                windows.append('\n'.join(lines[start:start + rng.randint(shortest, longest)]) + '\n')
+            if all(len(TOKEN_PATTERN.findall(window)) >= MIN_WINDOW_TOKENS for window in windows):
+                codes.extend(windows)
+                labels.extend([language] * len(windows))
+    return codes, labels
+
+
+def check_identifier(identifier: NgramLanguageIdentifier, n_rows: int = 3000, seed: int = 1,
+                     sources: Sequence[str] = None, min_accuracy: float = 0.99,
+                     min_source_accuracy: float = 0.97, min_fragment_accuracy: float = 0.93,
+                     max_ece: float = 0.05) -> Tuple[bool, Dict]:
+    """Accuracy and calibration on held-out snippets and fragments, plus SANITY_SNIPPETS
+
+    Generated snippets are always checked. With sources, windows of the
+    held-out source files are checked too, full snippets and 1-3 line
+    fragments separately.
+    """
+    codes, labels = generated_corpus(n_rows, seed, fragments=False)
+    report = {'snippets': identifier.evaluate(codes, labels)}
+    fragment_codes, fragment_labels = generated_corpus(n_rows, seed)
+    report['with_fragments'] = identifier.evaluate(fragment_codes, fragment_labels)
+    passed = (report['snippets']['accuracy'] >= min_accuracy and report['snippets']['ece'] <= max_ece
+              and report['with_fragments']['ece'] <= max_ece)
+    if sources:
+        codes, labels = source_corpus(sources, n_rows, seed, held_out=True)
+        report['source_snippets'] = identifier.evaluate(codes[0::2], labels[0::2])
+        report['source_fragments'] = identifier.evaluate(codes[1::2], labels[1::2])
+        passed = (passed and report['source_snippets']['accuracy'] >= min_source_accuracy
+                  and report['source_fragments']['accuracy'] >= min_fragment_accuracy
+                  and report['source_snippets']['ece'] <= max_ece
+                  and report['source_fragments']['ece'] <= max_ece)
+    report['sanity_failures'] = [
+        {'code': code, 'expected': expected, 'predicted': identifier.predict(code)}
+        for code, expected in SANITY_SNIPPETS if identifier.predict(code)[0] != expected]
+    return passed and not report['sanity_failures'], report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fit or check the language identifier's weight table")
+    parser.add_argument('--fit', action='store_true', help="Fit a new table (requires --sources)")
+    parser.add_argument('--sources', nargs='+', default=[],
+                        help="Directories of .py/.java/C++ files to fit on and check against")
+    parser.add_argument('--rows', type=int, default=30000, help="Source snippets to fit on")
+    parser.add_argument('--generated-rows', type=int, default=5000, help="Generated rows to fit on")
+    parser.add_argument('--min-count', type=int, default=30)
+    parser.add_argument('--min-weight', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=0, help="Sampling seed for fitting")
+    parser.add_argument('--check-seed', type=int, default=1, help="Sampling seed for the held-out check")
+    parser.add_argument('--weights', default=config.LANGUAGE_WEIGHTS_PATH)
+    args = parser.parse_args()
+
+    if args.fit:
+        if not args.sources:
+            parser.error("--fit needs --sources: generated snippets alone do not cover real code")
+        codes, labels = source_corpus(args.sources, args.rows, args.seed)
+        generated_codes, generated_labels = generated_corpus(args.generated_rows, args.seed)
+        identifier = NgramLanguageIdentifier().fit(codes + generated_codes, labels + generated_labels,
+                                                   min_count=args.min_count, min_weight=args.min_weight)
+    else:
+        identifier = NgramLanguageIdentifier.load(args.weights)
+    passed, report = check_identifier(identifier, seed=args.check_seed, sources=args.sources)
+    report['vocabulary'] = len(identifier.vocabulary)
+    report['temperature'] = identifier.temperature
+    print(json.dumps(report, indent=2))
+    if args.fit and passed:
+        identifier.save(args.weights)
+        print(f"Saved weights to {args.weights}")
+    sys.exit(0 if passed else 1)
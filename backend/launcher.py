@@ -0,0 +1,93 @@
+import gc
+import os
+from typing import Dict
+
+from config import config
+
+# Native thread pools that numpy/scipy/sklearn may spin up per process
+THREAD_ENV_VARS = [
+    'OMP_NUM_THREADS',
+    'OPENBLAS_NUM_THREADS',
+    'MKL_NUM_THREADS',
+    'NUMEXPR_NUM_THREADS',
+    'VECLIB_MAXIMUM_THREADS',
+]
+
+
+def available_cores() -> int:
+    """Cores this process may run on (respects CPU affinity / cpusets)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def plan_workers(cores: int = None) -> Dict[str, int]:
+    """Split the available cores into worker processes and BLAS/OpenMP threads each"""
+    cores = cores or available_cores()
+    workers = config.API_WORKERS or cores
+    threads = max(1, cores // workers)
+    return {'cores': cores, 'workers': workers, 'threads_per_worker': threads}
+
+
+def limit_native_threads(threads: int):
+    """Cap native thread pools; must run before numpy is first imported"""
+    for var in THREAD_ENV_VARS:
+        os.environ.setdefault(var, str(threads))
+
+
+def build_options(plan: Dict[str, int]) -> Dict:
+    """Gunicorn settings for preforked uvicorn workers"""
+    threads = plan['threads_per_worker']
+
+    def post_fork(server, worker):
+        # Pools created by libraries imported in the parent keep the parent's
+        # sizing, so clamp them again inside each worker
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(limits=threads)
+
+    return {
+        'bind': f"{config.API_HOST}:{config.API_PORT}",
+        'workers': plan['workers'],
+        'worker_class': 'uvicorn.workers.UvicornWorker',
+        'preload_app': True,
+        'max_requests': config.API_MAX_REQUESTS,
+        'max_requests_jitter': config.API_MAX_REQUESTS_JITTER,
+        'graceful_timeout': config.API_GRACEFUL_TIMEOUT,
+        'timeout': config.API_TIMEOUT,
+        'keepalive': 5,
+        'post_fork': post_fork,
+    }
+
+
+def main():
+    plan = plan_workers()
+    limit_native_threads(plan['threads_per_worker'])
+
+    from gunicorn.app.base import BaseApplication
+
+    class PreforkApplication(BaseApplication):
+        """Gunicorn application that imports the API (and its models) once in the master"""
+
+        def __init__(self, options: Dict):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            import app as api
+            # Keep the loaded models out of future GC passes so the collector
+            # doesn't write to their pages and break copy-on-write sharing
+            gc.freeze()
+            return api.app
+
+    print(f"Starting {plan['workers']} workers on {plan['cores']} cores "
+          f"({plan['threads_per_worker']} native threads each)")
+    PreforkApplication(build_options(plan)).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import re
+from typing import Dict, Iterator, Optional, Tuple
+
+# (kind, text); kind is one of: keyword, identifier, number, literal,
+# operator, preprocessor. Literal tokens carry no text.
+Token = Tuple[str, str]
+
+JAVA_KEYWORDS = frozenset("""
+    abstract assert boolean break byte case catch char class const continue default do
+    double else enum extends final finally float for goto if implements import instanceof
+    int interface long native new package private protected public return short static
+    strictfp super switch synchronized this throw throws transient try void volatile while
+    var record yield true false null
+""".split())
+
+CPP_KEYWORDS = frozenset("""
+    alignas alignof asm auto bool break case catch char char8_t char16_t char32_t class
+    const consteval constexpr constinit const_cast continue decltype default delete do
+    double dynamic_cast else enum explicit export extern false float for friend goto if
+    inline int long mutable namespace new noexcept nullptr operator private protected
+    public register reinterpret_cast return short signed sizeof static static_assert
+    static_cast struct switch template this thread_local throw true try typedef typeid
+    typename union unsigned using virtual void volatile wchar_t while override final
+""".split())
+
+# Keywords that name a type, so a following '*' declares a pointer
+CPP_TYPE_KEYWORDS = frozenset(
+    'auto bool char char8_t char16_t char32_t double float int long short signed unsigned void wchar_t'.split())
+
+# Tokens after which '(' or '*' is an expression, not a declaration
+CPP_EXPRESSION_KEYWORDS = frozenset('return else new delete case throw sizeof co_return co_yield'.split())
+
+# Qualifiers allowed between a parameter list and a function body
+CPP_FUNCTION_QUALIFIERS = frozenset('const volatile noexcept override final & &&'.split())
+
+_OPERATORS = r"""
+    >>>= | <<= | >>= | >>> | ->\* | \.\.\. | :: | -> | \+\+ | -- | << | >> | <= | >= | == | != |
+    && | \|\| | [-+*/%&|^]= | [^\s\w]
+"""
+
+# Whitespace stops at the last newline so '^' can still anchor an indented
+# preprocessor directive on the next line
+_COMMON = r"""
+    (?P<ws>\s*\n|[ \t\r\f\v]+)
+  | (?P<comment>//[^\n]*|/\*[\s\S]*?(?:\*/|\Z))
+  | (?P<char>'(?:[^'\\\n]|\\.)*'?)
+  | (?P<number>\.?\d[\w.']*)
+  | (?P<ident>[A-Za-z_$][\w$]*)
+  | (?P<op>""" + _OPERATORS + ')'
+
+JAVA_PATTERN = re.compile(r"""
+    (?P<textblock>\"\"\"[\s\S]*?(?:\"\"\"|\Z))
+  | (?P<string>"(?:[^"\\\n]|\\.)*"?)
+  | """ + _COMMON, re.VERBOSE)
+
+CPP_PATTERN = re.compile(r"""
+    (?P<preprocessor>^[ \t]*\#[ \t]*(?P<directive>\w*)(?:\\\n|[^\n])*)
+  | (?P<rawstring>(?:u8|u|U|L)?R"(?P<delim>[^()\\\s]{0,16})\([\s\S]*?\)(?P=delim)")
+  | (?P<string>(?:u8|u|U|L)?"(?:[^"\\\n]|\\.)*"?)
+  | """ + _COMMON, re.VERBOSE | re.MULTILINE)
+
+
+class CLikeLexer:
+    """Single-pass lexer for C-family languages
+
+    One compiled master pattern is matched left to right, so the cost is
+    linear in the size of the source. Comments and whitespace are
+    dropped; string and char literals become content-free 'literal'
+    tokens, so nothing inside them is ever counted as code.
+    """
+
+    pattern = None
+    keywords = frozenset()
+
+    def tokenize(self, code: str) -> Iterator[Token]:
+        """Yield (kind, text) tokens for the code"""
+        keywords = self.keywords
+        for match in self.pattern.finditer(code):
+            group = match.lastgroup
+            if group == 'ws' or group == 'comment':
+                continue
+            if group == 'ident':
+                text = match.group()
+                yield ('keyword' if text in keywords else 'identifier', text)
+            elif group == 'op':
+                yield ('operator', match.group())
+            elif group == 'number':
+                yield ('number', match.group())
+            elif group == 'preprocessor':
+                yield ('preprocessor', '#' + match.group('directive'))
+            else:
+                yield ('literal', '')
+
+
+class JavaLexer(CLikeLexer):
+    """Java lexer (text blocks, strings, chars, comments)"""
+    pattern = JAVA_PATTERN
+    keywords = JAVA_KEYWORDS
+
+
+class CppLexer(CLikeLexer):
+    """C++ lexer (raw strings, preprocessor lines, strings, chars, comments)"""
+    pattern = CPP_PATTERN
+    keywords = CPP_KEYWORDS
+
+
+java_lexer = JavaLexer()
+cpp_lexer = CppLexer()
+
+
+def java_feature_counts(code: str) -> Dict[str, int]:
+    """Count every Java feature in one pass over the token stream"""
+    counts = dict.fromkeys(['class_defs', 'interface_defs', 'public_methods', 'try_blocks',
+                            'synchronized_blocks', 'for_loops', 'if_statements'], 0)
+    prev: Optional[Token] = None
+    in_public_decl = False
+
+    for kind, text in java_lexer.tokenize(code):
+        if prev is not None:
+            prev_text = prev[1]
+            if prev_text == 'class' and kind == 'identifier':
+                counts['class_defs'] += 1
+            elif prev_text == 'interface' and kind == 'identifier':
+                counts['interface_defs'] += 1
+            elif prev_text == 'try' and text == '{':
+                counts['try_blocks'] += 1
+            elif prev_text == 'synchronized' and text == '(':
+                counts['synchronized_blocks'] += 1
+            elif prev_text == 'for' and text == '(':
+                counts['for_loops'] += 1
+            elif prev_text == 'if' and text == '(':
+                counts['if_statements'] += 1
+
+        # "public ... name(" is a method or constructor unless a type
+        # declaration, field initializer or body comes first
+        if text == 'public':
+            in_public_decl = True
+        elif in_public_decl:
+            if text in ('class', 'interface', 'enum', '=', ';', '{'):
+                in_public_decl = False
+            elif text == '(' and prev is not None and prev[0] == 'identifier':
+                counts['public_methods'] += 1
+                in_public_decl = False
+
+        prev = (kind, text)
+
+    return counts
+
+
+def cpp_feature_counts(code: str) -> Dict[str, int]:
+    """Count every C++ feature in one pass over the token stream"""
+    counts = dict.fromkeys(['class_defs', 'function_defs', 'templates', 'pointers',
+                            'new_exprs', 'delete_exprs'], 0)
+    prev: Optional[Token] = None
+    prev2: Optional[Token] = None
+    paren_depth = 0
+    # Paren depths of "type name(" openings that may start a function definition
+    candidates = []
+    awaiting_body = False
+
+    for kind, text in cpp_lexer.tokenize(code):
+        if awaiting_body:
+            if text == '{':
+                counts['function_defs'] += 1
+                awaiting_body = False
+            elif text not in CPP_FUNCTION_QUALIFIERS:
+                awaiting_body = False
+
+        if kind == 'keyword':
+            if text == 'new':
+                counts['new_exprs'] += 1
+            elif text == 'delete':
+                counts['delete_exprs'] += 1
+        elif kind == 'identifier' and prev is not None and prev[1] == 'class':
+            counts['class_defs'] += 1
+
+        if text == '<' and prev is not None and prev[1] == 'template':
+            counts['templates'] += 1
+        elif text == '(':
+            if (prev is not None and prev[0] == 'identifier' and prev2 is not None
+                    and prev2[1] not in CPP_EXPRESSION_KEYWORDS
+                    and (prev2[0] in ('identifier', 'keyword') or prev2[1] in ('*', '&', '>', '::'))):
+                candidates.append(paren_depth)
+            paren_depth += 1
+        elif text == ')':
+            paren_depth = max(paren_depth - 1, 0)
+            if candidates and candidates[-1] == paren_depth:
+                candidates.pop()
+                awaiting_body = True
+        elif text == '*' and prev is not None:
+            prev_kind, prev_text = prev
+            if prev_text in CPP_TYPE_KEYWORDS or prev_text in ('*', '>', 'const'):
+                # int* p, T<U>* p, char** argv
+                counts['pointers'] += 1
+            elif prev_kind == 'identifier':
+                # Node *n starting a declaration (also after "public:"), not a * b or f(a * b)
+                if prev2 is None or prev2[1] in (';', '{', '}', ':', ',', 'const', 'static', 'struct', '::'):
+                    counts['pointers'] += 1
+            elif prev_kind == 'keyword' and prev_text in CPP_EXPRESSION_KEYWORDS:
+                # return *p
+                counts['pointers'] += 1
+            elif prev_kind == 'operator' and prev_text not in (')', ']'):
+                # Unary dereference: x = *p, f(*p)
+                counts['pointers'] += 1
+
+        prev2, prev = prev, (kind, text)
+
+    return counts
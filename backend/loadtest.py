@@ -0,0 +1,270 @@
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from config import config
+from ngram_features import iter_csv_snippets
+
+ENDPOINTS = {
+    'detect_bug': '/detect_bug',
+    'analyze-multilang': '/analyze-multilang',
+    'arrow': '/detect_bug/arrow',
+}
+DEFAULT_MIX = {'detect_bug': 0.7, 'analyze-multilang': 0.2, 'arrow': 0.1}
+
+# Used when no corpus file is available
+FALLBACK_CORPUS = [
+    "def add(a, b):\n    return a + b\n",
+    "for i in range(10):\n    if i = 5:\n        print(i)\n",
+    "public class Main {\n    public static void main(String[] args) {\n        System.out.println(\"hi\");\n    }\n}\n",
+    "#include <iostream>\nint main() {\n    int* p = new int[10];\n    std::cout << p[10];\n}\n",
+    "try:\n    x = data['key']\nexcept:\n    pass\n",
+]
+
+
+def load_corpus(filepath: str, limit: int = None) -> List[str]:
+    """Snippets to replay, from a training-format CSV"""
+    if not os.path.exists(filepath):
+        print(f"{filepath} not found, using the built-in snippets")
+        return list(FALLBACK_CORPUS)
+    corpus = []
+    for code, _ in iter_csv_snippets(filepath):
+        corpus.append(code)
+        if limit and len(corpus) >= limit:
+            break
+    return corpus or list(FALLBACK_CORPUS)
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """'detect_bug=0.7,arrow=0.3' -> normalized endpoint weights"""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name}', expected one of {sorted(ENDPOINTS)}")
+        mix[name] = float(weight or 1)
+    total = sum(mix.values())
+    return {name: weight / total for name, weight in mix.items()}
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """Latency percentiles in milliseconds"""
+    if not latencies:
+        return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0, 'mean': 0.0}
+    ms = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {'p50': float(p50), 'p95': float(p95), 'p99': float(p99),
+            'max': float(ms.max()), 'mean': float(ms.mean())}
+
+
+class LoadHarness:
+    """Replay a snippet corpus against the API and measure latency and errors
+
+    With rate=0 the harness runs closed-loop: `concurrency` clients send
+    back to back. With a rate it runs open-loop: arrivals follow a Poisson
+    process and latency is measured from each request's scheduled start,
+    so time spent waiting for a free client slot counts against the
+    server instead of silently lowering the offered load.
+    """
+
+    def __init__(self, corpus: List[str], mix: Dict[str, float] = None, concurrency: int = 8,
+                 rate: float = 0.0, arrow_batch_size: int = 32, timeout: float = 30.0):
+        self.corpus = corpus
+        self.mix = mix or DEFAULT_MIX
+        self.concurrency = concurrency
+        self.rate = rate
+        self.arrow_batch_size = arrow_batch_size
+        self.timeout = timeout
+        self.rng = np.random.RandomState(config.RANDOM_STATE)
+
+    def _arrow_payload(self, start: int) -> bytes:
+        import pyarrow as pa
+        import arrow_io
+
+        codes = [self.corpus[(start + i) % len(self.corpus)] for i in range(self.arrow_batch_size)]
+        table = pa.table({'id': pa.array(np.arange(len(codes), dtype=np.int64)),
+                          'code_snippet': pa.array(codes)})
+        return arrow_io.write_stream(table)
+
+    def build_requests(self, n_requests: int) -> List[Dict]:
+        """Pre-serialize every request so client-side encoding stays out of the timings"""
+        names = list(self.mix)
+        choices = self.rng.choice(len(names), size=n_requests, p=[self.mix[name] for name in names])
+        offsets = self.rng.randint(0, len(self.corpus), size=n_requests)
+        requests = []
+        for choice, offset in zip(choices, offsets):
+            name = names[choice]
+            if name == 'arrow':
+                request = {'content': self._arrow_payload(offset),
+                           'headers': {'Content-Type': 'application/vnd.apache.arrow.stream'}}
+            else:
+                request = {'json': {'code_snippet': self.corpus[offset]}}
+            request.update(name=name, url=ENDPOINTS[name])
+            requests.append(request)
+        return requests
+
+    async def _send(self, client: httpx.AsyncClient, request: Dict, started: float) -> Dict:
+        try:
+            response = await client.post(request['url'], content=request.get('content'),
+                                         json=request.get('json'), headers=request.get('headers'))
+            status = response.status_code
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        return {'name': request['name'], 'status': status, 'latency': time.perf_counter() - started}
+
+    async def _closed_loop(self, client: httpx.AsyncClient, requests: List[Dict]) -> List[Dict]:
+        pending = iter(requests)
+        results = []
+
+        async def worker():
+            for request in pending:
+                results.append(await self._send(client, request, time.perf_counter()))
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        return results
+
+    async def _open_loop(self, client: httpx.AsyncClient, requests: List[Dict]) -> List[Dict]:
+        slots = asyncio.Semaphore(self.concurrency)
+        arrivals = np.cumsum(self.rng.exponential(1.0 / self.rate, size=len(requests)))
+        start = time.perf_counter()
+
+        async def scheduled(request, offset):
+            await asyncio.sleep(max(0.0, start + offset - time.perf_counter()))
+            async with slots:
+                return await self._send(client, request, start + offset)
+
+        return await asyncio.gather(*(scheduled(r, t) for r, t in zip(requests, arrivals)))
+
+    async def run(self, client: httpx.AsyncClient, n_requests: int, warmup: int = 0) -> Dict:
+        """Send n_requests through client and return the report"""
+        if warmup:
+            await self._closed_loop(client, self.build_requests(warmup))
+        requests = self.build_requests(n_requests)
+        start = time.perf_counter()
+        if self.rate > 0:
+            results = await self._open_loop(client, requests)
+        else:
+            results = await self._closed_loop(client, requests)
+        return self.report(results, time.perf_counter() - start)
+
+    def report(self, results: List[Dict], duration: float) -> Dict:
+        """Throughput, latency percentiles and error rates, overall and per endpoint"""
+        def section(rows):
+            statuses = Counter(str(row['status']) for row in rows)
+            errors = sum(count for status, count in statuses.items() if not status.startswith('2'))
+            return {
+                'requests': len(rows),
+                'throughput_rps': len(rows) / duration if duration else 0.0,
+                'latency_ms': summarize([row['latency'] for row in rows]),
+                'error_rate': errors / len(rows) if rows else 0.0,
+                'status_counts': dict(statuses),
+            }
+
+        report = section(results)
+        report.update({
+            'duration_seconds': duration,
+            'concurrency': self.concurrency,
+            'arrival_rate': self.rate or None,
+            'mix': self.mix,
+            'endpoints': {name: section([row for row in results if row['name'] == name])
+                          for name in self.mix},
+        })
+        if 'arrow' in self.mix:
+            report['endpoints']['arrow']['snippets_per_second'] = (
+                report['endpoints']['arrow']['throughput_rps'] * self.arrow_batch_size)
+        return report
+
+    def run_in_process(self, n_requests: int, warmup: int = 0, app=None) -> Dict:
+        """Drive the FastAPI app over ASGI in this process (no sockets)"""
+        if app is None:
+            from app import app
+
+        async def main():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url='http://loadtest',
+                                         timeout=self.timeout) as client:
+                return await self.run(client, n_requests, warmup)
+
+        report = asyncio.run(main())
+        report['target'] = 'in-process'
+        return report
+
+    def run_against(self, base_url: str, n_requests: int, warmup: int = 0) -> Dict:
+        """Drive a running server over HTTP"""
+        async def main():
+            limits = httpx.Limits(max_connections=self.concurrency)
+            async with httpx.AsyncClient(base_url=base_url, timeout=self.timeout, limits=limits) as client:
+                return await self.run(client, n_requests, warmup)
+
+        report = asyncio.run(main())
+        report['target'] = base_url
+        return report
+
+
+def start_local_server(port: int, ready_timeout: float = 60.0) -> subprocess.Popen:
+    """Start the production launcher on a local port and wait until it answers"""
+    env = dict(os.environ, API_HOST='127.0.0.1', API_PORT=str(port))
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    server = subprocess.Popen([sys.executable, 'launcher.py'], cwd=backend_dir, env=env)
+    deadline = time.monotonic() + ready_timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode}")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1.0)
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.25)
+    server.terminate()
+    raise RuntimeError(f"Server did not start within {ready_timeout}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the bug detection API")
+    parser.add_argument('--data', default=config.DATASET_PATH, help="CSV corpus of snippets to replay")
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--rate', type=float, default=0.0,
+                        help="Poisson arrival rate in requests/s (0 = closed loop)")
+    parser.add_argument('--mix', default='detect_bug=0.7,analyze-multilang=0.2,arrow=0.1',
+                        help="Endpoint weights, e.g. detect_bug=0.5,arrow=0.5")
+    parser.add_argument('--arrow-batch-size', type=int, default=32)
+    parser.add_argument('--url', help="Base URL of a running server (default: in-process ASGI)")
+    parser.add_argument('--serve', action='store_true', help="Start launcher.py locally and test it over HTTP")
+    parser.add_argument('--port', type=int, default=8765, help="Port for --serve")
+    parser.add_argument('--output', help="Write the JSON report here as well as to stdout")
+    args = parser.parse_args()
+
+    harness = LoadHarness(load_corpus(args.data), parse_mix(args.mix), args.concurrency,
+                          args.rate, args.arrow_batch_size)
+    server: Optional[subprocess.Popen] = None
+    try:
+        if args.serve:
+            server = start_local_server(args.port)
+            report = harness.run_against(f"http://127.0.0.1:{args.port}", args.requests, args.warmup)
+        elif args.url:
+            report = harness.run_against(args.url, args.requests, args.warmup)
+        else:
+            report = harness.run_in_process(args.requests, args.warmup)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        with open(args.output, 'w') as f:
+            f.write(output)
@@ -0,0 +1,128 @@
+import json
+import os
+import time
+from typing import Dict, List
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import HalvingGridSearchCV, StratifiedGroupKFold
+
+from config import config
+
+# Candidate forest configurations; trimmed by successive halving, not run as a full grid
+RF_PARAM_GRID = {
+    'n_estimators': [25, 50, 100, 150, 300],
+    'max_depth': [None, 5, 10, 15, 25],
+    'min_samples_leaf': [1, 2, 4],
+    'max_features': ['sqrt', 'log2'],
+}
+
+
+def _fit_and_time(estimator, params: Dict, X, y, n_repeats: int) -> float:
+    """Fit one candidate and return its median single-row predict latency in µs"""
+    model = clone(estimator).set_params(**params)
+    model.fit(X, y)
+    row = X[:1]
+    timings = []
+    for _ in range(n_repeats):
+        start = time.perf_counter()
+        model.predict(row)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings) * 1e6)
+
+
+class SuccessiveHalvingSearch:
+    """Hyperparameter search for the forest trainers using successive halving
+
+    Every candidate first sees a small sample of the training rows; each
+    round keeps the best 1/factor of them and grows their sample by factor.
+    Candidates within a round are scored in parallel across cores.
+    """
+
+    def __init__(self, param_grid: Dict = None, factor: int = None, n_jobs: int = None,
+                 cv: int = 5, scoring: str = 'f1', top_k: int = 5, latency_repeats: int = 50):
+        self.param_grid = param_grid or RF_PARAM_GRID
+        self.factor = factor or config.SEARCH_FACTOR
+        self.n_jobs = n_jobs or config.SEARCH_N_JOBS
+        self.cv = cv
+        self.scoring = scoring
+        self.top_k = top_k
+        self.latency_repeats = latency_repeats
+        self.estimator = RandomForestClassifier(random_state=config.RANDOM_STATE, n_jobs=1)
+        self.search = None
+        self.report = []
+        self.best_params_ = None
+
+    def run(self, X, y, groups=None) -> List[Dict]:
+        """Run the search and return candidates ranked by score, with latency
+
+        With groups, every fold keeps each group on one side, so near-duplicate
+        rows cannot leak between a candidate's training and scoring folds.
+        """
+        cv = self.cv
+        if groups is not None:
+            cv = StratifiedGroupKFold(n_splits=self.cv, shuffle=True, random_state=config.RANDOM_STATE)
+        self.search = HalvingGridSearchCV(
+            self.estimator,
+            self.param_grid,
+            factor=self.factor,
+            cv=cv,
+            scoring=self.scoring,
+            refit=False,
+            return_train_score=False,
+            random_state=config.RANDOM_STATE,
+            n_jobs=self.n_jobs,
+        )
+        self.search.fit(X, y, groups=groups)
+        self.best_params_ = dict(self.search.best_params_)
+        self.report = self._build_report(X, y)
+        return self.report
+
+    def _build_report(self, X, y) -> List[Dict]:
+        """Rank final-round candidates and time the top ones on the full data"""
+        results = self.search.cv_results_
+        final_iter = results['iter'].max()
+        final = np.flatnonzero(results['iter'] == final_iter)
+        final = final[np.argsort(-results['mean_test_score'][final], kind='stable')][:self.top_k]
+
+        candidates = [results['params'][i] for i in final]
+        latencies = Parallel(n_jobs=self.n_jobs)(
+            delayed(_fit_and_time)(self.estimator, params, X, y, self.latency_repeats)
+            for params in candidates
+        )
+
+        report = []
+        for rank, (i, latency) in enumerate(zip(final, latencies), start=1):
+            report.append({
+                'rank': rank,
+                'params': results['params'][i],
+                'mean_score': float(results['mean_test_score'][i]),
+                'std_score': float(results['std_test_score'][i]),
+                'n_resources': int(results['n_resources'][i]),
+                'latency_us': latency,
+            })
+
+        # A candidate is on the frontier if nothing else is both better and faster
+        for entry in report:
+            entry['pareto'] = not any(
+                other['mean_score'] >= entry['mean_score'] and other['latency_us'] < entry['latency_us']
+                for other in report if other is not entry
+            )
+        return report
+
+    def save_report(self, path: str = 'models/search_report.json'):
+        """Save the ranked report as JSON"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'scoring': self.scoring,
+                'factor': self.factor,
+                'n_candidates': int(self.search.n_candidates_[0]),
+                'n_iterations': int(self.search.n_iterations_),
+                'best_params': self.best_params_,
+                'candidates': self.report,
+            }, f, indent=2)
+        print(f"Search report saved to {path}")
@@ -1,78 +1,35 @@
-import re
 import ast
 from typing import Dict, List
+from language_identifier import NgramLanguageIdentifier
+from lexers import java_feature_counts, cpp_feature_counts
+from patterns import pattern_registry
 
 class MultiLanguageDetector:
     """Detect bugs in Python, Java, and C++ code"""
     
     def __init__(self):
-        self.supported_languages = ['python', 'java', 'cpp']
+        self.language_identifier = NgramLanguageIdentifier.default()
+        self.supported_languages = list(self.language_identifier.languages)
     
     def detect_language(self, code: str) -> str:
         """Detect the programming language of the code"""
-        # Python detection
-        if self._is_python(code):
-            return 'python'
-        # Java detection
-        elif self._is_java(code):
-            return 'java'
-        # C++ detection
-        elif self._is_cpp(code):
-            return 'cpp'
-        else:
-            return 'unknown'
+        return self.language_identifier.predict(code)[0]
     
-    def _is_python(self, code: str) -> bool:
-        """Check if code is Python"""
-        python_keywords = ['def ', 'import ', 'from ', 'class ', 'if __name__']
-        python_count = sum(1 for kw in python_keywords if kw in code)
-        
-        # Python-specific patterns
-        has_python_patterns = (re.search(r'\bdef\s+\w+\s*\(', code) or
-                              re.search(r'\bimport\s+', code) or
-                              re.search(r'\bfrom\s+\w+\s+import', code))
-        
-        return python_count >= 1 or (has_python_patterns is not None)
-    
-    def _is_java(self, code: str) -> bool:
-        """Check if code is Java"""
-        # Java-specific patterns
-        has_class_def = re.search(r'public\s+(static\s+)?class\s+\w+', code)
-        has_main_method = re.search(r'public\s+static\s+void\s+main\s*\(', code)
-        has_java_imports = re.search(r'import\s+java\.', code)
-        has_package = re.search(r'^\s*package\s+', code, re.MULTILINE)
-        
-        java_indicators = sum([bool(x) for x in [has_class_def, has_main_method, has_java_imports, has_package]])
-        return java_indicators >= 1
-    
-    def _is_cpp(self, code: str) -> bool:
-        """Check if code is C++"""
-        # C++ specific patterns
-        has_include = re.search(r'#include\s*[<"]', code)
-        has_using = re.search(r'\busing\s+namespace\s+std', code)
-        has_namespace = re.search(r'\bnamespace\s+\w+', code)
-        has_template = re.search(r'\btemplate\s*<', code)
-        has_pointers = re.search(r'\w+\s*\*\s*\w+', code)
-        
-        cpp_indicators = sum([bool(x) for x in [has_include, has_using, has_namespace, has_template, has_pointers]])
-        return cpp_indicators >= 1
+    def detect_language_scores(self, code: str) -> Dict[str, float]:
+        """Confidence for every supported language"""
+        return self.language_identifier.scores(code)
     
     def check_python_bugs(self, code: str) -> List[str]:
         """Check for common Python bugs"""
         bugs = []
         
-        # Check for undefined variables
-        if re.search(r'\w+\s*=.*$', code, re.MULTILINE):
-            if not re.search(r'\w+\s*=.*\1', code):
-                pass  # Basic undefined var check
-        
         # Check for mutable default arguments
         if 'def ' in code and '[]' in code or '{}' in code:
-            if re.search(r'def\s+\w+\([^)]*=[\[\{]', code):
+            if pattern_registry.search('python', 'mutable_default', code):
                 bugs.append('Mutable default argument detected')
         
         # Check for except without exception type
-        if re.search(r'except\s*:', code):
+        if pattern_registry.search('python', 'bare_except', code):
             bugs.append('Bare except clause detected - specify exception type')
         
         # Check for missing return statements
@@ -105,7 +62,7 @@ class MultiLanguageDetector:
             bugs.append('Infinite loop detected')
         
         # Check for unhandled exceptions
-        if re.search(r'throw new \w+Exception', code):
+        if pattern_registry.search('java', 'unhandled_throw', code):
             if 'catch' not in code and 'throws' not in code:
                 bugs.append('Exception thrown without handling')
         
@@ -135,7 +92,7 @@ class MultiLanguageDetector:
                 bugs.append('Unsafe string function used - use safe alternatives')
         
         # Check for uninitialized variables
-        if re.search(r'\bint\s+\w+\s*;', code):
+        if pattern_registry.search('cpp', 'uninitialized_int', code):
             bugs.append('Uninitialized variable detected')
         
         # Check for array out of bounds
@@ -148,72 +105,54 @@ class MultiLanguageDetector:
     def extract_python_features(self, code: str) -> List[int]:
         """Extract features specific to Python code"""
         features = []
+        keywords = pattern_registry.keyword_counts('python', code)
         
         # Count of function definitions
-        features.append(len(re.findall(r'\bdef\s+\w+\s*\(', code)))
+        features.append(pattern_registry.count('python', 'func_defs', code))
         
         # Count of class definitions
-        features.append(len(re.findall(r'\bclass\s+\w+', code)))
+        features.append(pattern_registry.count('python', 'class_defs', code))
         
         # Count of imports
-        features.append(len(re.findall(r'\b(import|from)\s+', code)))
+        features.append(pattern_registry.count('python', 'imports', code))
         
         # Count of loops
-        features.append(len(re.findall(r'\b(for|while)\b', code)))
+        features.append(pattern_registry.count_keywords('python', 'loops', keywords))
         
         # Count of conditionals
-        features.append(len(re.findall(r'\b(if|elif|else)\b', code)))
+        features.append(pattern_registry.count_keywords('python', 'conditionals', keywords))
         
         return features
     
     def extract_java_features(self, code: str) -> List[int]:
         """Extract features specific to Java code"""
-        features = []
-        
-        # Count of method definitions
-        features.append(len(re.findall(r'\bpublic\s+\w+\s+\w+\s*\(', code)))
-        
-        # Count of class definitions
-        features.append(len(re.findall(r'\bclass\s+\w+', code)))
-        
-        # Count of try-catch blocks
-        features.append(len(re.findall(r'\btry\s*\{', code)))
-        
-        # Count of for loops
-        features.append(len(re.findall(r'\bfor\s*\(', code)))
-        
-        # Count of if statements
-        features.append(len(re.findall(r'\bif\s*\(', code)))
-        
-        return features
+        counts = java_feature_counts(code)
+        return [
+            counts['public_methods'],  # method definitions
+            counts['class_defs'],      # class definitions
+            counts['try_blocks'],      # try-catch blocks
+            counts['for_loops'],       # for loops
+            counts['if_statements'],   # if statements
+        ]
     
     def extract_cpp_features(self, code: str) -> List[int]:
         """Extract features specific to C++ code"""
-        features = []
-        
-        # Count of function definitions
-        features.append(len(re.findall(r'\w+\s+\w+\s*\([^)]*\)\s*\{', code)))
-        
-        # Count of class definitions
-        features.append(len(re.findall(r'\bclass\s+\w+', code)))
-        
-        # Count of pointers
-        features.append(len(re.findall(r'\w+\s*\*', code)))
-        
-        # Count of memory allocations (new)
-        features.append(len(re.findall(r'\bnew\s+', code)))
-        
-        # Count of memory deallocations (delete)
-        features.append(len(re.findall(r'\bdelete\s+', code)))
-        
-        return features
+        counts = cpp_feature_counts(code)
+        return [
+            counts['function_defs'],  # function definitions
+            counts['class_defs'],     # class definitions
+            counts['pointers'],       # pointers
+            counts['new_exprs'],      # memory allocations (new)
+            counts['delete_exprs'],   # memory deallocations (delete)
+        ]
     
     def analyze_code(self, code: str) -> Dict:
         """Main analysis function for any language"""
-        language = self.detect_language(code)
+        language, language_confidence = self.language_identifier.predict(code)
         
         result = {
             'language': language,
+            'language_confidence': language_confidence,
             'bugs_found': [],
             'severity': 'low',
             'feature_count': 0
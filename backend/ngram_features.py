@@ -0,0 +1,89 @@
+import csv
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer
+
+from config import config
+
+
+# Identifiers/keywords/numbers as one token, every other non-space char alone
+CODE_TOKEN_PATTERN = r'\w+|[^\w\s]'
+
+
+class HashedNgramExtractor:
+    """Extract hashed n-gram features (NG feature set) from code tokens
+
+    Uses the hashing trick, so no vocabulary is kept in memory and the
+    extractor is stateless: the same snippet always maps to the same
+    columns, on any machine and for any corpus size.
+    """
+
+    def __init__(self, n_features: int = None, ngram_range: Tuple[int, int] = None,
+                 batch_size: int = 1000):
+        self.n_features = n_features or config.NGRAM_N_FEATURES
+        self.ngram_range = tuple(ngram_range or config.NGRAM_RANGE)
+        self.batch_size = batch_size
+        self.vectorizer = HashingVectorizer(
+            n_features=self.n_features,
+            ngram_range=self.ngram_range,
+            token_pattern=CODE_TOKEN_PATTERN,
+            lowercase=False,
+            alternate_sign=False,
+            norm='l2',
+            dtype=np.float32,
+        )
+
+    def transform(self, code_snippets: List[str]) -> sp.csr_matrix:
+        """Hash a list of snippets into a CSR matrix"""
+        return self.vectorizer.transform(code_snippets).tocsr()
+
+    def extract_features(self, code: str) -> sp.csr_matrix:
+        """Hash a single snippet into a 1-row CSR matrix"""
+        return self.transform([code])
+
+    def iter_transform(self, code_snippets: Iterable[str]) -> Iterator[sp.csr_matrix]:
+        """Stream snippets and yield one CSR block per batch"""
+        batch = []
+        for code in code_snippets:
+            batch.append(code)
+            if len(batch) >= self.batch_size:
+                yield self.transform(batch)
+                batch = []
+        if batch:
+            yield self.transform(batch)
+
+    def transform_stream(self, code_snippets: Iterable[str]) -> sp.csr_matrix:
+        """Hash a stream of snippets, holding at most one batch of text at a time"""
+        blocks = list(self.iter_transform(code_snippets))
+        if not blocks:
+            return sp.csr_matrix((0, self.n_features), dtype=np.float32)
+        return sp.vstack(blocks, format='csr')
+
+    def augment(self, dense_features: np.ndarray, code_snippets: List[str],
+                n_features_in: Optional[int]) -> np.ndarray:
+        """Append n-gram columns when a model was trained on the combined set
+
+        Models trained on dense features only are left untouched, so the same
+        call site serves both kinds of model.
+        """
+        if n_features_in is None or n_features_in <= dense_features.shape[1]:
+            return dense_features
+        return combine_features(dense_features, self.transform(code_snippets))
+
+
+def combine_features(dense_features: np.ndarray, ngram_features: sp.spmatrix) -> sp.csr_matrix:
+    """Stack dense features and sparse n-gram features column-wise without densifying"""
+    dense_block = sp.csr_matrix(np.asarray(dense_features, dtype=np.float32))
+    return sp.hstack([dense_block, ngram_features], format='csr')
+
+
+def iter_csv_snippets(filepath: str) -> Iterator[Tuple[str, int]]:
+    """Stream (code_snippet, is_bug) pairs from a dataset CSV; a missing snippet is ''"""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            try:
+                yield row.get('code_snippet') or '', int(row.get('is_bug', 0))
+            except (TypeError, ValueError):
+                continue
@@ -0,0 +1,148 @@
+import re
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, Optional, Tuple
+
+from config import config
+
+
+class _PatternStats:
+    """Calls, matches and cumulative match time for one pattern"""
+
+    def __init__(self):
+        self.calls = 0
+        self.hits = 0
+        self.seconds = 0.0
+
+    def summary(self) -> Dict:
+        return {'calls': self.calls, 'hits': self.hits, 'seconds': self.seconds,
+                'mean_us': self.seconds / self.calls * 1e6 if self.calls else 0.0}
+
+
+class PatternRegistry:
+    """Every regex the rule-based analyzers use, compiled once and grouped by language
+
+    Patterns are registered under (language, name) when this module is
+    imported, so requests never go through re's small internal cache.
+    count() and search() run one compiled pattern. Keyword sets added
+    with add_keywords() are whole-word alternatives, which lets all of a
+    language's sets share one combined alternation: keyword_counts()
+    scans the text once for per-word counts and count_keywords() sums
+    them per set. That matches a separate \\b(a|b)\\b findall per set,
+    because a whole word can match only one alternative. Patterns that
+    may overlap each other are left separate.
+
+    With stats on, each call adds to the pattern's calls, hits and
+    cumulative match seconds; the combined keyword pass is timed under
+    (language, 'keywords').
+    """
+
+    def __init__(self, stats: bool = False):
+        self.stats_enabled = stats
+        self.patterns: Dict[Tuple[str, str], re.Pattern] = {}
+        self.keyword_sets: Dict[Tuple[str, str], Tuple[str, ...]] = {}
+        self.keyword_patterns: Dict[str, re.Pattern] = {}
+        self._lock = threading.Lock()
+        self.reset()
+
+    def add(self, language: str, name: str, pattern: str, flags: int = 0) -> re.Pattern:
+        compiled = re.compile(pattern, flags)
+        self.patterns[(language, name)] = compiled
+        return compiled
+
+    def add_keywords(self, language: str, name: str, words: Iterable[str]):
+        """Register a whole-word keyword set and rebuild the language's combined pass"""
+        self.keyword_sets[(language, name)] = tuple(words)
+        vocabulary = sorted({word for (lang, _), words in self.keyword_sets.items()
+                             if lang == language for word in words})
+        self.keyword_patterns[language] = re.compile(
+            r'\b(?:' + '|'.join(re.escape(word) for word in vocabulary) + r')\b')
+
+    def _record(self, key: Tuple[str, str], hits: int, seconds: float):
+        with self._lock:
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = _PatternStats()
+            stats.calls += 1
+            stats.hits += hits
+            stats.seconds += seconds
+
+    def count(self, language: str, name: str, text: str) -> int:
+        """Number of non-overlapping matches, as len(re.findall(...))"""
+        pattern = self.patterns[(language, name)]
+        if not self.stats_enabled:
+            return len(pattern.findall(text))
+        start = time.perf_counter()
+        hits = len(pattern.findall(text))
+        self._record((language, name), hits, time.perf_counter() - start)
+        return hits
+
+    def search(self, language: str, name: str, text: str) -> Optional[re.Match]:
+        pattern = self.patterns[(language, name)]
+        if not self.stats_enabled:
+            return pattern.search(text)
+        start = time.perf_counter()
+        match = pattern.search(text)
+        self._record((language, name), int(match is not None), time.perf_counter() - start)
+        return match
+
+    def keyword_counts(self, language: str, text: str) -> Counter:
+        """Occurrences of every registered keyword of a language, in one pass"""
+        pattern = self.keyword_patterns[language]
+        if not self.stats_enabled:
+            return Counter(pattern.findall(text))
+        start = time.perf_counter()
+        counts = Counter(pattern.findall(text))
+        self._record((language, 'keywords'), sum(counts.values()), time.perf_counter() - start)
+        return counts
+
+    def count_keywords(self, language: str, name: str, counts: Counter) -> int:
+        """Matches of one keyword set, from keyword_counts() of the same text"""
+        hits = sum(counts[word] for word in self.keyword_sets[(language, name)])
+        if self.stats_enabled:
+            self._record((language, name), hits, 0.0)
+        return hits
+
+    def reset(self):
+        with self._lock:
+            self.stats: Dict[Tuple[str, str], _PatternStats] = {}
+
+    def report(self) -> Dict:
+        """Per-language, per-pattern calls, hits and cumulative match time"""
+        with self._lock:
+            stats = {key: s.summary() for key, s in self.stats.items()}
+        languages = {}
+        for language, name in list(self.patterns) + list(self.keyword_sets) + [
+                (language, 'keywords') for language in self.keyword_patterns]:
+            languages.setdefault(language, {})[name] = stats.get((language, name), _PatternStats().summary())
+        return {
+            'enabled': self.stats_enabled,
+            'total_seconds': sum(s['seconds'] for s in stats.values()),
+            'languages': languages,
+        }
+
+
+# Shared by FeatureExtractor, LanguageSpecificExtractor and MultiLanguageDetector
+pattern_registry = PatternRegistry(stats=config.PATTERN_STATS)
+
+# Whole-word keyword sets; each language's sets are counted in one combined pass
+pattern_registry.add_keywords('python', 'loops', ['for', 'while'])
+pattern_registry.add_keywords('python', 'conditionals', ['if', 'elif', 'else'])
+pattern_registry.add_keywords('python', 'exception_keywords', ['try', 'except', 'finally'])
+pattern_registry.add_keywords('python', 'branches', ['if', 'elif', 'for', 'while', 'and', 'or'])
+pattern_registry.add_keywords('python', 'except_clauses', ['except'])
+
+pattern_registry.add('python', 'func_calls', r'\w+\s*\(')
+pattern_registry.add('python', 'assignments', r'\w+\s*=')
+pattern_registry.add('python', 'func_defs', r'\bdef\s+\w+\s*\(')
+pattern_registry.add('python', 'class_defs', r'\bclass\s+\w+')
+pattern_registry.add('python', 'imports', r'\b(import|from)\s+')
+pattern_registry.add('python', 'decorators', r'@\w+')
+pattern_registry.add('python', 'try_blocks', r'\btry\s*:')
+pattern_registry.add('python', 'mutable_default', r'def\s+\w+\([^)]*=[\[\{]')
+pattern_registry.add('python', 'bare_except', r'except\s*:')
+
+pattern_registry.add('java', 'unhandled_throw', r'throw new \w+Exception')
+
+pattern_registry.add('cpp', 'uninitialized_int', r'\bint\s+\w+\s*;')
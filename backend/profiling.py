@@ -0,0 +1,212 @@
+import contextlib
+import contextvars
+import threading
+import tracemalloc
+from collections import defaultdict
+from typing import Dict, List
+
+from config import config
+
+_NULL = contextlib.nullcontext()
+# Marks a request that was not sampled, so its stages skip tracing work
+_SKIPPED = object()
+_current_request = contextvars.ContextVar('allocation_request', default=None)
+
+_IGNORED_FILES = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, __file__),
+]
+
+
+class _Stats:
+    """Count, net and peak bytes for one request type or stage"""
+
+    def __init__(self):
+        self.count = 0
+        self.net_bytes = 0
+        self.peak_bytes = 0
+        self.max_peak_bytes = 0
+
+    def add(self, net: int, peak: int):
+        self.count += 1
+        self.net_bytes += net
+        self.peak_bytes += peak
+        self.max_peak_bytes = max(self.max_peak_bytes, peak)
+
+    def summary(self) -> Dict:
+        count = max(self.count, 1)
+        return {'count': self.count, 'net_bytes_mean': self.net_bytes / count,
+                'peak_bytes_mean': self.peak_bytes / count, 'peak_bytes_max': self.max_peak_bytes}
+
+
+class AllocationProfiler:
+    """Opt-in tracemalloc profiling of the serving path
+
+    request() brackets one request and records its peak traced memory;
+    stage() brackets a step inside it (feature extraction, parsing,
+    prediction) and records the bytes it left allocated and its own peak.
+    Only every sample_every-th request is measured; when profiling is off
+    both calls return a shared no-op context. tracemalloc is process-wide,
+    so figures for requests that overlap in the threadpool include each
+    other's allocations; run with one request at a time for exact numbers.
+
+    Also a context manager for benchmarks:
+
+        with profiler:
+            with profiler.request('bench'):
+                detector.detect_bug(code)
+            print(profiler.report())  # allocation sites need tracing still on
+    """
+
+    def __init__(self, enabled: bool = False, sample_every: int = 1, frames: int = 1):
+        self.sample_every = max(1, sample_every)
+        self.frames = frames
+        self.enabled = False
+        self._started_tracing = False
+        self._lock = threading.Lock()
+        self.reset()
+        if enabled:
+            self.start()
+
+    def reset(self):
+        """Clear collected figures and take a new baseline for growth reports"""
+        with self._lock:
+            self.requests_seen = 0
+            self.request_stats = defaultdict(_Stats)
+            self.stage_stats = defaultdict(_Stats)
+        self.baseline = self._snapshot() if tracemalloc.is_tracing() else None
+
+    def start(self):
+        """Begin tracing allocations (no-op if already profiling)"""
+        if self.enabled:
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracing = True
+        self.enabled = True
+        self.baseline = self._snapshot()
+
+    def stop(self):
+        """Stop profiling; collected figures stay readable until reset()"""
+        self.enabled = False
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(_IGNORED_FILES)
+
+    def request(self, name: str):
+        """Context for one request; sampled requests record their peak bytes"""
+        if not self.enabled:
+            return _NULL
+        with self._lock:
+            self.requests_seen += 1
+            sampled = self.requests_seen % self.sample_every == 0
+        if not sampled:
+            return self._skip()
+        return self._request(name)
+
+    def stage(self, name: str):
+        """Context for one step; a no-op unless profiling and in a sampled request"""
+        state = _current_request.get()
+        if not self.enabled or state is _SKIPPED:
+            return _NULL
+        return self._stage(name, state)
+
+    @contextlib.contextmanager
+    def _skip(self):
+        token = _current_request.set(_SKIPPED)
+        try:
+            yield
+        finally:
+            _current_request.reset(token)
+
+    @contextlib.contextmanager
+    def _request(self, name: str):
+        start, _ = tracemalloc.get_traced_memory()
+        state = {'peak': start}
+        tracemalloc.reset_peak()
+        token = _current_request.set(state)
+        try:
+            yield
+        finally:
+            _current_request.reset(token)
+            current, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, state['peak'])
+            with self._lock:
+                self.request_stats[name].add(current - start, peak - start)
+
+    @contextlib.contextmanager
+    def _stage(self, name: str, state):
+        before, peak_so_far = tracemalloc.get_traced_memory()
+        if state is not None:
+            # Resetting for this stage must not lose the request's earlier peak
+            state['peak'] = max(state['peak'], peak_so_far)
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            if state is not None:
+                state['peak'] = max(state['peak'], peak)
+            with self._lock:
+                self.stage_stats[name].add(current - before, peak - before)
+
+    def top_sites(self, limit: int = 20, group_by: str = 'lineno') -> List[Dict]:
+        """Largest live allocation sites (group_by: lineno, filename or traceback)"""
+        if not tracemalloc.is_tracing():
+            return []
+        return [self._site(stat, group_by) for stat in self._snapshot().statistics(group_by)[:limit]]
+
+    def growth_sites(self, limit: int = 20, group_by: str = 'lineno') -> List[Dict]:
+        """Sites whose live allocations grew most since start() or reset()"""
+        if not tracemalloc.is_tracing() or self.baseline is None:
+            return []
+        diffs = self._snapshot().compare_to(self.baseline, group_by)
+        return [dict(self._site(diff, group_by), size_diff_bytes=diff.size_diff, count_diff=diff.count_diff)
+                for diff in diffs[:limit] if diff.size_diff > 0]
+
+    @staticmethod
+    def _site(stat, group_by: str) -> Dict:
+        if group_by == 'traceback':
+            site = [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback]
+        elif group_by == 'filename':
+            site = stat.traceback[0].filename
+        else:
+            site = f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}"
+        return {'site': site, 'size_bytes': stat.size, 'count': stat.count}
+
+    def report(self, limit: int = 20, group_by: str = 'lineno') -> Dict:
+        """Per-request and per-stage figures plus the top and fastest-growing sites"""
+        current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        with self._lock:
+            requests = {name: stats.summary() for name, stats in self.request_stats.items()}
+            stages = {name: stats.summary() for name, stats in self.stage_stats.items()}
+        return {
+            'enabled': self.enabled,
+            'sample_every': self.sample_every,
+            'requests_seen': self.requests_seen,
+            'traced_current_bytes': current,
+            'traced_peak_bytes': peak,
+            'requests': requests,
+            'stages': stages,
+            'top_sites': self.top_sites(limit, group_by),
+            'growth_sites': self.growth_sites(limit, group_by),
+        }
+
+
+# Shared by the API and BugDetector; off unless PROFILE_ALLOCATIONS=1
+profiler = AllocationProfiler(enabled=config.PROFILE_ALLOCATIONS,
+                              sample_every=config.PROFILE_SAMPLE_EVERY,
+                              frames=config.PROFILE_TRACEBACK_FRAMES)
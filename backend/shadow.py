@@ -0,0 +1,201 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import joblib
+import numpy as np
+
+from config import config
+
+
+class CandidateStats:
+    """Streaming agreement, confidence-delta and latency figures for one candidate"""
+
+    def __init__(self, latency_window: int):
+        self.lock = threading.Lock()
+        self.scored = 0
+        self.errors = 0
+        self.agreements = {}
+        self.delta_mean = 0.0
+        self.delta_m2 = 0.0
+        self.delta_abs_sum = 0.0
+        self.bug_rate_sum = 0
+        # Recent latencies only, so percentiles track the current model and load
+        self.latencies = deque(maxlen=latency_window)
+
+    def add(self, predictions: np.ndarray, confidences: np.ndarray, served: Dict, seconds: float):
+        predictions = np.asarray(predictions)
+        deltas = np.asarray(confidences, dtype=float) - np.asarray(served['confidence'], dtype=float)
+        references = dict(served['references'], served=served['decision'])
+        with self.lock:
+            self.latencies.append(seconds)
+            self.bug_rate_sum += int(predictions.sum())
+            for name, reference in references.items():
+                agree, total = self.agreements.get(name, (0, 0))
+                self.agreements[name] = (agree + int(np.sum(predictions == np.asarray(reference))),
+                                         total + len(predictions))
+            # Welford's update of the confidence delta against the served answer
+            for delta in deltas.tolist():
+                self.scored += 1
+                previous = self.delta_mean
+                self.delta_mean += (delta - previous) / self.scored
+                self.delta_m2 += (delta - previous) * (delta - self.delta_mean)
+                self.delta_abs_sum += abs(delta)
+
+    def add_error(self):
+        with self.lock:
+            self.errors += 1
+
+    def summary(self) -> Dict:
+        with self.lock:
+            scored = self.scored
+            latencies = np.array(self.latencies) * 1000
+            summary = {
+                'scored': scored,
+                'errors': self.errors,
+                'agreement': {name: agree / total for name, (agree, total) in self.agreements.items()},
+                'bug_rate': self.bug_rate_sum / scored if scored else 0.0,
+                'confidence_delta_mean': self.delta_mean,
+                'confidence_delta_std': float(np.sqrt(self.delta_m2 / scored)) if scored else 0.0,
+                'confidence_delta_abs_mean': self.delta_abs_sum / scored if scored else 0.0,
+            }
+        if latencies.size:
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            summary['latency_ms'] = {'p50': float(p50), 'p95': float(p95), 'p99': float(p99),
+                                     'max': float(latencies.max())}
+        else:
+            summary['latency_ms'] = {}
+        return summary
+
+
+class ShadowCandidate:
+    """A candidate model plus the scaler it was trained with"""
+
+    def __init__(self, name: str, model, scaler):
+        self.name = name
+        self.models = model if isinstance(model, list) else [model]
+        for member in self.models:
+            # One thread per prediction; shadow work must not fan out across cores
+            if hasattr(member, 'n_jobs'):
+                member.n_jobs = 1
+        self.scaler = scaler
+
+    def predict(self, features: np.ndarray, codes: List[str], ngram_extractor=None):
+        """Majority-vote predictions and mean max-probability confidences"""
+        if ngram_extractor is not None:
+            features = ngram_extractor.augment(features, codes, getattr(self.scaler, 'n_features_in_', None))
+        X = self.scaler.transform(features)
+        predictions = np.round(np.mean([model.predict(X) for model in self.models], axis=0)).astype(int)
+        confidences = np.mean([model.predict_proba(X).max(axis=1) for model in self.models], axis=0)
+        return predictions, confidences
+
+
+def parse_candidates(spec: str) -> Dict[str, tuple]:
+    """'name=model.pkl:scaler.pkl,other=...' -> {name: (model_path, scaler_path)}"""
+    candidates = {}
+    for part in filter(None, (p.strip() for p in spec.split(','))):
+        name, _, paths = part.partition('=')
+        model_path, _, scaler_path = paths.partition(':')
+        if not model_path or not scaler_path:
+            raise ValueError(f"Shadow candidate '{part}' must look like name=model.pkl:scaler.pkl")
+        candidates[name.strip()] = (model_path, scaler_path)
+    return candidates
+
+
+class ShadowEvaluator:
+    """Score a sample of live traffic against candidate models, off the request path
+
+    The endpoint only decides whether to sample and hands the already
+    extracted features to submit(), which runs after the response has been
+    sent. Scoring happens on a small dedicated thread pool; when more than
+    max_pending batches are waiting the batch is dropped and counted, so
+    shadow work can never build a backlog or hold request threads.
+    """
+
+    def __init__(self, sample_rate: float = None, workers: int = None, max_pending: int = None,
+                 latency_window: int = None, ngram_extractor=None):
+        self.sample_rate = config.SHADOW_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.workers = workers or config.SHADOW_WORKERS
+        self.max_pending = max_pending or config.SHADOW_MAX_PENDING
+        self.latency_window = latency_window or config.SHADOW_LATENCY_WINDOW
+        self.ngram_extractor = ngram_extractor
+        self.candidates: Dict[str, ShadowCandidate] = {}
+        self.stats: Dict[str, CandidateStats] = {}
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.submitted = 0
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.candidates)
+
+    def add_candidate(self, name: str, model, scaler):
+        """Register (or replace) a candidate and start its stats afresh"""
+        self.candidates[name] = ShadowCandidate(name, model, scaler)
+        self.stats[name] = CandidateStats(self.latency_window)
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='shadow')
+
+    def load_candidates(self, spec: str = None):
+        """Load candidates from a SHADOW_CANDIDATES-style spec, skipping missing files"""
+        for name, (model_path, scaler_path) in parse_candidates(spec or config.SHADOW_CANDIDATES).items():
+            try:
+                self.add_candidate(name, joblib.load(model_path), joblib.load(scaler_path))
+            except (OSError, EOFError) as e:
+                print(f"Shadow candidate '{name}' not loaded: {e}")
+
+    def should_sample(self) -> bool:
+        return self.enabled and random.random() < self.sample_rate
+
+    def submit(self, features: np.ndarray, codes: List[str], served: Dict):
+        """Queue one batch for every candidate; drops it if the queue is full
+
+        served holds per-row 'decision' and 'confidence' arrays for what the
+        API returned, and 'references': {serving model name: predictions}.
+        """
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.dropped += 1
+                return
+            self.pending += 1
+            self.submitted += 1
+        future = self.executor.submit(self._score, features, codes, served)
+        future.add_done_callback(self._done)
+
+    def _done(self, _):
+        with self._lock:
+            self.pending -= 1
+
+    def _score(self, features: np.ndarray, codes: List[str], served: Dict):
+        for name, candidate in list(self.candidates.items()):
+            stats = self.stats[name]
+            start = time.perf_counter()
+            try:
+                predictions, confidences = candidate.predict(features, codes, self.ngram_extractor)
+            except Exception:
+                stats.add_error()
+                continue
+            stats.add(predictions, confidences, served, time.perf_counter() - start)
+
+    def reset(self):
+        """Clear every candidate's stats"""
+        for name in self.stats:
+            self.stats[name] = CandidateStats(self.latency_window)
+        with self._lock:
+            self.submitted = 0
+            self.dropped = 0
+
+    def report(self) -> Dict:
+        with self._lock:
+            queue = {'submitted': self.submitted, 'dropped': self.dropped, 'pending': self.pending}
+        return {
+            'enabled': self.enabled,
+            'sample_rate': self.sample_rate,
+            'queue': queue,
+            'candidates': {name: stats.summary() for name, stats in self.stats.items()},
+        }
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# Backend modules import each other flat ("from config import config")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def corpus():
+    """A small labeled corpus from the synthetic generator: (codes, labels, languages)"""
+    from corpus_generator import CorpusGenerator
+
+    rows = list(CorpusGenerator(seed=3).iter_rows(0, 400))
+    return ([code for code, _, _, _ in rows], [label for _, label, _, _ in rows],
+            [language for _, _, language, _ in rows])
@@ -0,0 +1,112 @@
+import asyncio
+import json
+
+import pytest
+
+import admission
+from admission import AdmissionMiddleware, EndpointLimiter
+
+
+@pytest.fixture(autouse=True)
+def isolated_registry(monkeypatch):
+    # Keep these limiters out of the app's /admin/admission stats
+    monkeypatch.setattr(admission, 'admission_registry', {})
+
+
+def make_app(release: asyncio.Event):
+    """ASGI app that holds every request until release is set"""
+    async def app(scope, receive, send):
+        await release.wait()
+        await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b'{}'})
+    return app
+
+
+async def call(middleware, timeout_ms=None):
+    headers = [(b'x-request-timeout-ms', str(timeout_ms).encode())] if timeout_ms else []
+    scope = {'type': 'http', 'path': '/detect_bug', 'method': 'POST', 'headers': headers}
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await middleware(scope, receive, send)
+    start = messages[0]
+    return start['status'], dict(start['headers']), json.loads(messages[1]['body'] or b'{}')
+
+
+def test_full_queue_is_shed_with_retry_after_and_permits_come_back():
+    async def scenario():
+        release = asyncio.Event()
+        middleware = AdmissionMiddleware(make_app(release), limits={'/detect_bug': (1, 1)},
+                                         default_timeout=0, retry_after=7)
+        limiter = middleware.limiters['/detect_bug']
+        running = asyncio.ensure_future(call(middleware))
+        waiting = asyncio.ensure_future(call(middleware))
+        await asyncio.sleep(0.01)
+        assert (limiter.in_flight, limiter.queued) == (1, 1)
+
+        status, headers, body = await call(middleware)
+        assert status == 503
+        assert headers[b'retry-after'] == b'7'
+        assert 'overloaded' in body['detail']
+
+        release.set()
+        assert [r[0] for r in await asyncio.gather(running, waiting)] == [200, 200]
+        await asyncio.sleep(0)
+        assert (limiter.in_flight, limiter.queued) == (0, 0)
+        assert limiter.stats['admitted'] == 2 and limiter.stats['shed'] == 1
+        assert await limiter.acquire(0.01)
+        limiter.release()
+
+    asyncio.run(scenario())
+
+
+def test_deadline_gives_504_while_queued_and_while_running():
+    async def scenario():
+        release = asyncio.Event()
+        middleware = AdmissionMiddleware(make_app(release), limits={'/detect_bug': (1, 4)},
+                                         default_timeout=0, retry_after=1)
+        limiter = middleware.limiters['/detect_bug']
+        # The first request runs past its deadline; the second never gets a slot
+        results = await asyncio.gather(call(middleware, timeout_ms=50), call(middleware, timeout_ms=20))
+        for status, _, body in results:
+            assert status == 504
+            assert body['detail'] == 'Request deadline exceeded'
+        assert limiter.stats['timed_out'] == 1 and limiter.stats['expired_in_queue'] == 1
+
+        # The abandoned request keeps its slot until the work finishes
+        assert limiter.in_flight == 1
+        release.set()
+        await asyncio.sleep(0.01)
+        assert (limiter.in_flight, limiter.queued) == (0, 0)
+        assert not limiter.semaphore.locked()
+
+    asyncio.run(scenario())
+
+
+def test_client_deadline_is_capped_by_server_default():
+    middleware = AdmissionMiddleware(None, limits={'/detect_bug': (1, 1)}, default_timeout=2.0)
+
+    def timeout(value):
+        return middleware._timeout({'headers': [(b'x-request-timeout-ms', value)]})
+
+    assert timeout(b'500') == 0.5
+    assert timeout(b'60000') == 2.0
+    assert timeout(b'soon') == 2.0
+
+
+def test_limiter_queue_bound():
+    async def scenario():
+        limiter = EndpointLimiter(max_concurrency=1, max_queue=0)
+        assert limiter.has_room()
+        assert await limiter.acquire(None)
+        assert not limiter.has_room()
+        assert not await limiter.acquire(0.01)
+        limiter.release()
+        assert limiter.has_room()
+
+    asyncio.run(scenario())
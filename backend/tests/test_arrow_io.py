@@ -0,0 +1,72 @@
+import numpy as np
+import pyarrow as pa
+import pytest
+from fastapi.testclient import TestClient
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+import arrow_io
+from count_features import count_features_batch, count_features_buffer
+
+SNIPPETS = ["def f(x):\n    return x\n", "", "for (int i = 0; i < n; i++) {}", "naïve = 'é'\n"]
+
+
+@pytest.mark.parametrize('string_type', [pa.string(), pa.large_string()])
+def test_packed_snippets_count_like_python_strings(string_type):
+    column = pa.array(['skipped'] + SNIPPETS, type=string_type).slice(1)
+    data, offsets = arrow_io.packed_snippets(column)
+    assert len(offsets) == len(SNIPPETS) + 1
+    np.testing.assert_array_equal(count_features_buffer(data, offsets), count_features_batch(SNIPPETS))
+
+
+def test_ipc_stream_and_file_round_trip(tmp_path):
+    table = pa.table({'code_snippet': SNIPPETS, 'id': pa.array(['a', 'b', 'c', 'd'])})
+    column, ids = arrow_io.read_snippet_column(arrow_io.write_stream(table))
+    assert column.to_pylist() == SNIPPETS and ids.to_pylist() == ['a', 'b', 'c', 'd']
+    arrow_io.write_file(table, str(tmp_path / 'batch.arrow'))
+    assert arrow_io.read_snippets(str(tmp_path / 'batch.arrow'))[0] == SNIPPETS
+
+
+@pytest.mark.parametrize('table, message', [
+    (pa.table({'code': ['x']}), "must contain"),
+    (pa.table({'code_snippet': [1, 2]}), "must be a string column"),
+    (pa.table({'code_snippet': ['x', None]}), "null"),
+])
+def test_invalid_batches_are_value_errors(table, message):
+    with pytest.raises(ValueError, match=message):
+        arrow_io.read_snippet_column(arrow_io.write_stream(table))
+
+
+def test_result_table_uses_compact_types():
+    ids = pa.chunked_array([pa.array([7, 9], type=pa.int64())])
+    table = arrow_io.build_result_table(np.array([1, 0]), np.array([0.9, 0.6]),
+                                        arrow_io.language_codes(['cpp', 'klingon']), ids)
+    assert table.schema.field('prediction').type == pa.int8()
+    assert table.schema.field('confidence').type == pa.float32()
+    assert table.column('id').to_pylist() == [7, 9]
+    assert table.column('language').to_pylist() == ['cpp', 'unknown']
+
+
+def test_endpoint_matches_single_snippet_detection(corpus, monkeypatch):
+    import app
+
+    codes, labels, _ = corpus
+    X = count_features_batch(codes).astype(float)
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(scaler.transform(X), labels)
+    monkeypatch.setattr(app, 'baseline_model', model)
+    monkeypatch.setattr(app, 'baseline_scaler', scaler)
+    client = TestClient(app.app)
+
+    batch = pa.table({'code_snippet': codes[:20], 'id': np.arange(20)})
+    response = client.post('/detect_bug/arrow', content=arrow_io.write_stream(batch))
+    assert response.status_code == 200
+    result = pa.ipc.open_stream(response.content).read_all()
+    assert result.column('id').to_pylist() == list(range(20))
+    singles = [client.post('/detect_bug', json={'code_snippet': code}).json() for code in codes[:20]]
+    assert result.column('prediction').to_pylist() == [s['baseline_prediction'] for s in singles]
+    np.testing.assert_allclose(result.column('confidence').to_numpy(),
+                               [s['baseline_confidence'] for s in singles], rtol=1e-6)
+
+    bad = client.post('/detect_bug/arrow', content=arrow_io.write_stream(pa.table({'code_snippet': ['x', None]})))
+    assert bad.status_code == 400
@@ -0,0 +1,41 @@
+import numpy as np
+import pyarrow as pa
+import pytest
+
+import arrow_io
+from bug_detector import BugDetector
+from count_features import count_features_batch
+from ngram_features import HashedNgramExtractor, combine_features
+from train_model import BaselineModelTrainer, ImprovedModelTrainer
+
+
+@pytest.mark.parametrize('ngrams', [False, True])
+def test_arrow_file_mode_scores_freshly_trained_models(tmp_path, monkeypatch, corpus, ngrams):
+    codes, labels, _ = corpus
+    monkeypatch.chdir(tmp_path)
+    X = count_features_batch(codes).astype(float)
+    if ngrams:
+        X = combine_features(X, HashedNgramExtractor().transform(codes))
+    y = np.array(labels)
+    baseline = BaselineModelTrainer({'n_estimators': 10})
+    baseline.train(X, y)
+    baseline.save_model()
+    improved = ImprovedModelTrainer({'n_estimators': 10})
+    improved.train(X, y)
+    improved.save_model()
+
+    detector = BugDetector()
+    assert detector.baseline_model is not None and detector.improved_model is not None
+    table = pa.table({'code_snippet': codes, 'id': np.arange(len(codes))})
+    arrow_io.write_file(table, str(tmp_path / 'in.arrow'))
+    n_rows = detector.detect_arrow_file(str(tmp_path / 'in.arrow'), str(tmp_path / 'out.arrow'))
+
+    with pa.memory_map(str(tmp_path / 'out.arrow')) as f:
+        result = pa.ipc.open_file(f).read_all()
+    assert n_rows == result.num_rows == len(codes)
+    assert result.column('id').to_pylist() == list(range(len(codes)))
+    # Same matrix and votes as the API's path
+    scaled = improved.scaler.transform(X)
+    votes = np.round(np.mean([model.predict(scaled) for model in improved.models], axis=0))
+    np.testing.assert_array_equal(result.column('prediction').to_numpy(), votes)
+    assert np.all(result.column('confidence').to_numpy() <= 0.95)
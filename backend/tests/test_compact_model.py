@@ -0,0 +1,76 @@
+import os
+import pickle
+
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+from compact_model import CompactTreeModel
+from config import config
+from count_features import count_features_batch
+from explanations import TreePathExplainer
+from train_model import DistilledModelTrainer, ImprovedModelTrainer
+
+
+def _data(sparse):
+    rng = np.random.default_rng(0)
+    if sparse:
+        X = sp.random(1500, 2000, density=0.01, format='csr', random_state=1)
+        return X, (np.asarray(X[:, :40].sum(axis=1)).ravel() > 0.1).astype(int)
+    X = rng.normal(size=(1500, 8))
+    return X, (X[:, 0] * X[:, 1] + 0.3 * rng.normal(size=1500) > 0).astype(int)
+
+
+@pytest.mark.parametrize('sparse', [False, True])
+@pytest.mark.parametrize('model', [DecisionTreeClassifier(max_depth=10, random_state=0),
+                                   RandomForestClassifier(n_estimators=8, max_depth=12, random_state=0)])
+def test_matches_sklearn_exactly(model, sparse):
+    X, y = _data(sparse)
+    model.fit(X, y)
+    compact = CompactTreeModel(model)
+    np.testing.assert_array_equal(compact.predict_proba(X), model.predict_proba(X))
+    # Single rows take the Python-list walk
+    for i in range(20):
+        np.testing.assert_array_equal(compact.predict_proba(X[i:i + 1]), model.predict_proba(X[i:i + 1]))
+    np.testing.assert_array_equal(compact.predict(X), model.predict(X))
+
+
+def test_pickle_keeps_only_node_arrays():
+    X, y = _data(False)
+    forest = RandomForestClassifier(n_estimators=8, random_state=0).fit(X, y)
+    compact = CompactTreeModel(forest)
+    compact.predict(X[:1])
+    assert not hasattr(compact, 'estimators_')
+    restored = pickle.loads(pickle.dumps(compact))
+    assert restored._lists is None
+    np.testing.assert_array_equal(restored.predict_proba(X), forest.predict_proba(X))
+    assert len(pickle.dumps(compact)) < len(pickle.dumps(forest)) / 2
+
+
+def test_explainer_reads_compact_node_arrays():
+    X, y = _data(False)
+    compact = CompactTreeModel(RandomForestClassifier(n_estimators=5, random_state=0).fit(X, y))
+    explainer = TreePathExplainer(compact)
+    totals = np.asarray(explainer.contributions(X[:200]).sum(axis=1)).ravel() + explainer.bias
+    np.testing.assert_allclose(totals, compact.predict_proba(X[:200])[:, 1], atol=1e-9)
+
+
+def test_distilled_student_reports_served_size(tmp_path, monkeypatch, corpus):
+    codes, labels, _ = corpus
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, 'DISTILLED_MODEL_PATH', str(tmp_path / 'distilled.pkl'))
+    monkeypatch.setattr(config, 'DISTILLED_SCALER_PATH', str(tmp_path / 'distilled_scaler.pkl'))
+    X, y = count_features_batch(codes).astype(float), np.array(labels)
+    teacher = ImprovedModelTrainer({'n_estimators': 10})
+    teacher.train(X, y)
+
+    distilled = DistilledModelTrainer(teacher.models, teacher.scaler)
+    metrics = distilled.train(X, y)
+    distilled.save_model()
+    assert isinstance(distilled.model, CompactTreeModel)
+    assert metrics['student_size_bytes'] == os.path.getsize(config.DISTILLED_MODEL_PATH)
+    assert metrics['student_size_bytes'] < metrics['teacher_size_bytes']
+    assert 0.0 <= metrics['agreement'] <= 1.0
+    assert (metrics['n_estimators'], metrics['max_depth']) in config.DISTILL_CANDIDATES
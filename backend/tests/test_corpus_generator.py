@@ -0,0 +1,52 @@
+import csv
+import json
+from collections import Counter
+
+import pytest
+
+from corpus_generator import CORPUS_FIELDS, CorpusGenerator, generate_corpus
+from multi_language_detector import MultiLanguageDetector
+
+
+def read_shards(manifest):
+    rows = []
+    for shard in manifest['shards']:
+        with open(shard['path'], newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            assert next(reader) == CORPUS_FIELDS
+            rows.extend(reader)
+    return rows
+
+
+def test_labels_agree_with_the_rule_checks():
+    detector = MultiLanguageDetector()
+    checks = {'python': detector.check_python_bugs, 'java': detector.check_java_bugs,
+              'cpp': detector.check_cpp_bugs}
+    for code, is_bug, language, pattern in CorpusGenerator(seed=9).iter_rows(0, 600):
+        assert bool(checks[language](code)) == bool(is_bug), (pattern, code)
+        assert bool(pattern) == bool(is_bug)
+
+
+def test_weights_and_bug_rate_shape_the_rows():
+    generator = CorpusGenerator(seed=2, language_weights={'python': 3.0, 'cpp': 1.0}, bug_rate=0.5)
+    rows = list(generator.iter_rows(0, 2000))
+    languages = Counter(row[2] for row in rows)
+    assert set(languages) == {'python', 'cpp'}
+    assert languages['python'] / len(rows) == pytest.approx(0.75, abs=0.04)
+    assert sum(row[1] for row in rows) / len(rows) == pytest.approx(0.5, abs=0.04)
+
+
+def test_shards_do_not_depend_on_the_number_of_jobs(tmp_path):
+    generator = CorpusGenerator(seed=4)
+    serial = generate_corpus(str(tmp_path / 'serial'), 250, shard_rows=100, n_jobs=1, generator=generator)
+    parallel = generate_corpus(str(tmp_path / 'parallel'), 250, shard_rows=100, n_jobs=2, generator=generator)
+
+    rows = read_shards(serial)
+    assert rows == read_shards(parallel)
+    assert [shard['rows'] for shard in serial['shards']] == [100, 100, 50]
+    assert rows[:100] == [[code, str(bug), language, pattern]
+                          for code, bug, language, pattern in generator.iter_rows(0, 100)]
+
+    manifest = json.loads((tmp_path / 'serial' / 'manifest.json').read_text())
+    assert manifest['rows'] == 250 and manifest['seed'] == 4
+    assert manifest['bugs'] == sum(row[1] == '1' for row in rows)
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from count_features import (COUNT_FEATURE_NAMES, MIN_PACKED_BATCH, count_features, count_features_batch,
+                            count_features_buffer, count_features_packed, pack_snippets)
+
+TOKENS = {'for': 'for', 'if': 'if', '(': '(', '=': '=', 'def': 'def', 'lines': '\n',
+          'try': 'try', '[': '[', 'import': 'import'}
+
+EDGE_CASES = [
+    '',
+    'fo', 'r x in y:',          # a keyword split across two snippets must not count
+    'import', 'def', 'if',      # keywords filling a whole snippet
+    'iif ifif deff tryy fortry',
+    'naïve = "héllo" # ünïcödé\n',
+    '日本語のコメント = [1, 2]\n',
+    'emoji = "🐍🐍" if ok else "☕"\n',
+    'lone surrogate \ud800 = x\n',
+    '\n\n\n',
+]
+
+
+def reference(code: str):
+    return [len(code) if name == 'length' else code.count(TOKENS[name]) for name in COUNT_FEATURE_NAMES]
+
+
+def random_snippets(n: int, seed: int):
+    rng = np.random.RandomState(seed)
+    pieces = ['for ', 'if ', 'def ', 'try:', 'import ', '(', ')', '=', '[', ']', '\n', 'x', ' ',
+              'fo', 'r', 'im', 'port', 'é', '漢', '🐍', '']
+    return [''.join(rng.choice(pieces, size=rng.randint(0, 40))) for _ in range(n)]
+
+
+def test_single_snippet_counts_match_str_count():
+    for code in EDGE_CASES:
+        assert count_features(code) == reference(code)
+
+
+@pytest.mark.parametrize('chunk_bytes', [1, 7, 64, 1 << 16])
+def test_packed_kernel_matches_str_count(chunk_bytes):
+    codes = EDGE_CASES + random_snippets(300, seed=chunk_bytes)
+    expected = np.array([reference(code) for code in codes])
+    buffer, offsets = pack_snippets(codes)
+    np.testing.assert_array_equal(count_features_packed(buffer, offsets), expected)
+    np.testing.assert_array_equal(count_features_buffer(buffer, offsets, chunk_bytes), expected)
+    np.testing.assert_array_equal(count_features_batch(codes, chunk_bytes), expected)
+
+
+def test_offsets_may_start_inside_the_buffer():
+    codes = random_snippets(20, seed=1)
+    buffer, offsets = pack_snippets(['prefix for if (', *codes])
+    np.testing.assert_array_equal(count_features_packed(buffer, offsets[1:]),
+                                  [reference(code) for code in codes])
+
+
+def test_small_and_empty_batches():
+    assert count_features_batch([]).shape == (0, len(COUNT_FEATURE_NAMES))
+    codes = EDGE_CASES[:MIN_PACKED_BATCH - 1]
+    np.testing.assert_array_equal(count_features_batch(codes), [reference(code) for code in codes])
+    np.testing.assert_array_equal(count_features_batch([''] * 100), np.zeros((100, len(COUNT_FEATURE_NAMES))))
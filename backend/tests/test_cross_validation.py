@@ -0,0 +1,55 @@
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+from count_features import count_features_batch
+from cross_validation import ParallelCrossValidator
+
+
+def test_folds_are_cached_per_labels_and_groups(corpus):
+    _, labels, _ = corpus
+    y = np.array(labels)
+    validator = ParallelCrossValidator(n_splits=3, n_jobs=1)
+    X = np.zeros((len(y), 1))
+    models = {'tree': DecisionTreeClassifier(max_depth=1, random_state=0)}
+    validator.evaluate(X, y, models)
+    folds = validator.folds
+    validator.evaluate(X, y.copy(), models)
+    assert validator.folds is folds
+
+    # Same length, different labels: fresh folds
+    validator.evaluate(X, y[::-1].copy(), models)
+    assert validator.folds is not folds
+    folds = validator.folds
+    groups = np.arange(len(y)) // 5
+    validator.evaluate(X, y[::-1].copy(), models, groups)
+    assert validator.folds is not folds
+
+
+def test_groups_never_straddle_folds(corpus):
+    _, labels, _ = corpus
+    y = np.array(labels)
+    groups = np.arange(len(y)) // 5
+    folds = ParallelCrossValidator(n_splits=4).make_folds(y, groups)
+    tested = np.concatenate([test for _, test in folds])
+    assert sorted(tested) == list(range(len(y)))
+    for train, test in folds:
+        assert not set(groups[train]) & set(groups[test])
+
+
+def test_reports_members_and_ensemble_vote(corpus):
+    codes, labels, _ = corpus
+    X, y = count_features_batch(codes).astype(float), np.array(labels)
+    validator = ParallelCrossValidator(n_splits=3, n_jobs=2)
+    summary = validator.evaluate(X, y, {
+        'baseline': RandomForestClassifier(n_estimators=5, random_state=0),
+        'improved': [RandomForestClassifier(n_estimators=5, random_state=0),
+                     DecisionTreeClassifier(max_depth=3, random_state=0)],
+    })
+    assert {'baseline', 'improved', 'improved[0]', 'improved[1]', 'timing'} <= set(summary)
+    for name in ('baseline', 'improved'):
+        assert 0.0 <= summary[name]['f1_mean'] <= 1.0 and summary[name]['f1_std'] >= 0.0
+    assert summary['timing']['slowest_fold_seconds'] <= summary['timing']['total_fold_seconds']
+    # Same folds, same seeds: a second run scores identically
+    again = validator.evaluate(X, y, {'baseline': RandomForestClassifier(n_estimators=5, random_state=0)})
+    assert again['baseline'] == summary['baseline']
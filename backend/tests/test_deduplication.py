@@ -0,0 +1,69 @@
+import csv
+import json
+
+import numpy as np
+import pytest
+
+from deduplication import MinHashDeduplicator, _shingle_hashes
+
+BASE = '\n'.join(f"def handler_{i}(request):\n    value = request.args.get('key_{i}')\n    return value + {i}"
+                 for i in range(12)) + '\n'
+
+
+def near_duplicate(code: str) -> str:
+    """A copy with one identifier renamed and a trailing comment"""
+    return code.replace('handler_3', 'handle_three') + '# reviewed\n'
+
+
+def distinct(seed: int) -> str:
+    rng = np.random.RandomState(seed)
+    return '\n'.join(f"int f{seed}_{i}(int x) {{ return x * {rng.randint(1000)} + {rng.randint(1000)}; }}"
+                     for i in range(10)) + '\n'
+
+
+def test_near_duplicates_share_a_cluster_and_distinct_snippets_do_not():
+    dedup = MinHashDeduplicator(num_perm=128, bands=32, threshold=0.7, shingle_size=5, n_jobs=1)
+    codes = [BASE, distinct(1), near_duplicate(BASE), distinct(2), BASE, distinct(3)]
+    ids = dedup.cluster_ids(codes)
+    assert ids.tolist() == [0, 1, 0, 3, 0, 5]
+
+    report = dedup.cluster_report()
+    assert (report['rows'], report['unique_rows'], report['duplicate_rows']) == (6, 4, 2)
+    assert report['clusters'] == [{'representative_row': 0, 'size': 3}]
+
+
+def test_signature_agreement_estimates_jaccard():
+    dedup = MinHashDeduplicator(num_perm=256, bands=64, shingle_size=5, n_jobs=1)
+    other = near_duplicate(BASE)
+    a, b = set(_shingle_hashes(BASE, 5).tolist()), set(_shingle_hashes(other, 5).tolist())
+    signatures = dedup.signatures([BASE, other])
+    estimate = np.mean(signatures[0] == signatures[1])
+    assert estimate == pytest.approx(len(a & b) / len(a | b), abs=0.1)
+
+
+def test_parallel_chunks_match_a_single_process():
+    codes = [distinct(i % 7) if i % 3 else near_duplicate(BASE) for i in range(40)]
+    serial = MinHashDeduplicator(n_jobs=1, chunk_size=1000).cluster_ids(codes)
+    parallel = MinHashDeduplicator(n_jobs=2, chunk_size=6).cluster_ids(codes)
+    np.testing.assert_array_equal(serial, parallel)
+
+
+def test_deduplicate_csv_keeps_the_first_row_of_each_cluster(tmp_path):
+    source, output, report_path = tmp_path / 'in.csv', tmp_path / 'out' / 'dedup.csv', tmp_path / 'report.json'
+    rows = [(BASE, 1), (distinct(4), 0), (near_duplicate(BASE), 0), ('', 0), ('', 1)]
+    with open(source, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['code_snippet', 'has_bug'])
+        writer.writerows(rows)
+
+    report = MinHashDeduplicator(n_jobs=1, chunk_size=2).deduplicate_csv(str(source), str(output), str(report_path))
+    with open(output, newline='') as f:
+        kept = list(csv.DictReader(f))
+    assert [(row['code_snippet'], int(row['has_bug'])) for row in kept] == [rows[0], rows[1], rows[3]]
+    assert report['duplicate_rows'] == 2
+    assert json.loads(report_path.read_text()) == report
+
+
+def test_bands_must_divide_permutations():
+    with pytest.raises(ValueError, match="divisible"):
+        MinHashDeduplicator(num_perm=100, bands=32)
@@ -0,0 +1,94 @@
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from drift import DriftMonitor, FeatureSketch, drift_scores
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_sketches_merge_like_one_stream():
+    rng = np.random.default_rng(0)
+    a, b = rng.poisson(5, size=(300, 3)), rng.poisson(9, size=(200, 3))
+    merged = FeatureSketch.from_matrix(a).merge(FeatureSketch.from_matrix(b))
+    whole = FeatureSketch.from_matrix(np.vstack([a, b]))
+    assert merged.count == whole.count == 500
+    np.testing.assert_allclose(merged.mean, whole.mean)
+    np.testing.assert_allclose(merged.std, whole.std)
+    np.testing.assert_array_equal(merged.histogram, whole.histogram)
+    restored = FeatureSketch.from_dict(merged.to_dict())
+    np.testing.assert_array_equal(restored.histogram, merged.histogram)
+
+
+def test_psi_flags_a_shifted_feature_only():
+    rng = np.random.default_rng(1)
+    reference = FeatureSketch.from_matrix(rng.poisson(5, size=(2000, 2)), ['steady', 'shifted'],
+                                          ['python'] * 1000 + ['java'] * 1000)
+    live_rows = np.column_stack([rng.poisson(5, size=2000), rng.poisson(40, size=2000)])
+    live = FeatureSketch.from_matrix(live_rows, ['steady', 'shifted'], ['cpp'] * 2000)
+    scores = drift_scores(live, reference)
+    assert scores['drifted_features'] == ['shifted']
+    assert scores['features']['steady']['psi'] < 0.1
+    assert scores['language_psi'] > 1
+
+
+def test_workers_merge_through_files_and_stale_files_are_dropped(tmp_path):
+    worker = DriftMonitor(str(tmp_path), flush_seconds=3600, enabled=True)
+    worker.register('api', 2)
+    worker.update('api', np.ones((10, 2)))
+    worker.flush()
+    other = DriftMonitor(str(tmp_path), flush_seconds=3600, enabled=True)
+    other.register('api', 2)
+    other.update('api', np.zeros((5, 2)))
+    assert other.merged('api').count == 15
+
+    (path,) = tmp_path.glob('api-*.json')
+    old = time.time() - other.stale_seconds - 1
+    os.utime(path, (old, old))
+    assert other.merged('api').count == 5
+    assert not path.exists()
+
+
+def test_nothing_is_written_until_started(tmp_path):
+    monitor = DriftMonitor(str(tmp_path), flush_seconds=0, enabled=True)
+    monitor.register('api', 2)
+    monitor.update('api', np.ones((3, 2)))
+    assert not list(tmp_path.iterdir())
+    monitor.start()
+    monitor.update('api', np.ones((3, 2)))
+    assert len(list(tmp_path.glob('api-*.json'))) == 1
+
+    disabled = DriftMonitor(str(tmp_path / 'off'), flush_seconds=0, enabled=False)
+    disabled.register('api', 2)
+    disabled.start()
+    disabled.update('api', np.ones((3, 2)))
+    assert not (tmp_path / 'off').exists()
+
+
+def test_importing_the_app_has_no_drift_side_effects(tmp_path):
+    env = dict(os.environ, PYTHONPATH=BACKEND, DRIFT_ENABLED='1', DRIFT_FLUSH_SECONDS='0')
+    code = ("import app\n"
+            "from drift import drift_monitor\n"
+            "assert drift_monitor.enabled and not drift_monitor._started and not drift_monitor.sketches\n")
+    subprocess.run([sys.executable, '-c', code], cwd=tmp_path, env=env, check=True, capture_output=True)
+    assert not (tmp_path / 'data').exists()
+
+
+def test_startup_hook_registers_the_api_stream(tmp_path, monkeypatch):
+    import app
+    from drift import drift_monitor
+
+    monkeypatch.setattr(drift_monitor, 'enabled', True)
+    monkeypatch.setattr(drift_monitor, 'drift_dir', str(tmp_path))
+    monkeypatch.setattr(drift_monitor, 'sketches', {})
+    monkeypatch.setattr(drift_monitor, '_started', False)
+    monkeypatch.setattr('atexit.register', lambda *args: None)
+    with TestClient(app.app) as client:
+        assert 'api' in drift_monitor.sketches and drift_monitor._started
+        client.post('/detect_bug', json={'code_snippet': "x = 1\n"})
+        assert drift_monitor.sketches['api'].count == 1
+        assert client.get('/admin/drift').json()['streams']['api']['live']
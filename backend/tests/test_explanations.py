@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from fastapi.testclient import TestClient
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+from sklearn.tree import DecisionTreeClassifier
+
+from count_features import COUNT_FEATURE_NAMES, count_features_batch
+from explanations import TreePathExplainer
+from ngram_features import HashedNgramExtractor, combine_features
+
+
+@pytest.fixture
+def counted(corpus):
+    codes, labels, _ = corpus
+    return codes, count_features_batch(codes).astype(float), np.array(labels)
+
+
+def _predicted(models, X):
+    members = models if isinstance(models, list) else [models]
+    return np.mean([model.predict_proba(X)[:, 1] for model in members], axis=0)
+
+
+@pytest.mark.parametrize('models', [
+    DecisionTreeClassifier(max_depth=6, random_state=0),
+    RandomForestClassifier(n_estimators=10, random_state=0),
+    [RandomForestClassifier(n_estimators=5, random_state=0),
+     RandomForestClassifier(n_estimators=5, max_depth=4, random_state=1)],
+])
+def test_attributions_sum_to_the_prediction(counted, models):
+    _, X, y = counted
+    for model in models if isinstance(models, list) else [models]:
+        model.fit(X, y)
+    explainer = TreePathExplainer(models, COUNT_FEATURE_NAMES)
+    totals = np.asarray(explainer.contributions(X).sum(axis=1)).ravel() + explainer.bias
+    np.testing.assert_allclose(totals, _predicted(models, X), atol=1e-9)
+
+
+def test_ngram_columns_are_named_and_sum(counted):
+    codes, X, y = counted
+    extractor = HashedNgramExtractor(n_features=1 << 10)
+    X = combine_features(X, extractor.transform(codes))
+    model = RandomForestClassifier(n_estimators=5, random_state=0).fit(X, y)
+    explainer = TreePathExplainer(model, COUNT_FEATURE_NAMES, extractor.n_features)
+    totals = np.asarray(explainer.contributions(X).sum(axis=1)).ravel() + explainer.bias
+    np.testing.assert_allclose(totals, model.predict_proba(X)[:, 1], atol=1e-9)
+    names = {item['feature'] for row in explainer.top_features(X, k=5) for item in row}
+    assert names <= set(COUNT_FEATURE_NAMES) | {f"ngram_bucket_{i}" for i in range(extractor.n_features)}
+
+
+def test_top_features_are_the_largest_contributions(counted):
+    _, X, y = counted
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+    explainer = TreePathExplainer(model, COUNT_FEATURE_NAMES)
+    contributions = explainer.contributions(X[:50]).toarray()
+    for row, top in zip(contributions, explainer.top_features(X[:50], k=3)):
+        expected = np.sort(np.abs(row[row != 0]))[::-1][:3]
+        np.testing.assert_allclose([abs(item['contribution']) for item in top], expected)
+
+
+def test_api_explains_from_the_scaled_inputs_it_predicted_on(counted, monkeypatch):
+    import app
+
+    _, X, y = counted
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(scaler.transform(X), y)
+    monkeypatch.setattr(app, 'baseline_model', model)
+    monkeypatch.setattr(app, 'baseline_scaler', scaler)
+    monkeypatch.setattr(app, 'baseline_explainer', app.build_explainer(model))
+    monkeypatch.setattr(app.config, 'EXPLAIN_PREDICTIONS', True)
+    calls = []
+    scale_features = app.scale_features
+    monkeypatch.setattr(app, 'scale_features', lambda *args: calls.append(args) or scale_features(*args))
+
+    response = TestClient(app.app).post('/detect_bug', json={'code_snippet': "for i in range(3):\n    print(i)\n"})
+    assert response.status_code == 200
+    assert response.json()['top_features']['baseline']
+    # One scaling per model per request, shared by predict and explain
+    assert len(calls) == 1
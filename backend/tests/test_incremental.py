@@ -0,0 +1,63 @@
+import csv
+
+import numpy as np
+import pytest
+
+from train_model import IncrementalModelTrainer
+
+
+@pytest.fixture
+def dataset(tmp_path, corpus):
+    codes, labels, _ = corpus
+    path = tmp_path / 'data.csv'
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['code_snippet', 'is_bug'])
+        writer.writerows(zip(codes, labels))
+    return str(path)
+
+
+def _trainer(tmp_path, name, **kwargs):
+    return IncrementalModelTrainer(chunk_size=40, checkpoint_path=str(tmp_path / f'{name}.pkl'),
+                                   checkpoint_every=1, **kwargs)
+
+
+def test_resumed_run_matches_an_uninterrupted_one(tmp_path, dataset):
+    straight = _trainer(tmp_path, 'straight')
+    expected = straight.train(dataset, epochs=2)
+
+    interrupted = _trainer(tmp_path, 'resumed')
+    save = interrupted.save_checkpoint
+    saves = []
+
+    def crash_in_second_epoch():
+        save()
+        saves.append(1)
+        # 10 chunk saves plus one end-of-epoch save per epoch
+        if len(saves) == 13:
+            raise KeyboardInterrupt
+
+    interrupted.save_checkpoint = crash_in_second_epoch
+    with pytest.raises(KeyboardInterrupt):
+        interrupted.train(dataset, epochs=2)
+
+    resumed = _trainer(tmp_path, 'resumed')
+    metrics = resumed.train(dataset, epochs=2, resume=True)
+    assert resumed.state['epoch'] == 2
+    np.testing.assert_array_equal(resumed.model.coef_, straight.model.coef_)
+    np.testing.assert_array_equal(resumed.scaler.mean_, straight.scaler.mean_)
+    assert metrics == expected
+
+
+def test_holdout_rows_are_never_trained_on(tmp_path, dataset, corpus):
+    trainer = _trainer(tmp_path, 'holdout')
+    metrics = trainer.train(dataset)
+    n_rows = len(corpus[0])
+    held_out = len(range(0, n_rows, trainer.holdout_every))
+    assert metrics['rows_seen'] == n_rows - held_out
+
+
+def test_checkpoint_must_match_the_ngram_setting(tmp_path, dataset):
+    _trainer(tmp_path, 'dense').train(dataset)
+    with pytest.raises(ValueError):
+        _trainer(tmp_path, 'dense', ngrams=True).train(dataset, resume=True)
@@ -0,0 +1,59 @@
+import re
+
+import numpy as np
+import pytest
+
+from language_identifier import (SANITY_SNIPPETS, NgramLanguageIdentifier, check_identifier,
+                                 generated_corpus, is_held_out, source_corpus)
+
+
+@pytest.fixture(scope='module')
+def shipped():
+    return NgramLanguageIdentifier.default()
+
+
+@pytest.mark.parametrize('code, language', SANITY_SNIPPETS)
+def test_shipped_table_labels_sanity_snippets(shipped, code, language):
+    assert shipped.predict(code)[0] == language
+
+
+def test_shipped_table_passes_generated_check(shipped):
+    passed, report = check_identifier(shipped, n_rows=600, seed=11)
+    assert passed, report
+    assert shipped.predict("   \n") == ('unknown', 0.0)
+
+
+def test_fit_save_load_round_trip(tmp_path):
+    codes, labels = generated_corpus(600, seed=5)
+    identifier = NgramLanguageIdentifier().fit(codes, labels, min_count=3)
+    path = str(tmp_path / 'weights.json')
+    identifier.save(path)
+    loaded = NgramLanguageIdentifier.load(path)
+
+    test_codes, test_labels = generated_corpus(200, seed=6)
+    assert loaded.languages == identifier.languages
+    np.testing.assert_allclose(loaded.predict_proba(test_codes), identifier.predict_proba(test_codes), atol=1e-3)
+    assert loaded.evaluate(test_codes, test_labels)['accuracy'] > 0.95
+
+
+def test_source_corpus_keeps_held_out_files_apart(tmp_path):
+    lines = {'.py': "file{n}_value_{i} = compute({i}, offset)\n",
+             '.java': "int file{n}_value{i} = compute({i}, offset);\n"}
+    for n in range(20):
+        for extension, line in lines.items():
+            (tmp_path / f"module_{n}{extension}").write_text(''.join(line.format(n=n, i=i) for i in range(40)))
+
+    def files_of(codes, labels):
+        extensions = {'python': '.py', 'java': '.java'}
+        return {f"module_{n}{extensions[label]}"
+                for code, label in zip(codes, labels) for n in re.findall(r'file(\d+)_', code)}
+
+    fitting, fitting_labels = source_corpus([str(tmp_path)], 200, seed=0)
+    held, held_labels = source_corpus([str(tmp_path)], 200, seed=0, held_out=True)
+    assert set(fitting_labels) == set(held_labels) == {'python', 'java'}
+    assert fitting_labels.count('python') == fitting_labels.count('java')
+
+    held_out_files = {p.name for p in tmp_path.iterdir() if is_held_out(str(p))}
+    assert 0 < len(held_out_files) < 40
+    assert files_of(held, held_labels) <= held_out_files
+    assert not files_of(fitting, fitting_labels) & held_out_files
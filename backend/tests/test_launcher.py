@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+import launcher
+from config import config
+
+
+@pytest.mark.parametrize('configured, cores, expected', [
+    (0, 8, {'cores': 8, 'workers': 8, 'threads_per_worker': 1}),
+    (2, 8, {'cores': 8, 'workers': 2, 'threads_per_worker': 4}),
+    (3, 8, {'cores': 8, 'workers': 3, 'threads_per_worker': 2}),
+    (16, 8, {'cores': 8, 'workers': 16, 'threads_per_worker': 1}),
+])
+def test_plan_splits_cores_between_workers(monkeypatch, configured, cores, expected):
+    monkeypatch.setattr(config, 'API_WORKERS', configured)
+    assert launcher.plan_workers(cores) == expected
+
+
+def test_plan_defaults_to_the_cores_this_process_may_use(monkeypatch):
+    monkeypatch.setattr(config, 'API_WORKERS', 0)
+    assert launcher.plan_workers()['workers'] == launcher.available_cores() >= 1
+
+
+def test_native_thread_limits_keep_explicit_settings(monkeypatch):
+    for var in launcher.THREAD_ENV_VARS:
+        monkeypatch.delenv(var, raising=False)
+    monkeypatch.setenv('MKL_NUM_THREADS', '3')
+    launcher.limit_native_threads(2)
+    assert {var: os.environ[var] for var in launcher.THREAD_ENV_VARS} == dict(
+        {var: '2' for var in launcher.THREAD_ENV_VARS}, MKL_NUM_THREADS='3')
+
+
+def test_gunicorn_options(monkeypatch):
+    monkeypatch.setattr(config, 'API_HOST', '127.0.0.1')
+    monkeypatch.setattr(config, 'API_PORT', 9000)
+    options = launcher.build_options({'cores': 8, 'workers': 4, 'threads_per_worker': 2})
+    assert options['bind'] == '127.0.0.1:9000'
+    assert options['workers'] == 4
+    assert options['worker_class'] == 'uvicorn.workers.UvicornWorker'
+    assert options['preload_app'] is True
+    assert options['max_requests'] == config.API_MAX_REQUESTS
+    assert callable(options['post_fork'])
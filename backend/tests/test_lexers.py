@@ -0,0 +1,74 @@
+import pytest
+
+from lexers import cpp_feature_counts, cpp_lexer, java_feature_counts
+
+
+@pytest.mark.parametrize('code, pointers', [
+    ("int* p = nullptr;", 1),
+    ("char** argv;", 2),
+    ("Node *n = head;", 1),
+    ("std::vector<int>* v;", 1),
+    ("return *p;", 1),
+    ("x = *p;", 1),
+    ("f(*p);", 1),
+    ("int y = a * b;", 0),
+    # Regressions: a declaration after an access specifier, a product in call arguments
+    ("class A {\npublic: T* x;\n};", 1),
+    ("int y = f(a * b);", 0),
+])
+def test_cpp_pointer_heuristic(code, pointers):
+    assert cpp_feature_counts(code)['pointers'] == pointers
+
+
+def test_cpp_structure_counts():
+    code = (
+        "#include <memory>\n"
+        "template <typename T>\n"
+        "class Box {\n"
+        "public:\n"
+        "    T get() const { return value; }\n"
+        "private:\n"
+        "    T value;\n"
+        "};\n"
+        "int main() {\n"
+        "    if (ready(x)) { int* p = new int[3]; delete[] p; }\n"
+        "}\n"
+    )
+    counts = cpp_feature_counts(code)
+    assert counts['templates'] == 1
+    assert counts['class_defs'] == 1
+    assert counts['function_defs'] == 2
+    assert counts['new_exprs'] == 1
+    assert counts['delete_exprs'] == 1
+
+
+def test_cpp_literals_and_comments_are_not_code():
+    code = 'const char* s = "class X { int* p; }"; // new int*\n/* delete p; */'
+    tokens = list(cpp_lexer.tokenize(code))
+    assert ('literal', '') in tokens
+    counts = cpp_feature_counts(code)
+    assert counts['class_defs'] == 0 and counts['new_exprs'] == 0 and counts['delete_exprs'] == 0
+    assert counts['pointers'] == 1
+
+
+def test_java_counts():
+    code = (
+        "public class Cache implements Store {\n"
+        "    public static final int SIZE = 10;\n"
+        "    public Cache() {}\n"
+        "    public synchronized String get(String key) {\n"
+        "        // public void commented(\n"
+        "        for (int i = 0; i < SIZE; i++) { if (key == null) { return \"if (x)\"; } }\n"
+        "        try { synchronized (this) { return key; } } finally {}\n"
+        "    }\n"
+        "}\n"
+        "interface Store {}\n"
+    )
+    counts = java_feature_counts(code)
+    assert counts['class_defs'] == 1
+    assert counts['interface_defs'] == 1
+    assert counts['public_methods'] == 2
+    assert counts['for_loops'] == 1
+    assert counts['if_statements'] == 1
+    assert counts['try_blocks'] == 1
+    assert counts['synchronized_blocks'] == 1
@@ -0,0 +1,74 @@
+import asyncio
+import json
+
+import pytest
+
+import arrow_io
+from loadtest import ENDPOINTS, LoadHarness, parse_mix, summarize
+
+
+def make_app(delay: float = 0.0, overloaded: str = None):
+    """ASGI app answering every endpoint, after delay, with 503 on the overloaded path"""
+    seen = []
+
+    async def app(scope, receive, send):
+        if scope['type'] != 'http':
+            return
+        body = b''
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+        seen.append((scope['path'], body))
+        await asyncio.sleep(delay)
+        status = 503 if scope['path'] == overloaded else 200
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'application/json')]})
+        await send({'type': 'http.response.body', 'body': b'{}'})
+
+    app.seen = seen
+    return app
+
+
+def test_in_process_run_reports_every_endpoint():
+    app = make_app(overloaded=ENDPOINTS['analyze-multilang'])
+    harness = LoadHarness(['def f():\n    pass\n', 'int x;'], concurrency=4, arrow_batch_size=5)
+    report = harness.run_in_process(60, warmup=5, app=app)
+
+    assert report['requests'] == 60 and report['target'] == 'in-process'
+    assert len(app.seen) == 65
+    endpoints = report['endpoints']
+    assert sum(section['requests'] for section in endpoints.values()) == 60
+    assert endpoints['detect_bug']['error_rate'] == 0.0
+    assert endpoints['analyze-multilang']['status_counts'] == {'503': endpoints['analyze-multilang']['requests']}
+    assert report['error_rate'] == pytest.approx(endpoints['analyze-multilang']['requests'] / 60)
+    assert endpoints['arrow']['snippets_per_second'] == pytest.approx(endpoints['arrow']['throughput_rps'] * 5)
+
+    for path, body in app.seen:
+        if path == ENDPOINTS['arrow']:
+            snippets = arrow_io.read_snippets(body)[0]
+            assert len(snippets) == 5 and set(snippets) <= set(harness.corpus)
+        else:
+            assert json.loads(body)['code_snippet'] in harness.corpus
+
+
+def test_open_loop_latency_counts_time_waiting_for_a_slot():
+    app = make_app(delay=0.02)
+    harness = LoadHarness(['x = 1\n'], mix={'detect_bug': 1.0}, concurrency=1, rate=1000.0)
+    report = harness.run_in_process(10, app=app)
+    # Arrivals are ~1 ms apart but each request holds the only slot for 20 ms
+    assert report['latency_ms']['max'] > 100
+    assert report['arrival_rate'] == 1000.0
+
+
+def test_parse_mix_and_summarize():
+    assert parse_mix('detect_bug=3, arrow=1') == {'detect_bug': 0.75, 'arrow': 0.25}
+    assert parse_mix('arrow') == {'arrow': 1.0}
+    with pytest.raises(ValueError, match="Unknown endpoint"):
+        parse_mix('detect=1')
+
+    assert summarize([]) == {'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0, 'mean': 0.0}
+    figures = summarize([0.001 * i for i in range(1, 101)])
+    assert figures['p50'] == pytest.approx(50.5)
+    assert figures['max'] == pytest.approx(100.0)
@@ -0,0 +1,47 @@
+import numpy as np
+
+from count_features import count_features_batch
+from model_search import SuccessiveHalvingSearch
+from train_model import split_indices, split_train_test
+
+GRID = {'n_estimators': [5, 20], 'max_depth': [2, None]}
+
+
+def test_report_ranks_final_round_candidates(corpus):
+    codes, labels, _ = corpus
+    X, y = count_features_batch(codes).astype(float), np.array(labels)
+    search = SuccessiveHalvingSearch(param_grid=GRID, n_jobs=1, cv=3, latency_repeats=3)
+    report = search.run(X, y)
+
+    assert [entry['rank'] for entry in report] == list(range(1, len(report) + 1))
+    scores = [entry['mean_score'] for entry in report]
+    assert scores == sorted(scores, reverse=True)
+    assert search.best_params_ == report[0]['params']
+    assert all(entry['latency_us'] > 0 for entry in report)
+    assert any(entry['pareto'] for entry in report)
+
+
+def test_grouped_search_runs_on_training_rows_only(corpus):
+    codes, labels, _ = corpus
+    X, y = count_features_batch(codes).astype(float), np.array(labels)
+    groups = np.arange(len(y)) // 4
+    train_idx, test_idx = split_indices(y, groups)
+    # No group is split across train and test
+    assert not set(groups[train_idx]) & set(groups[test_idx])
+    X_train, X_test, y_train, y_test = split_train_test(X, y, groups)
+    np.testing.assert_array_equal(X_train, X[train_idx])
+    np.testing.assert_array_equal(y_test, y[test_idx])
+
+    search = SuccessiveHalvingSearch(param_grid=GRID, n_jobs=1, cv=3, latency_repeats=3)
+    search.run(X[train_idx], y[train_idx], groups[train_idx])
+    assert search.search.n_resources_[-1] <= len(train_idx)
+
+
+def test_ungrouped_split_matches_the_trainers():
+    y = np.arange(50) % 2
+    X = np.arange(100).reshape(50, 2)
+    train_idx, test_idx = split_indices(y)
+    X_train, X_test, _, _ = split_train_test(X, y)
+    np.testing.assert_array_equal(X_train, X[train_idx])
+    np.testing.assert_array_equal(X_test, X[test_idx])
+    assert len(set(train_idx) | set(test_idx)) == 50
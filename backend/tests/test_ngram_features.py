@@ -0,0 +1,66 @@
+import csv
+
+import numpy as np
+import scipy.sparse as sp
+
+from ngram_features import HashedNgramExtractor, combine_features, iter_csv_snippets
+from train_model import SimpleDataLoader
+
+
+def test_hashing_is_stateless_and_sparse(corpus):
+    codes, _, _ = corpus
+    first = HashedNgramExtractor(n_features=1 << 12).transform(codes[:50])
+    second = HashedNgramExtractor(n_features=1 << 12).transform(codes[:50])
+    assert sp.isspmatrix_csr(first) and first.shape == (50, 1 << 12)
+    assert (first != second).nnz == 0
+    # l2-normalized rows
+    np.testing.assert_allclose(sp.linalg.norm(first, axis=1), 1.0, rtol=1e-5)
+    assert first.nnz < 0.1 * first.shape[0] * first.shape[1]
+
+
+def test_streaming_matches_one_batch(corpus):
+    codes, _, _ = corpus
+    extractor = HashedNgramExtractor(n_features=1 << 12, batch_size=7)
+    blocks = list(extractor.iter_transform(iter(codes[:50])))
+    assert [block.shape[0] for block in blocks] == [7] * 7 + [1]
+    assert (extractor.transform_stream(iter(codes[:50])) != extractor.transform(codes[:50])).nnz == 0
+    assert extractor.transform_stream(iter([])).shape == (0, 1 << 12)
+
+
+def test_bigrams_see_token_order():
+    extractor = HashedNgramExtractor(n_features=1 << 16, ngram_range=(1, 2))
+    a, b = extractor.transform(["x = y", "y = x"])
+    # Same unigrams, different bigrams
+    assert (a != b).nnz > 0
+    unigrams = HashedNgramExtractor(n_features=1 << 16, ngram_range=(1, 1)).transform(["x = y", "y = x"])
+    assert (unigrams[0] != unigrams[1]).nnz == 0
+
+
+def test_augment_only_widens_ngram_models(corpus):
+    codes, _, _ = corpus
+    extractor = HashedNgramExtractor(n_features=256)
+    dense = np.arange(30, dtype=float).reshape(3, 10)
+    assert extractor.augment(dense, codes[:3], None) is dense
+    assert extractor.augment(dense, codes[:3], 10) is dense
+    combined = extractor.augment(dense, codes[:3], 10 + 256)
+    assert combined.shape == (3, 266)
+    np.testing.assert_array_equal(combined[:, :10].toarray(), dense)
+    assert (combined[:, 10:] != extractor.transform(codes[:3])).nnz == 0
+    assert sp.isspmatrix_csr(combine_features(dense, extractor.transform(codes[:3])))
+
+
+def test_loader_streams_csv_into_one_sparse_matrix(tmp_path, corpus):
+    codes, labels, _ = corpus
+    path = tmp_path / 'data.csv'
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['code_snippet', 'is_bug'])
+        writer.writerows(zip(codes[:120], labels[:120]))
+        writer.writerow(['', 'not a label'])
+    assert len(list(iter_csv_snippets(str(path)))) == 120
+
+    extractor = HashedNgramExtractor(n_features=1 << 10, batch_size=50)
+    X, y = SimpleDataLoader.load_csv_with_ngrams(str(path), extractor)
+    assert sp.isspmatrix_csr(X) and X.shape == (120, 10 + (1 << 10))
+    np.testing.assert_array_equal(y, labels[:120])
+    np.testing.assert_array_equal(X[:, :10].toarray(), SimpleDataLoader.extract_features_batch(codes[:120]))
@@ -0,0 +1,65 @@
+import re
+
+import pytest
+
+from patterns import PatternRegistry, pattern_registry
+
+TEXT = ("for item in items:\n    if item or other:\n        continue\n    elif format_if(item):\n"
+        "        pass\n    else:\n        try:\n            x = f(item)\n        except:\n            pass\n"
+        "while True and not forever: break\n")
+
+
+def test_combined_keyword_pass_matches_a_findall_per_set(corpus):
+    codes = corpus[0] + [TEXT]
+    sets = {name: words for (language, name), words in pattern_registry.keyword_sets.items()
+            if language == 'python'}
+    for code in codes:
+        counts = pattern_registry.keyword_counts('python', code)
+        for name, words in sets.items():
+            separate = len(re.findall(r'\b(' + '|'.join(words) + r')\b', code))
+            assert pattern_registry.count_keywords('python', name, counts) == separate, (name, code)
+
+
+def test_registered_patterns_match_re(corpus):
+    for code in corpus[0][:100] + [TEXT]:
+        for (language, name), compiled in pattern_registry.patterns.items():
+            assert pattern_registry.count(language, name, code) == len(re.findall(compiled.pattern, code))
+            assert bool(pattern_registry.search(language, name, code)) == bool(re.search(compiled.pattern, code))
+
+
+def test_adding_a_keyword_set_rebuilds_the_combined_pattern():
+    registry = PatternRegistry()
+    registry.add_keywords('python', 'loops', ['for', 'while'])
+    assert registry.count_keywords('python', 'loops', registry.keyword_counts('python', TEXT)) == 2
+    registry.add_keywords('python', 'jumps', ['break', 'continue'])
+    counts = registry.keyword_counts('python', TEXT)
+    assert registry.count_keywords('python', 'jumps', counts) == 2
+    assert registry.count_keywords('python', 'loops', counts) == 2
+
+
+def test_stats_are_recorded_only_when_enabled():
+    off = PatternRegistry()
+    off.add('python', 'calls', r'\w+\s*\(')
+    off.count('python', 'calls', TEXT)
+    assert off.report()['languages']['python']['calls']['calls'] == 0
+    assert off.report()['enabled'] is False
+
+    on = PatternRegistry(stats=True)
+    on.add('python', 'calls', r'\w+\s*\(')
+    on.add('python', 'bare_except', r'except\s*:')
+    on.add_keywords('python', 'loops', ['for', 'while'])
+    on.count('python', 'calls', TEXT)
+    on.count('python', 'calls', 'no calls here')
+    on.search('python', 'bare_except', TEXT)
+    on.count_keywords('python', 'loops', on.keyword_counts('python', TEXT))
+
+    report = on.report()
+    python = report['languages']['python']
+    assert (python['calls']['calls'], python['calls']['hits']) == (2, 2)
+    assert (python['bare_except']['calls'], python['bare_except']['hits']) == (1, 1)
+    assert (python['keywords']['calls'], python['keywords']['hits']) == (1, 2)
+    assert (python['loops']['calls'], python['loops']['hits'], python['loops']['seconds']) == (1, 2, 0.0)
+    assert report['total_seconds'] == pytest.approx(sum(entry['seconds'] for entry in python.values()))
+
+    on.reset()
+    assert on.report()['total_seconds'] == 0.0
@@ -0,0 +1,62 @@
+import tracemalloc
+
+from profiling import AllocationProfiler
+
+
+def allocate(n_bytes: int):
+    return bytearray(n_bytes)
+
+
+def test_disabled_profiler_is_a_no_op():
+    profiler = AllocationProfiler()
+    with profiler.request('detect_bug'):
+        with profiler.stage('predict'):
+            allocate(1000)
+    report = profiler.report()
+    assert (report['enabled'], report['requests_seen'], report['requests'], report['stages']) == (False, 0, {}, {})
+
+
+def test_request_and_stage_figures():
+    with AllocationProfiler() as profiler:
+        with profiler.request('detect_bug'):
+            with profiler.stage('features'):
+                kept = allocate(200_000)
+            with profiler.stage('predict'):
+                allocate(1_000_000)
+        report = profiler.report()
+    assert not tracemalloc.is_tracing()
+    del kept
+
+    features, predict = report['stages']['features'], report['stages']['predict']
+    assert features['net_bytes_mean'] >= 200_000 and features['peak_bytes_max'] >= 200_000
+    # The temporary is freed before the stage ends, but its peak is recorded
+    assert predict['net_bytes_mean'] < 100_000 <= 1_000_000 <= predict['peak_bytes_max']
+    # The request's peak covers the largest stage, reset for each stage or not
+    assert report['requests']['detect_bug']['peak_bytes_max'] >= 1_000_000
+    assert report['requests']['detect_bug']['count'] == 1
+    assert any(site['size_bytes'] >= 200_000 for site in report['growth_sites'])
+
+
+def test_only_every_nth_request_is_measured():
+    with AllocationProfiler(sample_every=3) as profiler:
+        for _ in range(7):
+            with profiler.request('detect_bug'):
+                with profiler.stage('predict'):
+                    allocate(1000)
+        report = profiler.report()
+    assert report['requests_seen'] == 7
+    assert report['requests']['detect_bug']['count'] == 2
+    assert report['stages']['predict']['count'] == 2
+
+    profiler.reset()
+    assert profiler.report()['requests'] == {}
+
+
+def test_leaves_tracing_started_elsewhere_running():
+    tracemalloc.start()
+    try:
+        with AllocationProfiler():
+            pass
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
@@ -0,0 +1,126 @@
+import threading
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+from count_features import count_features_batch
+from shadow import CandidateStats, ShadowEvaluator, parse_candidates
+
+
+class FixedModel:
+    """Answers every row the same way, optionally after waiting on an event"""
+
+    def __init__(self, prediction, confidence, gate=None):
+        self.prediction, self.confidence, self.gate = prediction, confidence, gate
+
+    def predict(self, X):
+        if self.gate is not None:
+            self.gate.wait(5)
+        return np.full(len(X), self.prediction)
+
+    def predict_proba(self, X):
+        return np.tile([1 - self.confidence, self.confidence], (len(X), 1))
+
+
+class Identity:
+    def transform(self, X):
+        return np.asarray(X, dtype=float)
+
+
+def served(n, decision=0, confidence=0.5):
+    return {'decision': np.full(n, decision), 'confidence': np.full(n, confidence),
+            'references': {'baseline': np.full(n, decision)}}
+
+
+def test_stats_match_batch_figures():
+    stats = CandidateStats(latency_window=3)
+    rng = np.random.RandomState(0)
+    all_predictions, all_deltas = [], []
+    for seconds in (0.001, 0.002, 0.003, 0.004):
+        predictions, confidences = rng.randint(0, 2, 5), rng.rand(5)
+        reference = served(5, decision=1, confidence=0.6)
+        stats.add(predictions, confidences, reference, seconds)
+        all_predictions.append(predictions)
+        all_deltas.append(confidences - 0.6)
+    predictions, deltas = np.concatenate(all_predictions), np.concatenate(all_deltas)
+
+    summary = stats.summary()
+    assert summary['scored'] == 20
+    assert summary['agreement'] == {'baseline': pytest.approx(predictions.mean()),
+                                    'served': pytest.approx(predictions.mean())}
+    assert summary['bug_rate'] == pytest.approx(predictions.mean())
+    assert summary['confidence_delta_mean'] == pytest.approx(deltas.mean())
+    assert summary['confidence_delta_std'] == pytest.approx(deltas.std())
+    assert summary['confidence_delta_abs_mean'] == pytest.approx(np.abs(deltas).mean())
+    # Only the last latency_window batches count
+    assert summary['latency_ms']['max'] == pytest.approx(4.0)
+    assert summary['latency_ms']['p50'] == pytest.approx(3.0)
+
+
+def test_submit_scores_every_candidate_off_thread():
+    evaluator = ShadowEvaluator(sample_rate=1.0, workers=1, max_pending=8)
+    evaluator.add_candidate('agrees', FixedModel(0, 0.5), Identity())
+    evaluator.add_candidate('disagrees', FixedModel(1, 0.9), Identity())
+    evaluator.add_candidate('broken', FixedModel(0, 0.5), None)
+    assert evaluator.should_sample()
+
+    for _ in range(3):
+        evaluator.submit(np.zeros((2, 4)), ['x', 'y'], served(2))
+    evaluator.executor.shutdown(wait=True)
+
+    report = evaluator.report()
+    assert report['queue'] == {'submitted': 3, 'dropped': 0, 'pending': 0}
+    candidates = report['candidates']
+    assert candidates['agrees']['agreement']['served'] == 1.0
+    assert candidates['disagrees']['agreement']['served'] == 0.0
+    assert candidates['disagrees']['confidence_delta_mean'] == pytest.approx(0.4)
+    assert (candidates['broken']['scored'], candidates['broken']['errors']) == (0, 3)
+
+    evaluator.reset()
+    assert evaluator.report()['candidates']['agrees']['scored'] == 0
+
+
+def test_full_queue_drops_batches():
+    gate = threading.Event()
+    evaluator = ShadowEvaluator(sample_rate=1.0, workers=1, max_pending=2)
+    evaluator.add_candidate('slow', FixedModel(0, 0.5, gate), Identity())
+    for _ in range(5):
+        evaluator.submit(np.zeros((1, 4)), ['x'], served(1))
+    assert evaluator.report()['queue'] == {'submitted': 2, 'dropped': 3, 'pending': 2}
+    gate.set()
+    evaluator.executor.shutdown(wait=True)
+    assert evaluator.report()['candidates']['slow']['scored'] == 2
+
+
+def test_candidate_runs_single_threaded_and_votes(corpus):
+    codes, labels, _ = corpus
+    X = count_features_batch(codes).astype(float)
+    scaler = StandardScaler().fit(X)
+    members = [RandomForestClassifier(n_estimators=5, n_jobs=4, random_state=seed).fit(scaler.transform(X), labels)
+               for seed in range(3)]
+    evaluator = ShadowEvaluator(sample_rate=0.0)
+    assert not evaluator.enabled
+    evaluator.add_candidate('ensemble', members, scaler)
+    assert not evaluator.should_sample()
+
+    candidate = evaluator.candidates['ensemble']
+    assert all(member.n_jobs == 1 for member in candidate.models)
+    predictions, confidences = candidate.predict(X[:50], codes[:50])
+    votes = np.mean([member.predict(scaler.transform(X[:50])) for member in members], axis=0)
+    np.testing.assert_array_equal(predictions, np.round(votes).astype(int))
+    assert np.all((confidences >= 0.5) & (confidences <= 1.0))
+
+
+def test_parse_candidates():
+    assert parse_candidates(' a=m.pkl:s.pkl, b=dir/m2.pkl:dir/s2.pkl ,') == {
+        'a': ('m.pkl', 's.pkl'), 'b': ('dir/m2.pkl', 'dir/s2.pkl')}
+    with pytest.raises(ValueError, match="name=model.pkl:scaler.pkl"):
+        parse_candidates('a=model.pkl')
+
+
+def test_missing_candidate_files_are_skipped(tmp_path):
+    evaluator = ShadowEvaluator()
+    evaluator.load_candidates(f"gone={tmp_path / 'm.pkl'}:{tmp_path / 's.pkl'}")
+    assert not evaluator.enabled
@@ -1,78 +1,208 @@
 import numpy as np
+import scipy.sparse as sp
 import csv
 import os
-from sklearn.model_selection import train_test_split
+import sys
+import argparse
+import io
+import time
+from sklearn.model_selection import train_test_split, GroupShuffleSplit
 from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import SGDClassifier
+from sklearn.tree import DecisionTreeClassifier
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
 from sklearn.preprocessing import StandardScaler
 import joblib
 import warnings
+from config import config
+from ngram_features import HashedNgramExtractor, combine_features, iter_csv_snippets
+from count_features import COUNT_FEATURE_NAMES, count_features, count_features_batch
+from model_search import SuccessiveHalvingSearch
+from cross_validation import ParallelCrossValidator
+from deduplication import MinHashDeduplicator
+from drift import FeatureSketch
+from compact_model import CompactTreeModel
+from multi_language_detector import MultiLanguageDetector
 warnings.filterwarnings('ignore')
 
+def split_indices(y, groups=None):
+    """Train and test row indices: TEST_SIZE of the rows held out, rows sharing a group on the same side"""
+    if groups is None:
+        return train_test_split(np.arange(len(y)), test_size=config.TEST_SIZE, random_state=config.RANDOM_STATE)
+    splitter = GroupShuffleSplit(n_splits=1, test_size=config.TEST_SIZE, random_state=config.RANDOM_STATE)
+    return next(splitter.split(np.zeros(len(y)), y, groups))
+
+def split_train_test(X, y, groups=None):
+    """Hold out TEST_SIZE of the rows; rows sharing a group stay on the same side"""
+    train_idx, test_idx = split_indices(y, groups)
+    return X[train_idx], X[test_idx], y[train_idx], y[test_idx]
+
+def training_sketch(X_train, languages=None):
+    """Sketch of the count-feature columns, saved with the model as the drift reference
+
+    languages (detected language per dataset row) gives the reference its
+    language mix, so live traffic also gets a language PSI.
+    """
+    dense = X_train[:, :config.BASELINE_FEATURE_DIM]
+    if sp.issparse(dense):
+        dense = dense.toarray()
+    return FeatureSketch.from_matrix(dense, SimpleDataLoader.FEATURE_NAMES, languages)
+
 class SimpleDataLoader:
     """Load CSV data without pandas"""
+    # Column order of extract_features
+    FEATURE_NAMES = COUNT_FEATURE_NAMES
+    
     @staticmethod
-    def load_csv(filepath):
-        X = []
+    def load_csv(filepath, groups=False):
+        """Count features and labels; with groups=True also the near-duplicate
+        cluster id of every row, from the same pass over the file"""
+        codes = []
         y = []
         if not os.path.exists(filepath):
             print(f"File not found: {filepath}. Creating synthetic data...")
-            return SimpleDataLoader.create_synthetic_data()
+            return SimpleDataLoader.create_synthetic_data(groups)
         
         try:
             with open(filepath, 'r', encoding='utf-8') as f:
                 reader = csv.DictReader(f)
                 for row in reader:
                     try:
-                        code = row.get('code_snippet', '')
+                        code = row.get('code_snippet') or ''
                         label = int(row.get('is_bug', 0))
-                        # Create simple feature vector from code
-                        features = SimpleDataLoader.extract_features(code)
-                        X.append(features)
+                        codes.append(code)
                         y.append(label)
                     except:
                         continue
         except:
             print("Error reading CSV, using synthetic data...")
-            return SimpleDataLoader.create_synthetic_data()
+            return SimpleDataLoader.create_synthetic_data(groups)
+        
+        if not codes:
+            return SimpleDataLoader.create_synthetic_data(groups)
+        # Simple feature vectors for every row in one packed pass
+        X = SimpleDataLoader.extract_features_batch(codes)
+        if groups:
+            return X, np.array(y), MinHashDeduplicator().cluster_ids(codes)
+        return X, np.array(y)
+    
+    @staticmethod
+    def load_csv_with_ngrams(filepath, extractor=None, groups=False):
+        """Load CSV as dense features + hashed n-grams in one CSR matrix
+
+        Rows are streamed and hashed one batch at a time, so peak memory is
+        bounded by the batch size plus the sparse output, not by a vocabulary.
+        With groups=True each batch also gets its near-duplicate cluster ids.
+        """
+        extractor = extractor or HashedNgramExtractor()
+        empty_ngrams = lambda X: combine_features(X, sp.csr_matrix((len(X), extractor.n_features)))
+        if not os.path.exists(filepath):
+            print(f"File not found: {filepath}. Creating synthetic data...")
+            X, y, *rest = SimpleDataLoader.create_synthetic_data(groups)
+            return (empty_ngrams(X), y, *rest)
         
-        return np.array(X) if X else SimpleDataLoader.create_synthetic_data()[0], np.array(y) if y else SimpleDataLoader.create_synthetic_data()[1]
+        blocks = []
+        labels = []
+        codes = []
+        cluster_ids = []
+        deduplicator = MinHashDeduplicator()
+        
+        def flush():
+            dense = SimpleDataLoader.extract_features_batch(codes)
+            blocks.append(combine_features(dense, extractor.transform(codes)))
+            if groups:
+                cluster_ids.append(deduplicator.cluster_ids(codes))
+            codes.clear()
+        
+        for code, label in iter_csv_snippets(filepath):
+            codes.append(code)
+            labels.append(label)
+            if len(codes) >= extractor.batch_size:
+                flush()
+        if codes:
+            flush()
+        
+        if not blocks:
+            X, y, *rest = SimpleDataLoader.create_synthetic_data(groups)
+            return (empty_ngrams(X), y, *rest)
+        if groups:
+            return sp.vstack(blocks, format='csr'), np.array(labels), np.concatenate(cluster_ids)
+        return sp.vstack(blocks, format='csr'), np.array(labels)
+    
+    @staticmethod
+    def load_cached(filepath, cache_path=None, ngrams=False, groups=False):
+        """Load features from a joblib cache, rebuilding it when the CSV is newer
+
+        Dense caches are memory-mapped read-only so parallel workers share
+        one copy of the matrix instead of re-extracting features. With
+        groups=True the result (and its cache) also carries cluster ids.
+        """
+        cache_path = cache_path or config.FEATURE_CACHE_PATH
+        root, ext = os.path.splitext(cache_path)
+        if ngrams:
+            root += '_ngrams'
+        if groups:
+            root += '_groups'
+        cache_path = f"{root}{ext}"
+        
+        if not os.path.exists(filepath):
+            return SimpleDataLoader.load_csv(filepath, groups)
+        if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(filepath):
+            print(f"Using cached features from {cache_path}")
+            return joblib.load(cache_path, mmap_mode='r')
+        
+        if ngrams:
+            result = SimpleDataLoader.load_csv_with_ngrams(filepath, groups=groups)
+        else:
+            result = SimpleDataLoader.load_csv(filepath, groups)
+        os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+        joblib.dump(result, cache_path)
+        return result
+    
+    @staticmethod
+    def load_languages(filepath):
+        """Detected language of every snippet in the CSV, as the live API labels them (None for synthetic data)"""
+        if not os.path.exists(filepath):
+            return None
+        detector = MultiLanguageDetector()
+        return [detector.detect_language(code) for code, _ in iter_csv_snippets(filepath)]
     
     @staticmethod
     def extract_features(code):
-        """Extract simple features from code"""
-        features = []
-        features.append(code.count('for'))  # loops
-        features.append(code.count('if'))   # conditionals
-        features.append(code.count('('))    # function calls
-        features.append(code.count('='))    # assignments
-        features.append(code.count('def'))  # function defs
-        features.append(len(code))          # code length
-        features.append(code.count('\n'))   # lines
-        features.append(code.count('try'))  # try blocks
-        features.append(code.count('['))    # brackets
-        features.append(code.count('import'))  # imports
-        return features
+        """Extract simple features from code (loops, conditionals, calls,
+        assignments, defs, length, lines, try blocks, brackets, imports)"""
+        return count_features(code)
+    
+    @staticmethod
+    def extract_features_batch(codes):
+        """Feature matrix for many snippets in one packed pass"""
+        return count_features_batch(codes).astype(float)
     
     @staticmethod
-    def create_synthetic_data():
-        """Create synthetic data if no CSV exists"""
+    def create_synthetic_data(groups=False):
+        """Create synthetic data if no CSV exists (groups are None: no near-duplicates)"""
         print("Creating synthetic dataset...")
         X = np.random.rand(100, 10)
         y = np.random.randint(0, 2, 100)
-        return X, y
+        return (X, y, None) if groups else (X, y)
 
 class BaselineModelTrainer:
     """Trains baseline model based on Nadim & Roy 2022 methodology"""
     
-    def __init__(self):
-        self.model = RandomForestClassifier(n_estimators=100, random_state=42)
+    def __init__(self, model_params=None):
+        params = {'n_estimators': config.BASELINE_N_ESTIMATORS}
+        params.update(model_params or {})
+        self.model = RandomForestClassifier(random_state=config.RANDOM_STATE, **params)
         self.scaler = StandardScaler()
+        self.feature_sketch = None
         self.metrics = {}
     
-    def train(self, X, y):
+    def train(self, X, y, groups=None, languages=None):
         """Train baseline model"""
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        X_train, X_test, y_train, y_test = split_train_test(X, y, groups)
+        self.feature_sketch = training_sketch(X_train, languages)
+        # Centering would densify the n-gram columns
+        self.scaler.set_params(with_mean=not sp.issparse(X))
         X_train = self.scaler.fit_transform(X_train)
         X_test = self.scaler.transform(X_test)
         
@@ -93,22 +223,31 @@ class BaselineModelTrainer:
         os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
         joblib.dump(self.model, path)
         joblib.dump(self.scaler, 'models/baseline_scaler.pkl')
+        if self.feature_sketch is not None:
+            self.feature_sketch.save(config.BASELINE_SKETCH_PATH)
         print(f"Baseline model saved to {path}")
 
 class ImprovedModelTrainer:
     """Trains improved model with Ensemble methods"""
     
-    def __init__(self):
+    def __init__(self, model_params=None):
+        # model_params overrides the deeper second member of the ensemble
+        params = {'n_estimators': config.IMPROVED_N_ESTIMATORS, 'max_depth': config.IMPROVED_MAX_DEPTH}
+        params.update(model_params or {})
         self.models = [
-            RandomForestClassifier(n_estimators=100, random_state=42),
-            RandomForestClassifier(n_estimators=150, max_depth=15, random_state=43)
+            RandomForestClassifier(n_estimators=config.BASELINE_N_ESTIMATORS, random_state=config.RANDOM_STATE),
+            RandomForestClassifier(random_state=config.RANDOM_STATE + 1, **params)
         ]
         self.scaler = StandardScaler()
+        self.feature_sketch = None
         self.metrics = {}
     
-    def train(self, X, y):
+    def train(self, X, y, groups=None, languages=None):
         """Train ensemble model"""
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        X_train, X_test, y_train, y_test = split_train_test(X, y, groups)
+        self.feature_sketch = training_sketch(X_train, languages)
+        # Centering would densify the n-gram columns
+        self.scaler.set_params(with_mean=not sp.issparse(X))
         X_train = self.scaler.fit_transform(X_train)
         X_test = self.scaler.transform(X_test)
         
@@ -135,25 +274,352 @@ class ImprovedModelTrainer:
         os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
         joblib.dump(self.models, path)
         joblib.dump(self.scaler, 'models/improved_scaler.pkl')
+        if self.feature_sketch is not None:
+            self.feature_sketch.save(config.IMPROVED_SKETCH_PATH)
         print(f"Improved model saved to {path}")
 
+class DistilledModelTrainer:
+    """Distills the improved ensemble into a small student model for low-latency serving
+
+    Student shapes (n_estimators, max_depth) are tried cheapest first; the
+    first whose agreement with the teacher on a validation slice of the
+    training rows reaches DISTILL_MIN_AGREEMENT is refit on all of them
+    (the best one if none does). The student is saved as a
+    CompactTreeModel, which skips sklearn's per-call overhead, and its
+    single-row latency is checked against DISTILL_LATENCY_TARGET_US.
+    """
+    
+    def __init__(self, teacher_models, teacher_scaler, n_estimators=None, max_depth=None):
+        self.teacher_models = teacher_models if isinstance(teacher_models, list) else [teacher_models]
+        self.scaler = teacher_scaler
+        if n_estimators or max_depth:
+            self.candidates = [(n_estimators or 1, max_depth)]
+        else:
+            self.candidates = config.DISTILL_CANDIDATES
+        self.model = None
+        self.metrics = {}
+    
+    @staticmethod
+    def _student(n_estimators, max_depth):
+        if n_estimators == 1:
+            return DecisionTreeClassifier(max_depth=max_depth, random_state=config.RANDOM_STATE)
+        return RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth,
+                                      random_state=config.RANDOM_STATE)
+    
+    @staticmethod
+    def _bug_probability(model, X):
+        """Probability of class 1, or zeros if the model never saw a bug"""
+        classes = list(model.classes_)
+        if 1 not in classes:
+            return np.zeros(X.shape[0])
+        return model.predict_proba(X)[:, classes.index(1)]
+    
+    def teacher_soft_labels(self, X_scaled):
+        """Average bug probability across the ensemble members"""
+        return np.mean([self._bug_probability(m, X_scaled) for m in self.teacher_models], axis=0)
+    
+    def teacher_predictions(self, X_scaled):
+        return np.round(np.mean([m.predict(X_scaled) for m in self.teacher_models], axis=0)).astype(int)
+    
+    def _fit_student(self, student, X_scaled, soft):
+        # Each row appears once per class, weighted by the teacher's probability,
+        # so the student's leaf probabilities fit the soft targets
+        stack = sp.vstack if sp.issparse(X_scaled) else np.vstack
+        X_soft = stack([X_scaled, X_scaled])
+        y_soft = np.concatenate([np.ones(len(soft), dtype=int), np.zeros(len(soft), dtype=int)])
+        weights = np.concatenate([soft, 1 - soft])
+        return student.fit(X_soft, y_soft, sample_weight=weights)
+    
+    def train(self, X, y, groups=None):
+        """Pick and fit the student on the teacher's soft outputs and compare the two"""
+        X_train, X_test, y_train, y_test = split_train_test(X, y, groups)
+        X_train = self.scaler.transform(X_train)
+        X_test = self.scaler.transform(X_test)
+        soft = self.teacher_soft_labels(X_train)
+        
+        # Every 5th training row validates the candidates; the test rows stay untouched
+        validation = np.arange(X_train.shape[0]) % 5 == 0
+        teacher_validation = self.teacher_predictions(X_train[validation])
+        best = None
+        for n_estimators, max_depth in self.candidates:
+            student = self._fit_student(self._student(n_estimators, max_depth),
+                                        X_train[~validation], soft[~validation])
+            agreement = float(np.mean(student.predict(X_train[validation]) == teacher_validation))
+            if best is None or agreement > best[0]:
+                best = (agreement, n_estimators, max_depth)
+            if agreement >= config.DISTILL_MIN_AGREEMENT:
+                break
+        _, n_estimators, max_depth = best
+        self.model = CompactTreeModel(self._fit_student(self._student(n_estimators, max_depth), X_train, soft))
+        
+        teacher_pred = self.teacher_predictions(X_test)
+        student_pred = self.model.predict(X_test)
+        
+        teacher_latency = self._single_row_latency(
+            lambda row: [m.predict(row) for m in self.teacher_models], X_test)
+        student_latency = self._single_row_latency(self.model.predict, X_test)
+        teacher_size = self._served_size(self.teacher_models)
+        student_size = self._served_size(self.model)
+        
+        self.metrics = {
+            'agreement': float(np.mean(teacher_pred == student_pred)),
+            'accuracy': accuracy_score(y_test, student_pred),
+            'precision': precision_score(y_test, student_pred, zero_division=0),
+            'recall': recall_score(y_test, student_pred, zero_division=0),
+            'f1': f1_score(y_test, student_pred, zero_division=0),
+            'teacher_size_bytes': teacher_size,
+            'student_size_bytes': student_size,
+            'teacher_latency_us': teacher_latency,
+            'student_latency_us': student_latency,
+            'n_estimators': n_estimators,
+            'max_depth': max_depth,
+            'min_agreement': config.DISTILL_MIN_AGREEMENT,
+            'latency_target_us': config.DISTILL_LATENCY_TARGET_US,
+        }
+        self.metrics['meets_agreement'] = self.metrics['agreement'] >= config.DISTILL_MIN_AGREEMENT
+        self.metrics['meets_latency'] = student_latency <= config.DISTILL_LATENCY_TARGET_US
+        if not self.metrics['meets_agreement']:
+            print(f"WARNING: student agreement {self.metrics['agreement']:.4f} is below "
+                  f"the {config.DISTILL_MIN_AGREEMENT} target")
+        if not self.metrics['meets_latency']:
+            print(f"WARNING: student latency {student_latency:.1f} us misses "
+                  f"the {config.DISTILL_LATENCY_TARGET_US} us target")
+        
+        return self.metrics
+    
+    @staticmethod
+    def _served_size(model):
+        """Bytes of the file save_model writes for a model (joblib, as the API loads it)"""
+        buffer = io.BytesIO()
+        joblib.dump(model, buffer)
+        return buffer.getbuffer().nbytes
+    
+    @staticmethod
+    def _single_row_latency(predict, X, n_repeats=200):
+        """Median wall time in µs of one single-row predict call"""
+        row = X[:1]
+        timings = []
+        for _ in range(n_repeats):
+            start = time.perf_counter()
+            predict(row)
+            timings.append(time.perf_counter() - start)
+        return float(np.median(timings) * 1e6)
+    
+    def save_model(self, path=None):
+        """Save the student and the teacher's scaler it expects"""
+        path = path or config.DISTILLED_MODEL_PATH
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        joblib.dump(self.model, path)
+        joblib.dump(self.scaler, config.DISTILLED_SCALER_PATH)
+        print(f"Distilled model saved to {path} ({os.path.getsize(path) / 1024:.1f} KB)")
+
+class IncrementalModelTrainer:
+    """Trains a linear model out-of-core, one feature chunk at a time
+
+    Features are extracted per chunk while streaming the CSV, the scaler is
+    updated with partial_fit, and state is checkpointed so an interrupted
+    run resumes at the chunk where it stopped. Every k-th row is held out
+    for evaluation, matching TEST_SIZE without a second copy of the data.
+    """
+    
+    CLASSES = np.array([0, 1])
+    
+    def __init__(self, chunk_size=None, ngrams=False, checkpoint_path=None, checkpoint_every=None):
+        self.model = SGDClassifier(loss='log_loss', random_state=config.RANDOM_STATE)
+        # Centering would densify the n-gram columns
+        self.scaler = StandardScaler(with_mean=not ngrams)
+        self.extractor = HashedNgramExtractor() if ngrams else None
+        self.chunk_size = chunk_size or config.INCREMENTAL_CHUNK_SIZE
+        self.checkpoint_path = checkpoint_path or config.INCREMENTAL_CHECKPOINT_PATH
+        self.checkpoint_every = checkpoint_every or config.INCREMENTAL_CHECKPOINT_EVERY
+        self.holdout_every = max(int(round(1 / config.TEST_SIZE)), 2)
+        self.state = {'epoch': 0, 'chunk': 0, 'rows_seen': 0}
+        self.metrics = {}
+    
+    def iter_chunks(self, filepath, skip_chunks=0):
+        """Stream (index, X, y, holdout_mask) chunks, skipping feature work for the first skip_chunks"""
+        codes, labels = [], []
+        index = 0
+        first_row = 0
+        for code, label in iter_csv_snippets(filepath):
+            codes.append(code)
+            labels.append(label)
+            if len(codes) >= self.chunk_size:
+                if index >= skip_chunks:
+                    yield (index,) + self._featurize(codes, labels, first_row)
+                index += 1
+                first_row += len(codes)
+                codes, labels = [], []
+        if codes and index >= skip_chunks:
+            yield (index,) + self._featurize(codes, labels, first_row)
+    
+    def _featurize(self, codes, labels, first_row):
+        """Build one chunk's feature matrix, labels and holdout mask"""
+        dense = SimpleDataLoader.extract_features_batch(codes)
+        X = combine_features(dense, self.extractor.transform(codes)) if self.extractor else dense
+        rows = np.arange(first_row, first_row + len(codes))
+        return X, np.array(labels), rows % self.holdout_every == 0
+    
+    def train(self, filepath, epochs=1, resume=False):
+        """Train for a number of passes over the CSV, checkpointing as it goes"""
+        if resume and self.load_checkpoint():
+            print(f"Resuming from epoch {self.state['epoch'] + 1}, chunk {self.state['chunk']}")
+        
+        for epoch in range(self.state['epoch'], epochs):
+            for index, X, y, holdout in self.iter_chunks(filepath, skip_chunks=self.state['chunk']):
+                train = ~holdout
+                if train.any():
+                    # Scaling statistics come from the first pass only
+                    if epoch == 0:
+                        self.scaler.partial_fit(X[train])
+                    self.model.partial_fit(self.scaler.transform(X[train]), y[train], classes=self.CLASSES)
+                    self.state['rows_seen'] += int(train.sum())
+                self.state['chunk'] = index + 1
+                if self.state['chunk'] % self.checkpoint_every == 0:
+                    self.save_checkpoint()
+            self.state['epoch'] = epoch + 1
+            self.state['chunk'] = 0
+            self.save_checkpoint()
+        
+        return self.evaluate(filepath)
+    
+    def evaluate(self, filepath):
+        """Score the model on the held-out rows, streaming one chunk at a time"""
+        y_true, y_pred = [], []
+        for _, X, y, holdout in self.iter_chunks(filepath):
+            if holdout.any():
+                y_true.append(y[holdout])
+                y_pred.append(self.model.predict(self.scaler.transform(X[holdout])))
+        y_true = np.concatenate(y_true) if y_true else np.array([], dtype=int)
+        y_pred = np.concatenate(y_pred) if y_pred else np.array([], dtype=int)
+        
+        self.metrics = {
+            'accuracy': accuracy_score(y_true, y_pred) if len(y_true) else 0.0,
+            'precision': precision_score(y_true, y_pred, zero_division=0),
+            'recall': recall_score(y_true, y_pred, zero_division=0),
+            'f1': f1_score(y_true, y_pred, zero_division=0),
+            'rows_seen': self.state['rows_seen'],
+        }
+        
+        return self.metrics
+    
+    def save_checkpoint(self):
+        """Atomically write model, scaler and progress to the checkpoint file"""
+        os.makedirs(os.path.dirname(self.checkpoint_path) or '.', exist_ok=True)
+        tmp_path = self.checkpoint_path + '.tmp'
+        joblib.dump({'model': self.model, 'scaler': self.scaler, 'state': self.state,
+                     'ngrams': self.extractor is not None}, tmp_path)
+        os.replace(tmp_path, self.checkpoint_path)
+    
+    def load_checkpoint(self):
+        """Restore from the checkpoint file; returns False if there is none"""
+        if not os.path.exists(self.checkpoint_path):
+            return False
+        checkpoint = joblib.load(self.checkpoint_path)
+        if checkpoint.get('ngrams') != (self.extractor is not None):
+            raise ValueError(f"Checkpoint {self.checkpoint_path} was written with a different --ngrams setting")
+        self.model = checkpoint['model']
+        self.scaler = checkpoint['scaler']
+        self.state = checkpoint['state']
+        return True
+    
+    def save_model(self, path=None):
+        """Save trained model"""
+        path = path or config.INCREMENTAL_MODEL_PATH
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        joblib.dump(self.model, path)
+        joblib.dump(self.scaler, config.INCREMENTAL_SCALER_PATH)
+        print(f"Incremental model saved to {path}")
+
 if __name__ == "__main__":
     print("="*60)
     print("AI BUG DETECTION - MODEL TRAINING")
     print("="*60)
     
+    parser = argparse.ArgumentParser(description="Train bug detection models")
+    parser.add_argument('--data', default='data/dataset.csv', help="Labeled dataset CSV")
+    parser.add_argument('--ngrams', action='store_true',
+                        help="Append hashed n-gram (NG) features as a sparse matrix")
+    parser.add_argument('--search', action='store_true',
+                        help="Run a successive-halving hyperparameter search before training")
+    parser.add_argument('--distill', action='store_true',
+                        help="Distill the improved ensemble into a compact student model")
+    parser.add_argument('--cv', type=int, nargs='?', const=config.CV_FOLDS, default=0, metavar='K',
+                        help="Also report stratified K-fold metrics (mean/std) for both models")
+    parser.add_argument('--dedup', action='store_true',
+                        help="Drop near-duplicate rows (MinHash/LSH) before training")
+    parser.add_argument('--group-split', action='store_true',
+                        help="Keep near-duplicate clusters on one side of every train/test split")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Train out-of-core with partial_fit instead of loading the full matrix")
+    parser.add_argument('--epochs', type=int, default=1, help="Passes over the data in --incremental mode")
+    parser.add_argument('--resume', action='store_true',
+                        help="Resume --incremental training from the last checkpoint")
+    args = parser.parse_args()
+    
+    if args.dedup:
+        root, ext = os.path.splitext(args.data)
+        dedup_path = f"{root}_dedup{ext}"
+        report = MinHashDeduplicator().deduplicate_csv(args.data, dedup_path, f"{root}_dedup_clusters.json")
+        print(f"\nDeduplicated {report['rows']} rows -> {report['unique_rows']} "
+              f"({len(report['clusters'])} near-duplicate clusters), saved to {dedup_path}")
+        args.data = dedup_path
+    
+    if args.incremental:
+        print("\n" + "="*60)
+        print("TRAINING INCREMENTAL MODEL (Out-of-core SGD)")
+        print("="*60)
+        incremental = IncrementalModelTrainer(ngrams=args.ngrams)
+        incremental_metrics = incremental.train(args.data, epochs=args.epochs, resume=args.resume)
+        incremental.save_model()
+        
+        print(f"\nIncremental Model Results:")
+        print(f"  Rows seen: {incremental_metrics['rows_seen']}")
+        print(f"  Accuracy:  {incremental_metrics['accuracy']:.4f}")
+        print(f"  Precision: {incremental_metrics['precision']:.4f}")
+        print(f"  Recall:    {incremental_metrics['recall']:.4f}")
+        print(f"  F1-Score:  {incremental_metrics['f1']:.4f}")
+        sys.exit(0)
+    
     loader = SimpleDataLoader()
-    X, y = loader.load_csv('data/dataset.csv')
+    if args.group_split:
+        X, y, groups = loader.load_cached(args.data, ngrams=args.ngrams, groups=True)
+        assert groups is None or len(groups) == len(y), "Cluster ids must line up with the loaded rows"
+    else:
+        X, y = loader.load_cached(args.data, ngrams=args.ngrams)
+        groups = None
     
     print(f"\nDataset shape: {X.shape}")
     print(f"Bug samples: {sum(y)}")
     print(f"Non-bug samples: {len(y) - sum(y)}")
     
+    # Language mix of the training data, for language drift in the saved sketches
+    languages = loader.load_languages(args.data)
+    
+    best_params = None
+    if args.search:
+        print("\n" + "="*60)
+        print("HYPERPARAMETER SEARCH (Successive Halving)")
+        print("="*60)
+        search = SuccessiveHalvingSearch()
+        # Only the rows the trainers fit on, so their test metrics stay unbiased
+        train_idx, _ = split_indices(y, groups)
+        report = search.run(X[train_idx], y[train_idx], None if groups is None else groups[train_idx])
+        search.save_report()
+        best_params = search.best_params_
+        
+        print(f"\n{'Rank':<6}{'F1':>8}{'Std':>8}{'Latency (us)':>15}  Params")
+        for entry in report:
+            marker = '*' if entry['pareto'] else ' '
+            print(f"{entry['rank']:<5}{marker}{entry['mean_score']:>8.4f}{entry['std_score']:>8.4f}"
+                  f"{entry['latency_us']:>15.1f}  {entry['params']}")
+        print("(* = on the quality/latency frontier)")
+    
     print("\n" + "="*60)
     print("TRAINING BASELINE MODEL (Nadim & Roy 2022)")
     print("="*60)
-    baseline = BaselineModelTrainer()
-    baseline_metrics = baseline.train(X, y)
+    baseline = BaselineModelTrainer(best_params)
+    baseline_metrics = baseline.train(X, y, groups, languages)
     baseline.save_model()
     
     print(f"\nBaseline Model Results:")
@@ -165,8 +631,8 @@ if __name__ == "__main__":
     print("\n" + "="*60)
     print("TRAINING IMPROVED MODEL (Ensemble + Enhanced Features)")
     print("="*60)
-    improved = ImprovedModelTrainer()
-    improved_metrics = improved.train(X, y)
+    improved = ImprovedModelTrainer(best_params)
+    improved_metrics = improved.train(X, y, groups, languages)
     improved.save_model()
     
     print(f"\nImproved Model Results:")
@@ -175,6 +641,48 @@ if __name__ == "__main__":
     print(f"  Recall:    {improved_metrics['recall']:.4f}")
     print(f"  F1-Score:  {improved_metrics['f1']:.4f}")
     
+    if args.distill:
+        print("\n" + "="*60)
+        print("DISTILLING IMPROVED ENSEMBLE INTO STUDENT MODEL")
+        print("="*60)
+        distilled = DistilledModelTrainer(improved.models, improved.scaler)
+        distilled_metrics = distilled.train(X, y, groups)
+        distilled.save_model()
+        
+        print(f"\nDistilled Model Results:")
+        print(f"  Agreement: {distilled_metrics['agreement']:.4f}")
+        print(f"  Accuracy:  {distilled_metrics['accuracy']:.4f}")
+        print(f"  F1-Score:  {distilled_metrics['f1']:.4f}")
+        print(f"  Size:      {distilled_metrics['student_size_bytes'] / 1024:.1f} KB "
+              f"(teacher {distilled_metrics['teacher_size_bytes'] / 1024:.1f} KB)")
+        print(f"  Latency:   {distilled_metrics['student_latency_us']:.1f} us "
+              f"(teacher {distilled_metrics['teacher_latency_us']:.1f} us)")
+        print(f"  Student:   {distilled_metrics['n_estimators']} tree(s), max_depth={distilled_metrics['max_depth']}")
+        print(f"  Targets:   agreement >= {distilled_metrics['min_agreement']} "
+              f"({'met' if distilled_metrics['meets_agreement'] else 'MISSED'}), "
+              f"latency <= {distilled_metrics['latency_target_us']} us "
+              f"({'met' if distilled_metrics['meets_latency'] else 'MISSED'})")
+    
+    if args.cv:
+        print("\n" + "="*60)
+        print(f"STRATIFIED {args.cv}-FOLD CROSS-VALIDATION")
+        print("="*60)
+        validator = ParallelCrossValidator(n_splits=args.cv)
+        cv_results = validator.evaluate(X, y, {
+            'baseline': baseline.model,
+            'improved': improved.models,
+        }, groups=groups)
+        timing = cv_results.pop('timing')
+        
+        print(f"\n{'Model':<14}{'Accuracy':>18}{'Precision':>18}{'Recall':>18}{'F1':>18}")
+        for name, stats in cv_results.items():
+            cells = ''.join(f"{stats[m + '_mean']:>10.4f} ± {stats[m + '_std']:.4f}"
+                            for m in ['accuracy', 'precision', 'recall', 'f1'])
+            print(f"{name:<14}{cells}")
+        print(f"\nWall time: {timing['wall_seconds']:.2f}s "
+              f"(slowest fold {timing['slowest_fold_seconds']:.2f}s, "
+              f"all folds {timing['total_fold_seconds']:.2f}s)")
+    
     print("\n" + "="*60)
     print("ACCURACY IMPROVEMENT")
     print("="*60)